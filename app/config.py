@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -21,6 +22,88 @@ EXTENSIONS_DIR = BASE_DIR / "extensions"
 DASHBOARD_FILE = DATA_DIR / "dashboard.json"  # used by migrate.py only
 SESSIONS_DIR = DATA_DIR / "sessions"
 
+# Rendering
+TEMPLATE_CACHE_SIZE = int(os.environ.get("TEMPLATE_CACHE_SIZE", "256"))
+# Facades larger than this (chars) render in a worker thread instead of the event loop
+RENDER_THREAD_THRESHOLD = int(os.environ.get("RENDER_THREAD_THRESHOLD", "4096"))
+# Memory budget (bytes) for cached rendered panel HTML
+RENDER_CACHE_BYTES = int(os.environ.get("RENDER_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+# Storage
+# Times a handler is re-run after losing a storage compare-and-set race
+STORAGE_CONFLICT_RETRIES = int(os.environ.get("STORAGE_CONFLICT_RETRIES", "3"))
+
+# Change feed - cross-worker invalidation
+CHANGE_FEED = os.environ.get("CHANGE_FEED", "auto")  # "auto", "stream", "poll" or "off"
+CHANGE_POLL_INTERVAL = float(os.environ.get("CHANGE_POLL_INTERVAL", "2"))
+
+# Days of task run history kept in the task_runs collection (0 keeps it forever)
+TASK_RUNS_TTL_DAYS = float(os.environ.get("TASK_RUNS_TTL_DAYS", "7"))
+
+# Scheduled task failure handling
+TASK_RETRY_MAX_DELAY = float(os.environ.get("TASK_RETRY_MAX_DELAY", "60"))
+# Consecutive failed ticks before a task's circuit opens and it stops running
+TASK_CIRCUIT_THRESHOLD = int(os.environ.get("TASK_CIRCUIT_THRESHOLD", "5"))
+# While open, one probe run is let through this often
+TASK_CIRCUIT_PROBE_SECONDS = float(os.environ.get("TASK_CIRCUIT_PROBE_SECONDS", "300"))
+
+# Visibility-aware scheduling
+# How long a page load counts as someone viewing the dashboard's storages
+VISIBILITY_TTL = float(os.environ.get("VISIBILITY_TTL", "300"))
+# Adaptive tasks whose storages nobody is viewing run at most this often
+IDLE_TASK_INTERVAL = float(os.environ.get("IDLE_TASK_INTERVAL", "900"))
+
+# Scheduler leader election - one process per deployment runs cron tasks
+SCHEDULER_LEASE_TTL = float(os.environ.get("SCHEDULER_LEASE_TTL", "15"))
+
+# History
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "file")  # "file" or "mongo"
+# Retention in days (0 keeps forever) for raw records, hourly and daily rollups.
+# The mongo backend also sets its TTL from the longest raw retention.
+HISTORY_RAW_DAYS = float(os.environ.get("HISTORY_RAW_DAYS", "90"))
+HISTORY_HOURLY_DAYS = float(os.environ.get("HISTORY_HOURLY_DAYS", "365"))
+HISTORY_DAILY_DAYS = float(os.environ.get("HISTORY_DAILY_DAYS", "0"))
+# Per-source overrides as JSON, e.g. {"crypto": {"raw_days": 7, "hourly_days": 90}}
+HISTORY_RETENTION = json.loads(os.environ.get("HISTORY_RETENTION", "{}"))
+# Seconds between retention/compaction runs on the scheduler leader (0 disables)
+HISTORY_COMPACT_INTERVAL = float(os.environ.get("HISTORY_COMPACT_INTERVAL", "3600"))
+
+# Sandbox
+SANDBOX_EXECUTOR = os.environ.get("SANDBOX_EXECUTOR", "simple")  # "simple", "process" or "docker"
+EXECUTOR_POOL = os.environ.get("EXECUTOR_POOL", "thread")  # "thread" or "process"
+EXECUTOR_WORKERS = int(os.environ.get("EXECUTOR_WORKERS", "8"))
+# Handlers executing at once across panels and tasks (extra callers queue)
+HANDLER_CONCURRENCY = int(os.environ.get("HANDLER_CONCURRENCY", str(EXECUTOR_WORKERS)))
+HANDLER_TIMEOUT = float(os.environ.get("HANDLER_TIMEOUT", "30"))
+# Seconds an in-process handler gets to unwind after hitting a limit before its thread is abandoned
+HANDLER_TIMEOUT_GRACE = float(os.environ.get("HANDLER_TIMEOUT_GRACE", "5"))
+# CPU seconds a single handler run may use (every executor)
+SANDBOX_CPU_SECONDS = float(os.environ.get("SANDBOX_CPU_SECONDS", "10"))
+# Handlers whose storage serializes larger than this fail instead of being written
+HANDLER_MAX_OUTPUT_BYTES = int(os.environ.get("HANDLER_MAX_OUTPUT_BYTES", str(1024 * 1024)))
+HANDLER_CODE_CACHE_SIZE = int(os.environ.get("HANDLER_CODE_CACHE_SIZE", "256"))
+
+# Shared HTTP client for in-process handlers (SANDBOX_EXECUTOR=simple)
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "30"))
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "20"))
+HTTP_CACHE_ENTRIES = int(os.environ.get("HTTP_CACHE_ENTRIES", "512"))
+# Per-host token bucket: sustained requests/second and burst size
+HTTP_RATE_LIMIT = float(os.environ.get("HTTP_RATE_LIMIT", "10"))
+HTTP_RATE_BURST = int(os.environ.get("HTTP_RATE_BURST", "30"))
+
+# Process sandbox (SANDBOX_EXECUTOR=process)
+PROCESS_POOL_SIZE = int(os.environ.get("PROCESS_POOL_SIZE", "4"))
+PROCESS_MAX_RUNS = int(os.environ.get("PROCESS_MAX_RUNS", "500"))
+SANDBOX_MEMORY_MB = int(os.environ.get("SANDBOX_MEMORY_MB", "512"))
+
+# Docker sandbox (SANDBOX_EXECUTOR=docker); the image needs httpx for network handlers
+DOCKER_IMAGE = os.environ.get("DOCKER_IMAGE", "python:3.12-slim")
+DOCKER_POOL_SIZE = int(os.environ.get("DOCKER_POOL_SIZE", "4"))
+DOCKER_MAX_RUNS = int(os.environ.get("DOCKER_MAX_RUNS", "100"))
+DOCKER_MEMORY = os.environ.get("DOCKER_MEMORY", "256m")
+DOCKER_CPUS = os.environ.get("DOCKER_CPUS", "0.5")
+DOCKER_NETWORK = os.environ.get("DOCKER_NETWORK", "bridge")
+
 # Agent
 PI_COMMAND = "pi"
 DASHBOARD_EXTENSION = EXTENSIONS_DIR / "dashboard-tools.ts"
@@ -1,14 +1,21 @@
 """MongoDB connection management via Motor."""
 
 import logging
+import uuid
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid
+
+from app.config import HISTORY_BACKEND, HISTORY_RAW_DAYS, HISTORY_RETENTION, TASK_RUNS_TTL_DAYS
 
 logger = logging.getLogger(__name__)
 
 _client: AsyncIOMotorClient | None = None
 _db: AsyncIOMotorDatabase | None = None
 
+# Stamped on writes as "origin" so change feeds can skip this process's own changes
+PROCESS_ID = uuid.uuid4().hex
+
 
 async def connect(uri: str, db_name: str = "hypane"):
     """Initialize MongoDB connection. Call during app startup."""
@@ -51,9 +58,84 @@ def dashboards_col():
     return _db["dashboards"]
 
 
+def locks_col():
+    return _db["locks"]
+
+
+def task_runs_col():
+    return _db["task_runs"]
+
+
+def viewers_col():
+    return _db["viewers"]
+
+
+def history_col():
+    return _db["history"]
+
+
+def history_rollups_col():
+    return _db["history_rollups"]
+
+
 async def _ensure_indexes():
     for col_name in ["panels", "storages", "tasks"]:
         col = _db[col_name]
         await col.create_index([("user_id", 1), ("deleted_at", 1)])
+    for col_name in ["panels", "storages", "tasks", "dashboards"]:
+        await _db[col_name].create_index([("updated_at", 1)])
     await _db["dashboards"].create_index([("user_id", 1)])
+    # Expired leases are also ignored by the acquire filter; TTL just cleans them up
+    await _db["locks"].create_index([("expires_at", 1)], expireAfterSeconds=0)
+    await _db["viewers"].create_index([("expires_at", 1)], expireAfterSeconds=0)
+    await _db["task_runs"].create_index([("task_id", 1), ("started_at", -1)])
+    await _ensure_task_runs_ttl()
+    if HISTORY_BACKEND == "mongo":
+        await _ensure_history_collection()
     logger.info("MongoDB indexes ensured")
+
+
+async def _ensure_task_runs_ttl():
+    """Keep the task_runs TTL index in sync with config; 0 keeps runs forever."""
+    expire = int(TASK_RUNS_TTL_DAYS * 86400)
+    col = _db["task_runs"]
+    existing = (await col.index_information()).get("started_at_1")
+    current = existing.get("expireAfterSeconds") if existing else None
+    if current == (expire if expire > 0 else None):
+        return
+    if current is not None and expire > 0:
+        # Changing the options via create_index would raise IndexOptionsConflict
+        await _db.command(
+            "collMod",
+            "task_runs",
+            index={"keyPattern": {"started_at": 1}, "expireAfterSeconds": expire},
+        )
+        return
+    if existing:
+        # A TTL can't be switched off in place; a plain index is rebuilt as a TTL one
+        await col.drop_index("started_at_1")
+    if expire > 0:
+        await col.create_index([("started_at", 1)], expireAfterSeconds=expire)
+
+
+async def _ensure_history_collection():
+    """Create the history time-series collection and keep its TTL in sync with config."""
+    # Compaction applies per-source raw retention; the TTL is a backstop that must
+    # not expire anything a source override still keeps
+    raw_days = [HISTORY_RAW_DAYS]
+    raw_days += [o.get("raw_days", HISTORY_RAW_DAYS) for o in HISTORY_RETENTION.values()]
+    expire = 0 if min(raw_days) <= 0 else int(max(raw_days) * 86400)
+    options = {"expireAfterSeconds": expire} if expire > 0 else {}
+    try:
+        await _db.create_collection(
+            "history",
+            timeseries={"timeField": "timestamp", "metaField": "source", "granularity": "minutes"},
+            **options,
+        )
+    except CollectionInvalid:
+        # Already exists; apply a changed retention
+        await _db.command("collMod", "history", expireAfterSeconds=expire if expire > 0 else "off")
+    await _db["history"].create_index([("source", 1), ("timestamp", -1)])
+    # append looks up the earlier record of the same period
+    await _db["history"].create_index([("source", 1), ("period", 1), ("timestamp", -1)])
+    await _db["history_rollups"].create_index([("source", 1), ("level", 1), ("start", 1)])
@@ -12,6 +12,7 @@ from app.routes import (
     api_market,
     api_panels,
     api_storage,
+    api_system,
     api_tasks,
     chat,
     console,
@@ -30,6 +31,15 @@ async def lifespan(app: FastAPI):
     from app.migrate import migrate_files_to_mongo
     await migrate_files_to_mongo()
 
+    from app.services.history import migrate_history
+    await migrate_history()
+
+    from app.sandbox import warm_up
+    warm_up(config.SANDBOX_EXECUTOR)
+
+    from app.services.change_feed import start_change_feed
+    start_change_feed()
+
     from app.services.task_scheduler import start_scheduler
     await start_scheduler()
 
@@ -37,7 +47,14 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     from app.services.task_scheduler import stop_scheduler
-    stop_scheduler()
+    await stop_scheduler()
+
+    from app.sandbox import shutdown_pool
+    shutdown_pool()
+
+    from app.services.change_feed import stop_change_feed
+    await stop_change_feed()
+
     await db.close()
 
 
@@ -58,6 +75,7 @@ app.include_router(api_dashboards.router)
 app.include_router(api_market.router)
 app.include_router(api_storage.router)
 app.include_router(api_tasks.router)
+app.include_router(api_system.router)
 app.include_router(api_agent.router)
 app.include_router(chat.router)
 app.include_router(history.router)
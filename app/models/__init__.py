@@ -1,5 +1,6 @@
 from .storage import Storage
 from .panel import Panel
 from .task import Task
+from .task_run import TaskRun
 
-__all__ = ["Storage", "Panel", "Task"]
+__all__ = ["Storage", "Panel", "Task", "TaskRun"]
@@ -4,6 +4,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 from app import db
+from app.services import events
 
 
 @dataclass
@@ -81,9 +82,10 @@ class Panel:
         self.updated_at = datetime.now()
         await db.panels_col().update_one(
             {"_id": self.id},
-            {"$set": self._to_doc()},
+            {"$set": {**self._to_doc(), "origin": db.PROCESS_ID}},
             upsert=True,
         )
+        events.publish("panels", [self.id])
 
     def get_template(self) -> str:
         """Get panel template HTML."""
@@ -109,6 +111,24 @@ class Panel:
         doc = await db.panels_col().find_one({"_id": panel_id, "deleted_at": None})
         return cls._from_doc(doc) if doc else None
 
+    @classmethod
+    async def load_many(
+        cls, panel_ids: list[str], include_code: bool = True
+    ) -> dict[str, "Panel"]:
+        """Load multiple panels, returns {id: Panel}.
+
+        With include_code=False the facade and handler bodies are not fetched.
+        """
+        result = {}
+        projection = None if include_code else {"facade": 0, "handler": 0}
+        cursor = db.panels_col().find(
+            {"_id": {"$in": panel_ids}, "deleted_at": None}, projection
+        )
+        async for doc in cursor:
+            p = cls._from_doc(doc)
+            result[p.id] = p
+        return result
+
     @classmethod
     async def list_all(cls, user_id: str = "default") -> list["Panel"]:
         """List all panels for a user."""
@@ -117,8 +137,9 @@ class Panel:
 
     async def delete(self) -> bool:
         """Soft-delete panel."""
+        events.publish("panels", [self.id])
         result = await db.panels_col().update_one(
             {"_id": self.id, "deleted_at": None},
-            {"$set": {"deleted_at": datetime.now()}},
+            {"$set": {"deleted_at": datetime.now(), "origin": db.PROCESS_ID}},
         )
         return result.modified_count > 0
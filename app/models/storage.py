@@ -3,13 +3,31 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
 from app import db
+from app.services import events
+
+
+class StorageConflictError(Exception):
+    """Raised when a storage was modified since it was loaded."""
+
+    def __init__(self, storage_ids: list[str]):
+        self.storage_ids = storage_ids
+        super().__init__(f"Storage version conflict: {', '.join(storage_ids)}")
+
+
+def _version_filter(version: int) -> dict:
+    """Match a stored version; documents written before versioning count as 0."""
+    return {"version": version} if version else {"version": {"$in": [0, None]}}
 
 
 @dataclass
 class Storage:
     id: str
     data: dict = field(default_factory=dict)
+    version: int = 0
     user_id: str = "default"
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
@@ -19,6 +37,7 @@ class Storage:
         return {
             "id": self.id,
             "data": self.data,
+            "version": self.version,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
@@ -29,6 +48,7 @@ class Storage:
             "_id": self.id,
             "user_id": self.user_id,
             "data": self.data,
+            "version": self.version,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "deleted_at": self.deleted_at,
@@ -40,20 +60,48 @@ class Storage:
         return cls(
             id=doc["_id"],
             data=doc.get("data", {}),
+            version=doc.get("version", 0),
             user_id=doc.get("user_id", "default"),
             created_at=doc.get("created_at") or datetime.now(),
             updated_at=doc.get("updated_at") or datetime.now(),
             deleted_at=doc.get("deleted_at"),
         )
 
-    async def save(self) -> None:
-        """Save storage to MongoDB."""
-        self.updated_at = datetime.now()
-        await db.storages_col().update_one(
-            {"_id": self.id},
-            {"$set": self._to_doc()},
-            upsert=True,
-        )
+    async def save(self, force: bool = False) -> None:
+        """Save storage to MongoDB, bumping its version.
+
+        The write only applies if the stored version still matches the one this
+        object was loaded with; otherwise StorageConflictError is raised. Pass
+        force=True to overwrite unconditionally; the stored version is then
+        incremented in place and read back.
+        """
+        doc = self._to_doc()
+        doc["updated_at"] = datetime.now()
+        doc["origin"] = db.PROCESS_ID
+        if force:
+            # Bump whatever version is stored (not our possibly stale copy) so a
+            # forced write never moves the version backwards
+            del doc["version"]
+            stored = await db.storages_col().find_one_and_update(
+                {"_id": self.id},
+                {"$set": doc, "$inc": {"version": 1}},
+                projection={"version": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            doc["version"] = stored["version"]
+        else:
+            doc["version"] = self.version + 1
+            query = {"_id": self.id, **_version_filter(self.version)}
+            try:
+                await db.storages_col().update_one(query, {"$set": doc}, upsert=True)
+            except DuplicateKeyError:
+                # Upsert hit an existing _id, i.e. the version moved on
+                raise StorageConflictError([self.id])
+
+        self.version = doc["version"]
+        self.updated_at = doc["updated_at"]
+        events.publish("storages", [self.id])
 
     @classmethod
     async def load(cls, storage_id: str) -> "Storage | None":
@@ -73,6 +121,55 @@ class Storage:
             result[s.id] = s
         return result
 
+    @classmethod
+    async def bulk_patch(
+        cls,
+        patches: dict[str, tuple[dict, list[str]]],
+        versions: dict[str, int] | None = None,
+    ) -> list[str]:
+        """Apply targeted data updates to many storages in one bulk_write.
+
+        patches maps storage_id -> (set, unset) where set is {field_path: value}
+        (e.g. "data.count") and unset is a list of field paths to remove. Each
+        touched storage has its version bumped.
+
+        If versions ({storage_id: expected_version}) is given, each update is a
+        compare-and-set; storages whose version moved on are left untouched and
+        returned as conflicts. Returns the list of conflicting storage ids.
+        """
+        if not patches:
+            return []
+
+        now = datetime.now()
+        sids = list(patches)
+        ops = []
+        for sid in sids:
+            to_set, to_unset = patches[sid]
+            update = {
+                "$set": {**to_set, "updated_at": now, "origin": db.PROCESS_ID},
+                "$inc": {"version": 1},
+            }
+            if to_unset:
+                update["$unset"] = {path: "" for path in to_unset}
+            if versions is None:
+                ops.append(UpdateOne({"_id": sid, "deleted_at": None}, update))
+            else:
+                # Upsert turns a version mismatch into a duplicate key error we can attribute
+                query = {"_id": sid, "deleted_at": None, **_version_filter(versions.get(sid, 0))}
+                ops.append(UpdateOne(query, update, upsert=True))
+
+        conflicts = []
+        try:
+            await db.storages_col().bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            conflicts = [sids[err["index"]] for err in errors]
+
+        events.publish("storages", [sid for sid in sids if sid not in conflicts])
+        return conflicts
+
     @classmethod
     async def list_all(cls, user_id: str = "default") -> list["Storage"]:
         """List all storages for a user."""
@@ -81,8 +178,9 @@ class Storage:
 
     async def delete(self) -> bool:
         """Soft-delete storage."""
+        events.publish("storages", [self.id])
         result = await db.storages_col().update_one(
             {"_id": self.id, "deleted_at": None},
-            {"$set": {"deleted_at": datetime.now()}},
+            {"$set": {"deleted_at": datetime.now(), "origin": db.PROCESS_ID}},
         )
         return result.modified_count > 0
@@ -4,6 +4,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 from app import db
+from app.services import events
 
 
 @dataclass
@@ -13,11 +14,21 @@ class Task:
     schedule: str = ""
     storage_ids: list[str] = field(default_factory=list)
     enabled: bool = True
+    max_instances: int = 1  # concurrent runs allowed; further ticks are skipped
+    coalesce: bool = True  # collapse missed runs into one
+    adaptive: bool = True  # slow down to IDLE_TASK_INTERVAL while nobody views its storages
+    retry_attempts: int = 0  # extra attempts per tick after a failure
+    retry_backoff: float = 1.0  # base delay (seconds), doubled per attempt
+    circuit: str = "closed"  # "closed", "open" or "half_open" (probing)
+    consecutive_failures: int = 0
+    circuit_opened_at: datetime | None = None
+    last_error: str | None = None
     handler: str = ""
     user_id: str = "default"
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
-    last_run: datetime | None = None
+    last_run: datetime | None = None  # last successful run
+    last_attempt: datetime | None = None  # last run, successful or not
     deleted_at: datetime | None = None
 
     def to_dict(self) -> dict:
@@ -27,9 +38,21 @@ class Task:
             "schedule": self.schedule,
             "storage_ids": self.storage_ids,
             "enabled": self.enabled,
+            "max_instances": self.max_instances,
+            "coalesce": self.coalesce,
+            "adaptive": self.adaptive,
+            "retry_attempts": self.retry_attempts,
+            "retry_backoff": self.retry_backoff,
+            "circuit": self.circuit,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit_opened_at": (
+                self.circuit_opened_at.isoformat() if self.circuit_opened_at else None
+            ),
+            "last_error": self.last_error,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
             "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_attempt": self.last_attempt.isoformat() if self.last_attempt else None,
         }
 
     def _to_doc(self) -> dict:
@@ -41,8 +64,18 @@ class Task:
             "schedule": self.schedule,
             "storage_ids": self.storage_ids,
             "enabled": self.enabled,
+            "max_instances": self.max_instances,
+            "coalesce": self.coalesce,
+            "adaptive": self.adaptive,
+            "retry_attempts": self.retry_attempts,
+            "retry_backoff": self.retry_backoff,
+            "circuit": self.circuit,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit_opened_at": self.circuit_opened_at,
+            "last_error": self.last_error,
             "handler": self.handler,
             "last_run": self.last_run,
+            "last_attempt": self.last_attempt,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "deleted_at": self.deleted_at,
@@ -57,11 +90,21 @@ class Task:
             schedule=doc.get("schedule", ""),
             storage_ids=doc.get("storage_ids", []),
             enabled=doc.get("enabled", True),
+            max_instances=doc.get("max_instances", 1),
+            coalesce=doc.get("coalesce", True),
+            adaptive=doc.get("adaptive", True),
+            retry_attempts=doc.get("retry_attempts", 0),
+            retry_backoff=doc.get("retry_backoff", 1.0),
+            circuit=doc.get("circuit", "closed"),
+            consecutive_failures=doc.get("consecutive_failures", 0),
+            circuit_opened_at=doc.get("circuit_opened_at"),
+            last_error=doc.get("last_error"),
             handler=doc.get("handler", ""),
             user_id=doc.get("user_id", "default"),
             created_at=doc.get("created_at") or datetime.now(),
             updated_at=doc.get("updated_at") or datetime.now(),
             last_run=doc.get("last_run"),
+            last_attempt=doc.get("last_attempt"),
             deleted_at=doc.get("deleted_at"),
         )
 
@@ -70,9 +113,21 @@ class Task:
         self.updated_at = datetime.now()
         await db.tasks_col().update_one(
             {"_id": self.id},
-            {"$set": self._to_doc()},
+            {"$set": {**self._to_doc(), "origin": db.PROCESS_ID}},
             upsert=True,
         )
+        events.publish("tasks", [self.id])
+
+    async def set_fields(self, **fields) -> None:
+        """Update only the given fields, leaving concurrent edits to others intact."""
+        self.updated_at = datetime.now()
+        for key, value in fields.items():
+            setattr(self, key, value)
+        await db.tasks_col().update_one(
+            {"_id": self.id},
+            {"$set": {**fields, "updated_at": self.updated_at, "origin": db.PROCESS_ID}},
+        )
+        events.publish("tasks", [self.id])
 
     def get_handler(self) -> str:
         """Get task handler code."""
@@ -99,6 +154,7 @@ class Task:
         """Soft-delete task."""
         result = await db.tasks_col().update_one(
             {"_id": self.id, "deleted_at": None},
-            {"$set": {"deleted_at": datetime.now()}},
+            {"$set": {"deleted_at": datetime.now(), "origin": db.PROCESS_ID}},
         )
+        events.publish("tasks", [self.id])
         return result.modified_count > 0
@@ -0,0 +1,95 @@
+"""TaskRun model - one execution of a task with phase timings (MongoDB)."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from app import db
+
+
+@dataclass
+class TaskRun:
+    task_id: str
+    started_at: datetime
+    trigger: str = "schedule"  # "schedule", "retry" (a later attempt of a tick) or "manual"
+    success: bool = False
+    error: str | None = None
+    duration_ms: float = 0.0
+    load_ms: float = 0.0
+    wait_ms: float = 0.0  # queued for a handler slot
+    handler_ms: float = 0.0
+    save_ms: float = 0.0
+    cpu_ms: float | None = None
+    peak_memory_kb: int | None = None
+    output_bytes: int | None = None
+    attempts: int = 0
+    storage_ids: list[str] = field(default_factory=list)  # storages actually changed
+
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.task_id,
+            "started_at": self.started_at.isoformat(),
+            "trigger": self.trigger,
+            "success": self.success,
+            "error": self.error,
+            "duration_ms": self.duration_ms,
+            "load_ms": self.load_ms,
+            "wait_ms": self.wait_ms,
+            "handler_ms": self.handler_ms,
+            "save_ms": self.save_ms,
+            "cpu_ms": self.cpu_ms,
+            "peak_memory_kb": self.peak_memory_kb,
+            "output_bytes": self.output_bytes,
+            "attempts": self.attempts,
+            "storage_ids": self.storage_ids,
+        }
+
+    def _to_doc(self) -> dict:
+        """Convert to MongoDB document."""
+        return {
+            "task_id": self.task_id,
+            "started_at": self.started_at,
+            "trigger": self.trigger,
+            "success": self.success,
+            "error": self.error,
+            "duration_ms": self.duration_ms,
+            "load_ms": self.load_ms,
+            "wait_ms": self.wait_ms,
+            "handler_ms": self.handler_ms,
+            "save_ms": self.save_ms,
+            "cpu_ms": self.cpu_ms,
+            "peak_memory_kb": self.peak_memory_kb,
+            "output_bytes": self.output_bytes,
+            "attempts": self.attempts,
+            "storage_ids": self.storage_ids,
+        }
+
+    @classmethod
+    def _from_doc(cls, doc: dict) -> "TaskRun":
+        """Create from MongoDB document."""
+        return cls(
+            task_id=doc["task_id"],
+            started_at=doc["started_at"],
+            trigger=doc.get("trigger", "schedule"),
+            success=doc.get("success", False),
+            error=doc.get("error"),
+            duration_ms=doc.get("duration_ms", 0.0),
+            load_ms=doc.get("load_ms", 0.0),
+            wait_ms=doc.get("wait_ms", 0.0),
+            handler_ms=doc.get("handler_ms", 0.0),
+            save_ms=doc.get("save_ms", 0.0),
+            cpu_ms=doc.get("cpu_ms"),
+            peak_memory_kb=doc.get("peak_memory_kb"),
+            output_bytes=doc.get("output_bytes"),
+            attempts=doc.get("attempts", 0),
+            storage_ids=doc.get("storage_ids", []),
+        )
+
+    async def save(self) -> None:
+        """Append run to MongoDB (expired by TTL index on started_at)."""
+        await db.task_runs_col().insert_one(self._to_doc())
+
+    @classmethod
+    async def list_for_task(cls, task_id: str, limit: int = 100) -> list["TaskRun"]:
+        """Most recent runs of a task, newest first."""
+        cursor = db.task_runs_col().find({"task_id": task_id}).sort("started_at", -1).limit(limit)
+        return [cls._from_doc(doc) async for doc in cursor]
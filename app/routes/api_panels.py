@@ -66,6 +66,27 @@ async def update_positions(request: PositionsUpdateRequest, dashboard_id: str =
     return {"success": True}
 
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """Template, render and handler HTTP cache counters."""
+    from app.sandbox.http_client import http_stats
+    from app.services import render_cache, template_cache
+
+    return {
+        "templates": template_cache.stats(),
+        "renders": render_cache.stats(),
+        "http": http_stats(),
+    }
+
+
+@router.get("/handler-stats")
+async def handler_stats_ranking(sort: str = "cpu_ms_total", limit: int = 50):
+    """Panels ranked by handler resource usage since process start."""
+    from app.services import handler_stats
+
+    return handler_stats.top("panel", sort, limit)
+
+
 # === Panel CRUD ===
 
 @router.get("")
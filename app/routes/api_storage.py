@@ -3,6 +3,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from app.models.storage import StorageConflictError
 from app.services import storage as storage_service
 
 router = APIRouter(prefix="/api/storages", tags=["storages"])
@@ -47,7 +48,10 @@ async def create_storage(request: CreateStorageRequest):
 @router.put("/{storage_id}")
 async def update_storage(storage_id: str, request: UpdateStorageRequest):
     """Update storage data (full replace)."""
-    s = await storage_service.update_storage(storage_id, request.data)
+    try:
+        s = await storage_service.update_storage(storage_id, request.data)
+    except StorageConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not s:
         raise HTTPException(status_code=404, detail="Storage not found")
     return s
@@ -56,7 +60,10 @@ async def update_storage(storage_id: str, request: UpdateStorageRequest):
 @router.patch("/{storage_id}")
 async def patch_storage(storage_id: str, request: PatchStorageRequest):
     """Patch storage data (shallow merge)."""
-    s = await storage_service.patch_storage(storage_id, request.data)
+    try:
+        s = await storage_service.patch_storage(storage_id, request.data)
+    except StorageConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not s:
         raise HTTPException(status_code=404, detail="Storage not found")
     return s
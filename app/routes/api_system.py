@@ -0,0 +1,17 @@
+"""System API routes - sandbox and change feed runtime stats."""
+
+from fastapi import APIRouter
+
+router = APIRouter(prefix="/api/system", tags=["system"])
+
+
+@router.get("/stats")
+async def system_stats():
+    """Sandbox pool occupancy and latency, plus the invalidation feed mode."""
+    from app.sandbox.executor import pool_stats
+    from app.services import change_feed
+
+    return {
+        "sandbox": pool_stats(),
+        "change_feed": change_feed.status(),
+    }
@@ -15,6 +15,11 @@ class CreateTaskRequest(BaseModel):
     storage_ids: list[str] | None = None
     handler: str | None = None
     enabled: bool = True
+    max_instances: int = 1
+    coalesce: bool = True
+    adaptive: bool = True
+    retry_attempts: int = 0
+    retry_backoff: float = 1.0
 
 
 class UpdateTaskRequest(BaseModel):
@@ -22,6 +27,11 @@ class UpdateTaskRequest(BaseModel):
     schedule: str | None = None
     storage_ids: list[str] | None = None
     enabled: bool | None = None
+    max_instances: int | None = None
+    coalesce: bool | None = None
+    adaptive: bool | None = None
+    retry_attempts: int | None = None
+    retry_backoff: float | None = None
 
 
 class UpdateHandlerRequest(BaseModel):
@@ -40,6 +50,23 @@ async def get_scheduled_tasks():
     return await task_service.get_scheduled_tasks()
 
 
+@router.get("/scheduler")
+async def get_scheduler_leader():
+    """Show which process holds the scheduler lease and handler slot usage."""
+    from app.services.handlers import concurrency_stats
+    from app.services.task_scheduler import leader_status
+
+    return {**await leader_status(), "handlers": concurrency_stats()}
+
+
+@router.get("/handler-stats")
+async def get_handler_stats(sort: str = "cpu_ms_total", limit: int = 50):
+    """Tasks ranked by handler resource usage since process start."""
+    from app.services import handler_stats
+
+    return handler_stats.top("task", sort, limit)
+
+
 @router.get("/{task_id}")
 async def get_task(task_id: str):
     """Get a task by ID."""
@@ -49,6 +76,14 @@ async def get_task(task_id: str):
     return t
 
 
+@router.get("/{task_id}/runs")
+async def get_task_runs(task_id: str, limit: int = 100):
+    """Recent runs of a task with timing percentiles."""
+    if not await task_service.get_task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await task_service.get_task_runs(task_id, min(max(limit, 1), 1000))
+
+
 @router.post("")
 async def create_task(request: CreateTaskRequest):
     """Create a new task."""
@@ -61,6 +96,11 @@ async def create_task(request: CreateTaskRequest):
         storage_ids=request.storage_ids,
         handler=request.handler or "",
         enabled=request.enabled,
+        max_instances=request.max_instances,
+        coalesce=request.coalesce,
+        adaptive=request.adaptive,
+        retry_attempts=request.retry_attempts,
+        retry_backoff=request.retry_backoff,
     )
 
 
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
 from app.config import TEMPLATES_DIR
-from app.services import panels_v2
+from app.services import live, panels_v2, visibility
 from app.services.dashboard import get_dashboard, list_dashboards
 from app.services.panel_theme import DEFAULT_COLOR, DEFAULT_ICON, get_color, get_icon_svg
 
@@ -13,11 +13,11 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
 async def enrich_panels_for_render(panels: list) -> list:
     """Add rendered template, icon SVG, and color to each panel."""
+    rendered = await panels_v2.render_panels([p.get("id") for p in panels])
+
     enriched = []
     for panel in panels:
-        panel_id = panel.get("id")
-
-        rendered_html = await panels_v2.render_panel(panel_id) or ""
+        rendered_html = rendered.get(panel.get("id"), "")
 
         icon_name = panel.get("icon", DEFAULT_ICON)
         header_color = panel.get("headerColor", DEFAULT_COLOR)
@@ -55,6 +55,9 @@ async def dashboard_page(request: Request, dashboard_id: str):
         })
 
     panels = await enrich_panels_for_render(dashboard.get("panels", []))
+    await visibility.mark_viewed(
+        f"page:{dashboard_id}", visibility.panel_storage_ids(dashboard.get("panels", []))
+    )
 
     all_panels = await panels_v2.list_panels()
     dashboard_panel_ids = [p["id"] for p in dashboard.get("panels", [])]
@@ -79,6 +82,9 @@ async def dashboard_content(request: Request, dashboard_id: str):
     """Return just the main content area for HTMX dashboard switch."""
     dashboard = await get_dashboard(dashboard_id=dashboard_id)
     panels = await enrich_panels_for_render(dashboard.get("panels", []))
+    await visibility.mark_viewed(
+        f"page:{dashboard_id}", visibility.panel_storage_ids(dashboard.get("panels", []))
+    )
 
     return templates.TemplateResponse(
         "partials/dashboard_content.html",
@@ -95,6 +101,9 @@ async def dashboard_panels(request: Request, dashboard_id: str):
     """Return just the panels HTML for HTMX refresh."""
     dashboard = await get_dashboard(dashboard_id=dashboard_id)
     panels = await enrich_panels_for_render(dashboard.get("panels", []))
+    await visibility.mark_viewed(
+        f"page:{dashboard_id}", visibility.panel_storage_ids(dashboard.get("panels", []))
+    )
 
     return templates.TemplateResponse(
         "partials/panels_grid.html",
@@ -105,6 +114,19 @@ async def dashboard_panels(request: Request, dashboard_id: str):
     )
 
 
+@router.get("/d/{dashboard_id}/events")
+async def dashboard_events(request: Request, dashboard_id: str):
+    """SSE stream of out-of-band panel swaps when panels or their storages change."""
+    return StreamingResponse(
+        live.dashboard_updates(dashboard_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
+
+
 # Keep old route for backwards compatibility during transition
 @router.get("/dashboard-panels", response_class=HTMLResponse)
 async def dashboard_panels_legacy(request: Request):
@@ -1,12 +1,44 @@
 """Changelog, Snapshots and History API routes."""
 
+import json
+from typing import AsyncIterator, Literal
+
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.services.snapshots import get_changelog, get_snapshot
-from app.services.history import read_history, list_sources
+from app.services.history import compact_history, iter_history, list_sources
 
 router = APIRouter(tags=["history"])
 
+# Encoded records are flushed to the client in chunks of about this many bytes
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+async def _encode(items: AsyncIterator[dict], fmt: str) -> AsyncIterator[bytes]:
+    """Serialize items as a JSON array or NDJSON without holding them all in memory."""
+    buffer: list[str] = []
+    size = 0
+    first = True
+    if fmt == "json":
+        buffer.append("[")
+    async for item in items:
+        text = json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+        if fmt == "ndjson":
+            text += "\n"
+        elif not first:
+            text = "," + text
+        first = False
+        buffer.append(text)
+        size += len(text)
+        if size >= _STREAM_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if fmt == "json":
+        buffer.append("]")
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
 
 @router.get("/api/changelog")
 async def api_get_changelog(limit: int = Query(default=20, le=100)):
@@ -26,11 +58,30 @@ async def api_get_snapshot(snapshot_id: str):
 @router.get("/api/history")
 async def api_list_history_sources():
     """List available history data sources."""
-    return list_sources()
+    return await list_sources()
+
+
+@router.post("/api/history/compact")
+async def api_compact_history():
+    """Apply history retention and compaction now; returns what was reclaimed."""
+    return await compact_history()
 
 
 @router.get("/api/history/{source:path}")
-async def api_get_history(source: str, range: str = Query(default="7d")):
-    """Get historical data for a source."""
-    records = read_history(source, range)
-    return records
+async def api_get_history(
+    source: str,
+    range: str = Query(default="7d"),
+    max_points: int | None = Query(default=None, ge=1, le=10000),
+    resolution: str | None = Query(default=None),
+    format: Literal["json", "ndjson"] = Query(default="json"),
+):
+    """Stream historical data for a source as a JSON array or NDJSON.
+
+    Downsampled when max_points or resolution is set.
+    """
+    try:
+        items = iter_history(source, range, max_points=max_points, resolution=resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(_encode(items, format), media_type=media_type)
@@ -1,15 +1,19 @@
-from .executor import SandboxExecutor, get_executor
+from .executor import SandboxExecutor, get_executor, shutdown_pool, warm_up
 from .protocol import HandlerContext, HandlerEvent, HandlerResult, EventType
 from .simple import SimpleExecutor
+from .process import ProcessExecutor
 from .docker import DockerExecutor
 
 __all__ = [
     "SandboxExecutor",
     "get_executor", 
+    "shutdown_pool",
+    "warm_up",
     "HandlerContext",
     "HandlerEvent",
     "HandlerResult",
     "EventType",
     "SimpleExecutor",
+    "ProcessExecutor",
     "DockerExecutor",
 ]
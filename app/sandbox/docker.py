@@ -1,30 +1,129 @@
-"""Docker executor - placeholder for production sandbox."""
+"""Docker executor - runs handlers in a pool of warm, resource-limited containers."""
+
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+
+from app.config import (
+    DOCKER_CPUS,
+    DOCKER_IMAGE,
+    DOCKER_MAX_RUNS,
+    DOCKER_MEMORY,
+    DOCKER_NETWORK,
+    DOCKER_POOL_SIZE,
+    HANDLER_CODE_CACHE_SIZE,
+    HANDLER_MAX_OUTPUT_BYTES,
+    HANDLER_TIMEOUT,
+    SANDBOX_CPU_SECONDS,
+)
 
 from .executor import SandboxExecutor
+from .pool import Worker, WorkerPool
 from .protocol import HandlerContext, HandlerResult
 
+RUNNER_SOURCE = (Path(__file__).parent / "runner.py").read_text()
+
+
+class ContainerPool(WorkerPool):
+    """Pool of pre-started containers, recycled after max_runs executions."""
+
+    kind = "docker"
+
+    def __init__(
+        self,
+        image: str = DOCKER_IMAGE,
+        size: int = DOCKER_POOL_SIZE,
+        max_runs: int = DOCKER_MAX_RUNS,
+        memory: str = DOCKER_MEMORY,
+        cpus: str = DOCKER_CPUS,
+        network: str = DOCKER_NETWORK,
+    ):
+        super().__init__(size=size, max_runs=max_runs)
+        self.image = image
+        self.memory = memory
+        self.cpus = cpus
+        self.network = network
+
+    def spawn(self) -> Worker:
+        name = f"hypane-sandbox-{uuid.uuid4().hex[:12]}"
+        cmd = [
+            "docker", "run", "-i", "--rm",
+            "--name", name,
+            "--network", self.network,
+            "--memory", self.memory,
+            "--memory-swap", self.memory,
+            "--cpus", self.cpus,
+            "--pids-limit", "64",
+            "--read-only",
+            "--tmpfs", "/tmp:size=16m",
+            "--cap-drop", "ALL",
+            "--security-opt", "no-new-privileges",
+            "--user", "65534:65534",
+            "-e", f"HYPANE_SANDBOX_TIMEOUT={HANDLER_TIMEOUT}",
+            "-e", f"HYPANE_SANDBOX_MAX_OUTPUT={HANDLER_MAX_OUTPUT_BYTES}",
+            "-e", f"HYPANE_SANDBOX_CPU={SANDBOX_CPU_SECONDS}",
+            "-e", f"HYPANE_SANDBOX_CODE_CACHE={HANDLER_CODE_CACHE_SIZE}",
+            self.image,
+            "python", "-u", "-c", RUNNER_SOURCE,
+        ]
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        return Worker(name=name, proc=proc)
+
+    def kill(self, worker: Worker) -> None:
+        if worker.proc.poll() is None:
+            # Killing the docker client alone would leave the container running
+            subprocess.run(
+                ["docker", "kill", worker.name],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        super().kill(worker)
+
+
+# Process-wide pools, one per image
+_pools: dict[str, ContainerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_container_pool(image: str = DOCKER_IMAGE) -> ContainerPool:
+    """Get or create the container pool for an image."""
+    with _pools_lock:
+        if image not in _pools:
+            _pools[image] = ContainerPool(image=image)
+        return _pools[image]
+
+
+def container_pool_stats() -> dict[str, dict]:
+    """Stats of each started container pool, by image."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {image: pool.stats() for image, pool in pools.items()}
+
+
+def shutdown_container_pool() -> None:
+    """Kill pooled containers. Call during app shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
 
 class DockerExecutor(SandboxExecutor):
     """
     Docker-based executor for secure code execution.
-    
-    TODO: Implement using Docker containers with Python slim image.
+
+    Handlers run in pre-started containers (see ContainerPool) with memory,
+    CPU, pid and capability limits. Code, storage and event are streamed in
+    over stdin and the modified storage is read back from stdout.
     """
-    
-    def __init__(self, image: str = "python:3.12-slim", timeout: int = 30):
+
+    def __init__(self, image: str = DOCKER_IMAGE, timeout: float = HANDLER_TIMEOUT):
         self.image = image
         self.timeout = timeout
-    
+
     def execute(self, code: str, context: HandlerContext) -> HandlerResult:
-        """Execute handler code in Docker container."""
-        # TODO: Implement Docker execution
-        # 1. Create container from pool or spin up new one
-        # 2. Copy code and context into container
-        # 3. Execute handler
-        # 4. Read back modified storage
-        # 5. Cleanup
-        
-        return HandlerResult(
-            success=False,
-            error="Docker executor not implemented yet. Use simple executor for development."
-        )
+        """Execute handler code in a pooled Docker container."""
+        return get_container_pool(self.image).execute(code, context, self.timeout)
@@ -1,8 +1,89 @@
 """Sandbox executor interface."""
 
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config import EXECUTOR_POOL, EXECUTOR_WORKERS, HANDLER_TIMEOUT
 from .protocol import HandlerContext, HandlerResult
 
+# Shared worker pool for execute_async, created on first use
+_pool: Executor | None = None
+# Handlers still running when execute_async gave up on them
+_runaways = 0
+
+
+def get_pool() -> Executor:
+    """Get or create the handler worker pool (thread or process, per config)."""
+    global _pool
+    if _pool is None:
+        if EXECUTOR_POOL == "process":
+            _pool = ProcessPoolExecutor(max_workers=EXECUTOR_WORKERS)
+        else:
+            _pool = ThreadPoolExecutor(
+                max_workers=EXECUTOR_WORKERS, thread_name_prefix="handler"
+            )
+    return _pool
+
+
+def _retire_pool(pool: Executor) -> None:
+    """Stop handing work to a pool whose worker is stuck on a timed-out handler.
+
+    Later calls get a fresh pool. Work already queued on the old one still
+    runs, and its workers exit once they finish: SimpleExecutor abandons a
+    runaway handler's thread after HANDLER_TIMEOUT_GRACE and the process and
+    docker executors kill theirs at the timeout.
+    """
+    global _pool, _runaways
+    _runaways += 1
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False)
+
+
+def warm_up(executor_type: str = "simple") -> None:
+    """Pre-start sandbox resources for an executor type (blocking)."""
+    if executor_type == "docker":
+        from .docker import get_container_pool
+        get_container_pool().start()
+    elif executor_type == "process":
+        from .process import get_process_pool
+        get_process_pool().start()
+
+
+def pool_stats() -> dict:
+    """Occupancy and cold vs warm latency of the sandbox pools started in this process."""
+    from .docker import container_pool_stats
+    from .process import process_pool_stats
+    return {
+        "process": process_pool_stats(),
+        "docker": container_pool_stats(),
+        "runaways": _runaways,
+    }
+
+
+def shutdown_pool() -> None:
+    """Shut down the handler worker pool and sandbox resources. Call during app shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+    from .docker import shutdown_container_pool
+    from .http_client import shutdown_shared_client
+    from .process import shutdown_process_pool
+    shutdown_container_pool()
+    shutdown_process_pool()
+    shutdown_shared_client()
+
+
+def _execute_in_worker(
+    executor: "SandboxExecutor", code: str, context: HandlerContext
+) -> tuple[HandlerResult, dict[str, dict]]:
+    """Pool entry point; returns storage too since a child process can't mutate ours."""
+    result = executor.execute(code, context)
+    return result, context.storage
+
 
 class SandboxExecutor(ABC):
     """Abstract base class for sandbox executors."""
@@ -21,12 +102,50 @@ class SandboxExecutor(ABC):
         """
         pass
 
+    async def execute_async(
+        self, code: str, context: HandlerContext, timeout: float | None = None
+    ) -> HandlerResult:
+        """
+        Execute handler code in the worker pool without blocking the event loop.
+
+        Args:
+            code: Python code string (handler.py content)
+            context: Handler context with storage and event
+            timeout: Wall-clock limit in seconds (defaults to HANDLER_TIMEOUT)
+
+        Returns:
+            HandlerResult; on timeout success is False and storage is left as-is
+        """
+        timeout = HANDLER_TIMEOUT if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        future = loop.run_in_executor(pool, _execute_in_worker, self, code, context)
+        try:
+            result, storage = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # Cancelling the future doesn't free the worker running it
+            _retire_pool(pool)
+            return HandlerResult(
+                success=False,
+                error=f"Handler timed out after {timeout}s",
+                wall_ms=timeout * 1000,
+                timed_out=True,
+            )
+
+        if storage is not context.storage:
+            # Came back from another process: apply changes to the caller's dicts
+            context.storage.update(storage)
+        return result
+
 
 def get_executor(executor_type: str = "simple") -> SandboxExecutor:
     """Factory function to get executor instance."""
     if executor_type == "simple":
         from .simple import SimpleExecutor
         return SimpleExecutor()
+    elif executor_type == "process":
+        from .process import ProcessExecutor
+        return ProcessExecutor()
     elif executor_type == "docker":
         from .docker import DockerExecutor
         return DockerExecutor()
@@ -0,0 +1,544 @@
+"""Shared HTTP client for in-process handlers.
+
+One pooled httpx.Client serves every handler, with:
+
+- an HTTP cache for GETs honouring Cache-Control / Expires and revalidating
+  with ETag / Last-Modified,
+- coalescing of identical GETs that are in flight at the same time,
+- a token-bucket rate limit per host.
+
+Handlers keep writing ``with httpx.Client(timeout=30) as client: ...``; the
+``httpx`` name they see is a shim whose Client (and module-level request
+helpers) route through the shared client. ``http`` is also injected for
+handlers that want it directly, and the ``async_http`` client of async
+handlers sends through it via SharedAsyncTransport.
+
+Only requests that carry nothing caller-specific are cached: a GET with
+auth, a cookie, or any header beyond the content-negotiation ones goes
+straight to the network. The shared client never keeps cookies itself;
+each handler client has its own jar, like a real httpx.Client.
+"""
+
+import asyncio
+import email.utils
+import http.cookiejar
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import (
+    HTTP_CACHE_ENTRIES,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_RATE_BURST,
+    HTTP_RATE_LIMIT,
+    HTTP_TIMEOUT,
+)
+
+# Request headers that don't identify the caller; a GET carrying any other
+# header (Authorization, Cookie, X-Api-Key, ...) bypasses the cache
+_SHAREABLE_HEADERS = frozenset({
+    "host", "connection", "accept", "accept-encoding", "accept-language", "user-agent",
+})
+
+# httpx.Client constructor arguments the handler client honours
+_CLIENT_ARGS = ("auth", "params", "headers", "cookies", "timeout", "follow_redirects", "base_url")
+
+_DEFAULT = object()
+
+# Headers describing the wire encoding; responses are handed on decoded
+_WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+@dataclass
+class _CacheEntry:
+    status_code: int
+    headers: list[tuple[str, str]]
+    content: bytes
+    expires: float  # monotonic deadline; <= now means revalidate first
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+@dataclass
+class _InFlight:
+    done: threading.Event = field(default_factory=threading.Event)
+    entry: _CacheEntry | None = None
+    error: BaseException | None = None
+
+
+class _TokenBucket:
+    """Blocking token bucket: `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping if the bucket is empty. Returns seconds waited."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def _freshness(response: httpx.Response) -> float | None:
+    """Seconds the response may be served from cache, or None if it must not be stored."""
+    directives = {}
+    for part in response.headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if "no-store" in directives or "private" in directives:
+        return None
+    # Cached requests only carry the headers in the key, so any Vary other
+    # than "*" is already satisfied by the key
+    vary = {v.strip() for v in response.headers.get("vary", "").split(",")}
+    if "*" in vary:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(float(directives[name]) - float(response.headers.get("age", 0)), 0.0)
+            except ValueError:
+                return 0.0
+    if "expires" in response.headers:
+        try:
+            expires = email.utils.parsedate_to_datetime(response.headers["expires"])
+            now = email.utils.parsedate_to_datetime(response.headers["date"])
+            return max((expires - now).total_seconds(), 0.0)
+        except (KeyError, TypeError, ValueError):
+            # Missing Date or unparseable (e.g. "Expires: 0") means already expired
+            return 0.0
+    # No freshness info: keep it only if it can be cheaply revalidated
+    if "etag" in response.headers or "last-modified" in response.headers:
+        return 0.0
+    return None
+
+
+class SharedHttpClient:
+    """Thread-safe pooled client with caching, GET coalescing and per-host rate limits."""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_POOL_CONNECTIONS,
+        cache_entries: int = HTTP_CACHE_ENTRIES,
+        rate: float = HTTP_RATE_LIMIT,
+        burst: int = HTTP_RATE_BURST,
+        transport: httpx.BaseTransport | None = None,
+    ):
+        # A jar that refuses every cookie, so one handler's Set-Cookie is never
+        # sent on another handler's request
+        no_cookies = http.cookiejar.CookieJar(
+            policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        )
+        self.client = httpx.Client(
+            timeout=HTTP_TIMEOUT,
+            cookies=no_cookies,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+        )
+        self.cache_entries = cache_entries
+        self.rate = rate
+        self.burst = burst
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._inflight: dict[str, _InFlight] = {}
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "throttled_seconds": 0.0,
+        }
+
+    # --- public API -------------------------------------------------------
+
+    def request(
+        self, method: str, url, *, auth=None, follow_redirects: bool = False, **kwargs
+    ) -> httpx.Response:
+        """Send a request; shareable GETs go through the cache and are coalesced.
+
+        auth and follow_redirects apply when sending, like httpx.Client.request;
+        everything else goes to build_request.
+        """
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        request = self.client.build_request(method, url, **kwargs)
+        return self.send(request, auth=auth, follow_redirects=follow_redirects)
+
+    def send(
+        self, request: httpx.Request, *, auth=None, follow_redirects: bool = False
+    ) -> httpx.Response:
+        """Send a built request through the cache, coalescing and rate limits."""
+        with self._lock:
+            self._stats["requests"] += 1
+        if request.method != "GET" or auth is not None or not self._shareable(request):
+            return self._send(request, auth=auth, follow_redirects=follow_redirects)
+        return self._get(request, follow_redirects)
+
+    def get(self, url, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs) -> httpx.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def head(self, url, **kwargs) -> httpx.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Request, cache and throttling counters."""
+        with self._lock:
+            return {
+                **self._stats,
+                "throttled_seconds": round(self._stats["throttled_seconds"], 3),
+                "cache_entries": len(self._cache),
+                "inflight": len(self._inflight),
+            }
+
+    def close(self) -> None:
+        self.client.close()
+
+    # --- internals --------------------------------------------------------
+
+    def _send(
+        self, request: httpx.Request, auth=None, follow_redirects: bool = False
+    ) -> httpx.Response:
+        bucket = self._bucket(urlsplit(str(request.url)).hostname or "")
+        waited = bucket.acquire()
+        if waited:
+            with self._lock:
+                self._stats["throttled_seconds"] += waited
+        return self.client.send(request, auth=auth, follow_redirects=follow_redirects)
+
+    def _bucket(self, host: str) -> _TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _TokenBucket(self.rate, self.burst)
+            return bucket
+
+    @staticmethod
+    def _shareable(request: httpx.Request) -> bool:
+        """Whether the response may be shared with other callers."""
+        return all(name.lower() in _SHAREABLE_HEADERS for name in request.headers)
+
+    @staticmethod
+    def _key(request: httpx.Request, follow_redirects: bool) -> str:
+        headers = sorted(
+            (name.lower(), value) for name, value in request.headers.items()
+            if name.lower() not in ("host", "connection")
+        )
+        return f"{follow_redirects}|{request.url}|{headers}"
+
+    def _get(self, request: httpx.Request, follow_redirects: bool) -> httpx.Response:
+        key = self._key(request, follow_redirects)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._response(entry, request)
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self._response(call.entry, request)
+
+        try:
+            call.entry = self._fetch(key, request, entry, follow_redirects)
+            return self._response(call.entry, request)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def _fetch(
+        self,
+        key: str,
+        request: httpx.Request,
+        stale: _CacheEntry | None,
+        follow_redirects: bool,
+    ) -> _CacheEntry:
+        """Fetch (or revalidate a stale entry) and update the cache."""
+        if stale is not None:
+            if stale.etag:
+                request.headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                request.headers["If-Modified-Since"] = stale.last_modified
+
+        response = self._send(request, follow_redirects=follow_redirects)
+        response.read()
+
+        if response.status_code == 304 and stale is not None:
+            freshness = _freshness(response)
+            stale.expires = time.monotonic() + (freshness or 0.0)
+            with self._lock:
+                self._stats["revalidated"] += 1
+                self._cache[key] = stale
+                self._cache.move_to_end(key)
+            return stale
+
+        with self._lock:
+            self._stats["misses"] += 1
+
+        entry = _CacheEntry(
+            status_code=response.status_code,
+            headers=list(response.headers.multi_items()),
+            content=response.content,
+            expires=0.0,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        freshness = _freshness(response) if response.status_code == 200 else None
+        with self._lock:
+            if freshness is None:
+                self._cache.pop(key, None)
+            else:
+                entry.expires = time.monotonic() + freshness
+                self._cache[key] = entry
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _response(entry: _CacheEntry, request: httpx.Request) -> httpx.Response:
+        """A fresh Response per caller so handlers never share mutable state."""
+        # Content is stored decoded, so drop headers describing the wire encoding
+        headers = [(k, v) for k, v in entry.headers if k.lower() not in _WIRE_HEADERS]
+        return httpx.Response(
+            status_code=entry.status_code,
+            headers=headers,
+            content=entry.content,
+            request=request,
+        )
+
+
+class HandlerHttpClient:
+    """httpx.Client look-alike bound to the shared client; closing it is a no-op.
+
+    Supports the httpx.Client arguments in _CLIENT_ARGS and rejects the rest
+    (transport, verify, proxy, ...) since the pooled connection is shared.
+    """
+
+    def __init__(
+        self,
+        shared: SharedHttpClient,
+        *,
+        auth=None,
+        params=None,
+        headers=None,
+        cookies=None,
+        timeout=HTTP_TIMEOUT,
+        follow_redirects: bool = False,
+        base_url="",
+        **unsupported,
+    ):
+        if unsupported:
+            names = ", ".join(sorted(unsupported))
+            raise TypeError(
+                f"httpx.Client argument(s) not supported in the in-process sandbox: {names} "
+                f"(supported: {', '.join(_CLIENT_ARGS)})"
+            )
+        self._shared = shared
+        self._auth = auth
+        self._params = httpx.QueryParams(params)
+        self._headers = dict(headers or {})
+        self._cookies = httpx.Cookies(cookies)
+        self._timeout = timeout
+        self._follow_redirects = follow_redirects
+        self._base_url = httpx.URL(base_url)
+        if self._base_url.raw_path and not self._base_url.raw_path.endswith(b"/"):
+            self._base_url = self._base_url.copy_with(raw_path=self._base_url.raw_path + b"/")
+
+    @property
+    def cookies(self) -> httpx.Cookies:
+        return self._cookies
+
+    def _merge_url(self, url) -> httpx.URL:
+        """Resolve a relative URL against base_url, as httpx.Client does."""
+        url = httpx.URL(url)
+        if url.is_relative_url and self._base_url.raw_path:
+            return self._base_url.copy_with(
+                raw_path=self._base_url.raw_path + url.raw_path.lstrip(b"/")
+            )
+        return url
+
+    def request(
+        self,
+        method: str,
+        url,
+        *,
+        params=None,
+        headers=None,
+        cookies=None,
+        auth=_DEFAULT,
+        follow_redirects=_DEFAULT,
+        timeout=_DEFAULT,
+        **kwargs,
+    ) -> httpx.Response:
+        jar = httpx.Cookies(self._cookies)
+        if cookies:
+            jar.update(cookies)
+        request = self._shared.client.build_request(
+            method,
+            self._merge_url(url),
+            params=self._params.merge(params) if params else self._params,
+            headers={**self._headers, **dict(headers or {})},
+            cookies=jar,
+            timeout=self._timeout if timeout is _DEFAULT else timeout,
+            **kwargs,
+        )
+        response = self._shared.send(
+            request,
+            auth=self._auth if auth is _DEFAULT else auth,
+            follow_redirects=(
+                self._follow_redirects if follow_redirects is _DEFAULT else follow_redirects
+            ),
+        )
+        self._cookies.extract_cookies(response)
+        return response
+
+    def get(self, url, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs) -> httpx.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def head(self, url, **kwargs) -> httpx.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "HandlerHttpClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class SharedAsyncTransport(httpx.AsyncBaseTransport):
+    """Transport for an httpx.AsyncClient that sends through the shared client.
+
+    Each request runs on a worker thread, so async handlers get the same
+    per-host rate limit, cache and connection pool as sync ones. Redirects,
+    auth and cookies are handled by the AsyncClient on top, as usual.
+    """
+
+    def __init__(self, shared: SharedHttpClient):
+        self._shared = shared
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await asyncio.to_thread(self._shared.send, request)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[
+                (k, v) for k, v in response.headers.multi_items()
+                if k.lower() not in _WIRE_HEADERS
+            ],
+            content=response.content,
+        )
+
+
+class HttpxShim:
+    """Stands in for the httpx module inside handlers.
+
+    Client and the module-level request helpers use the shared client;
+    everything else (exceptions, Timeout, ...) is the real httpx.
+    """
+
+    def __init__(self, shared: SharedHttpClient):
+        self._shared = shared
+
+    def Client(self, **kwargs) -> HandlerHttpClient:
+        return HandlerHttpClient(self._shared, **kwargs)
+
+    def request(self, method: str, url, **kwargs) -> httpx.Response:
+        # Like httpx.request: a throwaway client, so cookies don't persist
+        return HandlerHttpClient(self._shared).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(httpx, name)
+
+
+_shared: SharedHttpClient | None = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client() -> SharedHttpClient:
+    """Get or create the process-wide shared client."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedHttpClient()
+        return _shared
+
+
+def shutdown_shared_client() -> None:
+    """Close pooled connections. Call during app shutdown."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+            _shared = None
+
+
+def http_stats() -> dict | None:
+    """Stats of the shared client, or None if no handler has used it yet."""
+    with _shared_lock:
+        shared = _shared
+    return shared.stats() if shared is not None else None
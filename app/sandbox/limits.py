@@ -0,0 +1,88 @@
+"""Resource limits for in-process handlers.
+
+A thread can't be killed from outside, so the watchdog raises an exception
+inside the handler's thread (PyThreadState_SetAsyncExc) once it exceeds its
+wall-clock or CPU budget. This interrupts runaway Python code such as an
+infinite loop; a call blocked inside C (e.g. a socket read) is interrupted
+when it returns. The exception is raised once: handler code that swallows it
+with a bare except keeps running, so SimpleExecutor runs each handler on a
+disposable thread that it abandons after a grace period. Use the process or
+docker sandbox for hard isolation.
+"""
+
+import ctypes
+import json
+import threading
+import time
+
+
+class HandlerLimitExceeded(BaseException):
+    """Raised inside a handler thread by the watchdog.
+
+    Derives from BaseException so handler code doing `except Exception`
+    doesn't swallow it.
+    """
+
+
+def _thread_cpu_clock(thread_id: int) -> int | None:
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):  # not available on every platform
+        return None
+
+
+class Watchdog:
+    """Interrupts a thread that runs longer than wall_seconds or uses more than cpu_seconds."""
+
+    INTERVAL = 0.05
+
+    def __init__(self, thread_id: int, wall_seconds: float, cpu_seconds: float = 0):
+        self.thread_id = thread_id
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.reason: str | None = None
+        self._clock = _thread_cpu_clock(thread_id) if cpu_seconds > 0 else None
+        self._cpu_start = time.clock_gettime(self._clock) if self._clock is not None else 0.0
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        threading.Thread(target=self._watch, name="handler-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop watching; clears an interrupt that fired but was not yet delivered."""
+        # Set first: the interrupt may be delivered anywhere in here, and the
+        # watcher must not fire again once the caller is past this point.
+        self._stopped.set()
+        with self._lock:
+            if self.reason is not None:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id), None)
+
+    def _exceeded(self, started: float) -> str | None:
+        if self.wall_seconds > 0 and time.monotonic() - started > self.wall_seconds:
+            return f"Handler exceeded wall-clock limit of {self.wall_seconds}s"
+        if self._clock is not None:
+            used = time.clock_gettime(self._clock) - self._cpu_start
+            if used > self.cpu_seconds:
+                return f"Handler exceeded CPU limit of {self.cpu_seconds}s"
+        return None
+
+    def _watch(self) -> None:
+        started = time.monotonic()
+        while not self._stopped.wait(self.INTERVAL):
+            reason = self._exceeded(started)
+            if reason is None:
+                continue
+            with self._lock:
+                if self._stopped.is_set():
+                    return
+                self.reason = reason
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                    ctypes.c_ulong(self.thread_id), ctypes.py_object(HandlerLimitExceeded)
+                )
+            return
+
+
+def output_size(storage: dict) -> int:
+    """Size in bytes of storage as it will be written back."""
+    return len(json.dumps(storage, ensure_ascii=False, default=str).encode("utf-8"))
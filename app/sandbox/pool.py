@@ -0,0 +1,206 @@
+"""Worker pool - long-lived sandbox processes speaking the runner protocol."""
+
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+
+from .protocol import HandlerContext, HandlerResult
+from .runner import HEADER, write_message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Worker:
+    """A running sandbox process speaking the runner protocol over stdio."""
+    name: str
+    proc: subprocess.Popen
+    runs: int = 0
+
+
+def _read_exact(fd: int, n: int, deadline: float) -> bytes:
+    """Read exactly n bytes from fd before deadline (monotonic seconds)."""
+    chunks = []
+    while n > 0:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Sandbox did not respond in time")
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            continue
+        chunk = os.read(fd, n)
+        if not chunk:
+            raise EOFError("Sandbox exited")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_response(proc: subprocess.Popen, deadline: float) -> dict:
+    """Read one length-prefixed JSON frame from a sandbox process."""
+    fd = proc.stdout.fileno()
+    (length,) = HEADER.unpack(_read_exact(fd, HEADER.size, deadline))
+    return json.loads(_read_exact(fd, length, deadline))
+
+
+class WorkerPool:
+    """Pool of pre-started sandbox processes, recycled after max_runs executions.
+
+    Subclasses define how a worker is started (spawn) and stopped (kill).
+    """
+
+    kind = "worker"
+
+    def __init__(self, size: int, max_runs: int):
+        self.size = size
+        self.max_runs = max_runs
+        self._idle: list[Worker] = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "cold_starts": 0,
+            "warm_runs": 0,
+            "cold_latency_total": 0.0,
+            "warm_latency_total": 0.0,
+            "recycled": 0,
+            "killed": 0,
+        }
+
+    def spawn(self) -> Worker:
+        """Start a new worker process."""
+        raise NotImplementedError
+
+    def kill(self, worker: Worker) -> None:
+        """Stop a worker process."""
+        try:
+            worker.proc.stdin.close()
+        except OSError:
+            pass
+        if worker.proc.poll() is None:
+            worker.proc.kill()
+            worker.proc.wait()
+
+    def start(self) -> None:
+        """Pre-start workers up to the pool size."""
+        with self._lock:
+            missing = self.size - len(self._idle)
+        spawned = [self.spawn() for _ in range(max(missing, 0))]
+        with self._lock:
+            self._idle.extend(spawned)
+        logger.info("Sandbox %s pool warmed with %d workers", self.kind, len(spawned))
+
+    def acquire(self) -> tuple[Worker, bool]:
+        """Take an idle worker, or start a new one. Returns (worker, cold)."""
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.proc.poll() is None:
+                    return worker, False
+        return self.spawn(), True
+
+    def release(self, worker: Worker, healthy: bool = True) -> None:
+        """Return a worker to the pool, or kill it if unhealthy or worn out."""
+        worker.runs += 1
+        if not healthy:
+            self.kill(worker)
+            with self._lock:
+                self._stats["killed"] += 1
+            threading.Thread(target=self.start, daemon=True).start()
+            return
+        if worker.runs >= self.max_runs:
+            self.kill(worker)
+            with self._lock:
+                self._stats["recycled"] += 1
+            threading.Thread(target=self.start, daemon=True).start()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        self.kill(worker)
+
+    def record(self, cold: bool, latency: float) -> None:
+        """Record an execution latency in seconds."""
+        kind = "cold" if cold else "warm"
+        with self._lock:
+            self._stats["cold_starts" if cold else "warm_runs"] += 1
+            self._stats[f"{kind}_latency_total"] += latency
+
+    def stats(self) -> dict:
+        """Pool occupancy and cold vs warm latency."""
+        with self._lock:
+            s = dict(self._stats)
+            idle = len(self._idle)
+        return {
+            "idle": idle,
+            "size": self.size,
+            "cold_starts": s["cold_starts"],
+            "warm_runs": s["warm_runs"],
+            "avg_cold_ms": round(1000 * s["cold_latency_total"] / s["cold_starts"], 1)
+            if s["cold_starts"] else None,
+            "avg_warm_ms": round(1000 * s["warm_latency_total"] / s["warm_runs"], 1)
+            if s["warm_runs"] else None,
+            "recycled": s["recycled"],
+            "killed": s["killed"],
+        }
+
+    def shutdown(self) -> None:
+        """Kill all idle workers."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self.kill(worker)
+
+    def execute(self, code: str, context: HandlerContext, timeout: float) -> HandlerResult:
+        """Run a handler on a pooled worker; the worker is killed on timeout or error."""
+        start = time.monotonic()
+        try:
+            worker, cold = self.acquire()
+        except OSError as e:
+            return HandlerResult(success=False, error=f"Sandbox unavailable: {e}")
+
+        request = {
+            "code": code,
+            "storage": context.storage,
+            "event": {
+                "type": context.event.type.value,
+                "action": context.event.action,
+                "payload": context.event.payload,
+            },
+        }
+        try:
+            write_message(worker.proc.stdin, request)
+            response = read_response(worker.proc, start + timeout)
+        except (TimeoutError, EOFError, OSError, ValueError) as e:
+            self.release(worker, healthy=False)
+            return HandlerResult(
+                success=False,
+                error=f"{type(e).__name__}: {e}",
+                wall_ms=round((time.monotonic() - start) * 1000, 2),
+                timed_out=isinstance(e, TimeoutError),
+            )
+
+        self.release(worker)
+        latency = time.monotonic() - start
+        self.record(cold, latency)
+        logger.debug(
+            "Sandbox %s %s run: %.1fms", self.kind, "cold" if cold else "warm", latency * 1000
+        )
+
+        usage = response.get("usage") or {}
+        result = HandlerResult(
+            success=bool(response.get("success")),
+            error=response.get("error"),
+            wall_ms=round(latency * 1000, 2),
+            cpu_ms=usage.get("cpu_ms"),
+            peak_memory_kb=usage.get("peak_memory_kb"),
+            output_bytes=usage.get("output_bytes"),
+        )
+        if result.success:
+            for sid, data in response.get("storage", {}).items():
+                context.storage[sid] = data
+        return result
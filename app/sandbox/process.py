@@ -0,0 +1,105 @@
+"""Process executor - runs handlers in a pool of pre-forked Python workers."""
+
+import os
+import subprocess
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+from app.config import (
+    HANDLER_CODE_CACHE_SIZE,
+    HANDLER_MAX_OUTPUT_BYTES,
+    HANDLER_TIMEOUT,
+    PROCESS_MAX_RUNS,
+    PROCESS_POOL_SIZE,
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_MEMORY_MB,
+)
+
+from .executor import SandboxExecutor
+from .pool import Worker, WorkerPool
+from .protocol import HandlerContext, HandlerResult
+
+RUNNER_PATH = Path(__file__).parent / "runner.py"
+
+
+class ProcessPool(WorkerPool):
+    """Pool of long-lived runner processes with CPU/memory rlimits."""
+
+    kind = "process"
+
+    def __init__(
+        self,
+        size: int = PROCESS_POOL_SIZE,
+        max_runs: int = PROCESS_MAX_RUNS,
+        cpu_seconds: float = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+    ):
+        super().__init__(size=size, max_runs=max_runs)
+        self.env = {
+            **os.environ,
+            "HYPANE_SANDBOX_CPU": str(cpu_seconds),
+            "HYPANE_SANDBOX_MEMORY_MB": str(memory_mb),
+            "HYPANE_SANDBOX_TIMEOUT": str(HANDLER_TIMEOUT),
+            "HYPANE_SANDBOX_MAX_OUTPUT": str(HANDLER_MAX_OUTPUT_BYTES),
+            "HYPANE_SANDBOX_CODE_CACHE": str(HANDLER_CODE_CACHE_SIZE),
+        }
+
+    def spawn(self) -> Worker:
+        proc = subprocess.Popen(
+            [sys.executable, "-u", "-I", str(RUNNER_PATH)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=self.env,
+            cwd="/",
+        )
+        return Worker(name=f"runner-{uuid.uuid4().hex[:8]}", proc=proc)
+
+
+_pool: ProcessPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPool:
+    """Get or create the process-wide worker pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool()
+        return _pool
+
+
+def process_pool_stats() -> dict | None:
+    """Stats of the worker pool, or None if it hasn't been started."""
+    with _pool_lock:
+        pool = _pool
+    return pool.stats() if pool else None
+
+
+def shutdown_process_pool() -> None:
+    """Kill pooled workers. Call during app shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown()
+
+
+class ProcessExecutor(SandboxExecutor):
+    """
+    Subprocess-based executor - lighter isolation than Docker.
+
+    Handlers run in pre-forked worker processes with CPU and memory rlimits.
+    Import statements are stripped from handler source, as in SimpleExecutor.
+    Workers keep compiled handler code between calls and are killed and
+    replaced when a handler times out.
+    """
+
+    def __init__(self, timeout: float = HANDLER_TIMEOUT):
+        self.timeout = timeout
+
+    def execute(self, code: str, context: HandlerContext) -> HandlerResult:
+        """Execute handler code in a pooled worker process."""
+        return get_process_pool().execute(code, context, self.timeout)
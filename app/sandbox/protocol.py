@@ -34,9 +34,16 @@ class HandlerResult:
     success: bool
     error: str | None = None
     # Storage is modified in-place, no need to return
+    # Resource accounting; None where the executor can't measure it
+    wall_ms: float | None = None
+    cpu_ms: float | None = None
+    peak_memory_kb: int | None = None  # peak Python allocations during the run
+    output_bytes: int | None = None  # serialized storage size after the run
+    timed_out: bool = False  # stopped by a wall-clock or CPU limit
 
 
-# Handler function signatures:
+# Handler function signatures (each may also be declared ``async def``; async
+# handlers get an httpx.AsyncClient as the global ``async_http``):
 # def on_init(storage: dict) -> None      # Called once at panel installation
 # def on_action(action: str, payload: dict, storage: dict) -> None
 # def on_schedule(storage: dict) -> None
@@ -0,0 +1,232 @@
+"""Sandbox runner - standalone handler worker loop.
+
+Runs inside a sandbox (container or worker process) and talks to the host over
+stdin/stdout with length-prefixed JSON frames: a 4-byte big-endian length
+followed by a UTF-8 JSON body.
+
+Request:  {"code": str, "storage": {id: data}, "event": {"type", "action", "payload"}}
+Response: {"success": bool, "error": str | None, "storage": {id: data},
+           "usage": {"cpu_ms", "peak_memory_kb", "output_bytes"}}
+
+Only depends on the standard library (plus httpx if installed) so it can run
+in a bare python image.
+
+Entry points may be plain or ``async def``; coroutines run on a fresh event
+loop with an ``httpx.AsyncClient`` available to the handler as ``async_http``.
+
+Optional environment settings:
+    HYPANE_SANDBOX_CPU         CPU seconds allowed per request
+    HYPANE_SANDBOX_TIMEOUT     wall-clock seconds for async handlers
+    HYPANE_SANDBOX_MAX_OUTPUT  max bytes of serialized storage per response
+    HYPANE_SANDBOX_MEMORY_MB   address-space cap for the whole worker
+    HYPANE_SANDBOX_CODE_CACHE  compiled handlers kept per worker (default 256)
+"""
+
+import asyncio
+import builtins
+import hashlib
+import inspect
+import json
+import math
+import os
+import struct
+import sys
+import time
+import traceback
+import tracemalloc
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # not available on every platform
+    resource = None
+
+try:
+    import httpx
+except ImportError:  # not installed in every sandbox image
+    httpx = None
+
+HEADER = struct.Struct(">I")
+
+MODULES = {
+    "asyncio": asyncio,
+    "time": time,
+    "json": json,
+    "datetime": datetime,
+    "date": date,
+    "timedelta": timedelta,
+}
+if httpx is not None:
+    MODULES["httpx"] = httpx
+
+CPU_SECONDS = float(os.environ.get("HYPANE_SANDBOX_CPU", "0"))
+TIMEOUT = float(os.environ.get("HYPANE_SANDBOX_TIMEOUT", "0")) or None
+MAX_OUTPUT = int(os.environ.get("HYPANE_SANDBOX_MAX_OUTPUT", "0"))
+MEMORY_MB = int(os.environ.get("HYPANE_SANDBOX_MEMORY_MB", "0"))
+CODE_CACHE_SIZE = int(os.environ.get("HYPANE_SANDBOX_CODE_CACHE", "256"))
+
+# Compiled handler modules keyed by source hash, least recently used first
+_compiled: OrderedDict[str, object] = OrderedDict()
+
+
+def _limit_cpu() -> None:
+    """Allow CPU_SECONDS more CPU time; exceeding it kills the worker via SIGXCPU."""
+    if resource is None or CPU_SECONDS <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + CPU_SECONDS)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _limit_memory() -> None:
+    """Cap the worker's address space."""
+    if resource is None or MEMORY_MB <= 0:
+        return
+    limit = MEMORY_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def read_message(stream) -> dict | None:
+    """Read one frame from a binary stream; None on clean EOF."""
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise EOFError("Truncated frame header")
+    (length,) = HEADER.unpack(header)
+    body = stream.read(length)
+    if len(body) < length:
+        raise EOFError("Truncated frame body")
+    return json.loads(body)
+
+
+def write_message(stream, message: dict) -> None:
+    """Write one frame to a binary stream."""
+    body = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8")
+    stream.write(HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def _compile(code: str):
+    """Strip imports (modules are pre-provided) and compile, cached by source hash."""
+    key = hashlib.sha256(code.encode()).hexdigest()
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        _compiled.move_to_end(key)
+        return compiled
+    lines = [
+        line for line in code.split("\n")
+        if not line.strip().startswith(("import ", "from "))
+    ]
+    compiled = compile("\n".join(lines), "<handler>", "exec")
+    _compiled[key] = compiled
+    while len(_compiled) > CODE_CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return compiled
+
+
+async def _call_async(fn, args: tuple, timeout: float | None, transport=None):
+    client = None
+    if httpx is not None:
+        client = httpx.AsyncClient(timeout=timeout or 30, transport=transport)
+    # The handler's module globals are its exec namespace
+    fn.__globals__["async_http"] = client
+    try:
+        return await asyncio.wait_for(fn(*args), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Async handler timed out after {timeout}s") from None
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+def call_handler(fn, *args, timeout: float | None = None, http_transport=None):
+    """Call a handler entry point, running async ones to completion on a new loop.
+
+    http_transport, if given, is the transport of the ``async_http`` client.
+    """
+    if inspect.iscoroutinefunction(fn):
+        return asyncio.run(_call_async(fn, args, timeout, http_transport))
+    return fn(*args)
+
+
+def handle(request: dict) -> dict:
+    """Execute one handler request and return the response frame with resource usage."""
+    cpu_start = time.process_time()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    response = _dispatch(request)
+
+    usage = {"cpu_ms": round((time.process_time() - cpu_start) * 1000, 2)}
+    if tracemalloc.is_tracing():
+        usage["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    if response.get("success"):
+        output = len(json.dumps(response["storage"], ensure_ascii=False, default=str).encode())
+        usage["output_bytes"] = output
+        if MAX_OUTPUT and output > MAX_OUTPUT:
+            response = {
+                "success": False,
+                "error": f"Storage output of {output} bytes exceeds limit of {MAX_OUTPUT}",
+            }
+    response["usage"] = usage
+    return response
+
+
+def _dispatch(request: dict) -> dict:
+    storage = request.get("storage") or {}
+    event = request.get("event") or {}
+    try:
+        namespace = {"__builtins__": builtins, **MODULES, "storage": storage}
+        exec(_compile(request["code"]), namespace)
+
+        event_type = event.get("type")
+        if event_type == "action":
+            fn = namespace.get("on_action")
+            if not fn:
+                return {"success": False, "error": "on_action function not defined"}
+            call_handler(
+                fn, event.get("action"), event.get("payload") or {}, storage, timeout=TIMEOUT
+            )
+        elif event_type == "schedule":
+            fn = namespace.get("on_schedule")
+            if not fn:
+                return {"success": False, "error": "on_schedule function not defined"}
+            call_handler(fn, storage, timeout=TIMEOUT)
+        elif event_type == "init":
+            fn = namespace.get("on_init")
+            if fn:
+                call_handler(fn, storage, timeout=TIMEOUT)
+
+        return {"success": True, "error": None, "storage": storage}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}",
+        }
+
+
+def main() -> None:
+    """Serve requests until stdin closes."""
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # Handler prints must not corrupt the protocol stream
+    sys.stdout = sys.stderr
+    _limit_memory()
+    # Per-request peak memory; the overhead is confined to this sandbox worker
+    tracemalloc.start()
+
+    while True:
+        request = read_message(stdin)
+        if request is None:
+            break
+        _limit_cpu()
+        write_message(stdout, handle(request))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,27 @@
 import time
 import json
 import httpx
+import asyncio
+import hashlib
 import builtins
+import threading
 import traceback
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
+from types import CodeType
 
+from app.config import (
+    HANDLER_CODE_CACHE_SIZE,
+    HANDLER_MAX_OUTPUT_BYTES,
+    HANDLER_TIMEOUT,
+    HANDLER_TIMEOUT_GRACE,
+    SANDBOX_CPU_SECONDS,
+)
 from .executor import SandboxExecutor
+from .http_client import HandlerHttpClient, HttpxShim, SharedAsyncTransport, get_shared_client
+from .limits import HandlerLimitExceeded, Watchdog, output_size
 from .protocol import HandlerContext, HandlerResult, EventType
+from .runner import call_handler
 
 
 class SimpleExecutor(SandboxExecutor):
@@ -16,10 +31,31 @@ class SimpleExecutor(SandboxExecutor):
     Simple executor using exec().
     
     WARNING: Not secure for production! Use Docker executor for untrusted code.
+    
+    Entry points may be ``async def``; they run on their own event loop with
+    an ``async_http`` httpx.AsyncClient (sending through the shared client)
+    and are cancelled after ``timeout``.
+    A watchdog interrupts handlers exceeding ``timeout`` or ``cpu_seconds``
+    (see limits.py); peak memory is not measured in-process. Each run gets its
+    own daemon thread, abandoned if the handler is still running ``grace``
+    seconds past ``timeout``.
     """
     
+    def __init__(
+        self,
+        timeout: float = HANDLER_TIMEOUT,
+        cpu_seconds: float = SANDBOX_CPU_SECONDS,
+        max_output_bytes: int = HANDLER_MAX_OUTPUT_BYTES,
+        grace: float = HANDLER_TIMEOUT_GRACE,
+    ):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.max_output_bytes = max_output_bytes
+        self.grace = grace
+    
     # Pre-imported modules available to handlers
     ALLOWED_MODULES = {
+        'asyncio': asyncio,
         'time': time,
         'json': json,
         'httpx': httpx,
@@ -28,37 +64,114 @@ class SimpleExecutor(SandboxExecutor):
         'timedelta': timedelta,
     }
     
+    # Compiled handler modules keyed by source hash, shared across instances
+    _code_cache: OrderedDict[str, CodeType] = OrderedDict()
+    _code_lock = threading.Lock()
+    
+    @classmethod
+    def compile_handler(cls, code: str) -> CodeType:
+        """Strip imports and compile handler source, reusing cached code objects."""
+        key = hashlib.sha256(code.encode()).hexdigest()
+        with cls._code_lock:
+            compiled = cls._code_cache.get(key)
+            if compiled is not None:
+                cls._code_cache.move_to_end(key)
+                return compiled
+        
+        # Remove import statements - modules are pre-provided
+        lines = code.split('\n')
+        filtered_lines = []
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('import ') or stripped.startswith('from '):
+                continue
+            filtered_lines.append(line)
+        compiled = compile('\n'.join(filtered_lines), '<handler>', 'exec')
+        
+        with cls._code_lock:
+            cls._code_cache[key] = compiled
+            while len(cls._code_cache) > HANDLER_CODE_CACHE_SIZE:
+                cls._code_cache.popitem(last=False)
+        return compiled
+    
     def execute(self, code: str, context: HandlerContext) -> HandlerResult:
-        """Execute handler code."""
+        """Execute handler code under the watchdog and account for its resource use."""
+        wall_start = time.perf_counter()
+        outcome: list[HandlerResult] = []
+        thread = threading.Thread(
+            target=self._watched, args=(code, context, outcome), name="handler-run", daemon=True
+        )
+        thread.start()
+        thread.join(self.timeout + self.grace if self.timeout > 0 else None)
+        if outcome:
+            result = outcome[0]
+        else:
+            # Handler swallowed the watchdog's interrupt; leave its thread behind.
+            # The run fails, so whatever it still does to storage is not written.
+            result = HandlerResult(
+                success=False,
+                error=f"Handler still running {self.grace}s after its time limit; abandoned",
+                timed_out=True,
+            )
+        
+        result.wall_ms = round((time.perf_counter() - wall_start) * 1000, 2)
+        if result.success:
+            result.output_bytes = output_size(context.storage)
+            if result.output_bytes > self.max_output_bytes:
+                result.success = False
+                result.error = (
+                    f"Storage output of {result.output_bytes} bytes exceeds "
+                    f"limit of {self.max_output_bytes}"
+                )
+        return result
+    
+    def _watched(self, code: str, context: HandlerContext, outcome: list) -> None:
+        """Thread target: run the handler under a watchdog and append its result."""
+        cpu_start = time.thread_time()
+        watchdog = Watchdog(threading.get_ident(), self.timeout, self.cpu_seconds)
+        try:
+            watchdog.start()
+            try:
+                result = self._run(code, context)
+            finally:
+                watchdog.stop()
+        except HandlerLimitExceeded:
+            result = HandlerResult(success=False, error=watchdog.reason, timed_out=True)
+        result.cpu_ms = round((time.thread_time() - cpu_start) * 1000, 2)
+        outcome.append(result)
+    
+    def _run(self, code: str, context: HandlerContext) -> HandlerResult:
+        """Compile and dispatch to the handler entry point for the event."""
         try:
-            # Remove import statements - modules are pre-provided
-            lines = code.split('\n')
-            filtered_lines = []
-            for line in lines:
-                stripped = line.strip()
-                if stripped.startswith('import ') or stripped.startswith('from '):
-                    continue
-                filtered_lines.append(line)
-            code = '\n'.join(filtered_lines)
+            compiled = self.compile_handler(code)
             
-            # Single namespace with full builtins (dev mode)
+            # Fresh namespace per call so module-level state never leaks between
+            # executions (or threads); re-running the compiled module is cheap.
+            # httpx/http (and async_http) route through the shared pooled, caching client.
+            shared = get_shared_client()
+            transport = SharedAsyncTransport(shared)
             namespace = {
                 '__builtins__': builtins,
                 **self.ALLOWED_MODULES,
+                'httpx': HttpxShim(shared),
+                'http': HandlerHttpClient(shared),
                 'storage': context.storage,
             }
             
-            # Execute the handler code
-            exec(code, namespace)
+            # Execute the handler module
+            exec(compiled, namespace)
             
             # Call the appropriate handler function
             if context.event.type == EventType.ACTION:
                 handler_fn = namespace.get('on_action')
                 if handler_fn:
-                    handler_fn(
+                    call_handler(
+                        handler_fn,
                         context.event.action,
                         context.event.payload or {},
-                        context.storage
+                        context.storage,
+                        timeout=self.timeout,
+                        http_transport=transport,
                     )
                 else:
                     return HandlerResult(success=False, error="on_action function not defined")
@@ -66,14 +179,18 @@ class SimpleExecutor(SandboxExecutor):
             elif context.event.type == EventType.SCHEDULE:
                 handler_fn = namespace.get('on_schedule')
                 if handler_fn:
-                    handler_fn(context.storage)
+                    call_handler(
+                        handler_fn, context.storage, timeout=self.timeout, http_transport=transport
+                    )
                 else:
                     return HandlerResult(success=False, error="on_schedule function not defined")
             
             elif context.event.type == EventType.INIT:
                 handler_fn = namespace.get('on_init')
                 if handler_fn:
-                    handler_fn(context.storage)
+                    call_handler(
+                        handler_fn, context.storage, timeout=self.timeout, http_transport=transport
+                    )
                 # on_init is optional, no error if not defined
             
             return HandlerResult(success=True)
@@ -0,0 +1,151 @@
+"""Change feed - fan out writes made by other workers to the in-process event bus.
+
+Uses a MongoDB change stream when the server supports it (replica set or
+sharded cluster) and falls back to polling updated_at on a standalone mongod.
+Writes made by this process are skipped via their "origin" stamp, since the
+models already published them locally.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app import db
+from app.config import CHANGE_FEED, CHANGE_POLL_INTERVAL
+from app.services import events
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ["panels", "storages", "tasks", "dashboards"]
+
+# Server error codes meaning change streams are unavailable on this deployment
+_UNSUPPORTED_CODES = {40573, 40324, 136}
+
+_task: asyncio.Task | None = None
+_mode: str | None = None
+
+
+def _is_remote(doc: dict | None) -> bool:
+    return doc is None or doc.get("origin") != db.PROCESS_ID
+
+
+async def _watch() -> None:
+    """Consume the database change stream, resuming after transient errors."""
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": WATCHED_COLLECTIONS},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.get_db().watch(
+                pipeline, full_document="updateLookup", resume_after=resume_token
+            ) as stream:
+                logger.info("Change feed: watching %s", ", ".join(WATCHED_COLLECTIONS))
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    if _is_remote(change.get("fullDocument")):
+                        events.publish(change["ns"]["coll"], [change["documentKey"]["_id"]])
+        except OperationFailure as e:
+            if e.code in _UNSUPPORTED_CODES:
+                raise
+            logger.warning("Change stream failed, resuming: %s", e)
+            if e.code == 286:  # ChangeStreamHistoryLost: token is too old to resume from
+                resume_token = None
+        except PyMongoError as e:
+            logger.warning("Change stream interrupted, resuming: %s", e)
+        await asyncio.sleep(1)
+
+
+def _stamp(doc: dict) -> datetime:
+    return max(doc[key] for key in ("updated_at", "deleted_at") if doc.get(key))
+
+
+def _change_key(doc: dict) -> tuple:
+    return doc["_id"], _stamp(doc), doc.get("version")
+
+
+async def _poll_collection(
+    name: str, since: datetime, seen: set[tuple]
+) -> tuple[datetime, set[tuple]]:
+    """Publish documents in one collection changed at or after since.
+
+    The query is inclusive so a write sharing the newest timestamp of the last
+    pass isn't missed; seen holds the changes already published at since.
+    Returns the new (since, seen).
+    """
+    query = {
+        "$or": [{"updated_at": {"$gte": since}}, {"deleted_at": {"$gte": since}}],
+        "origin": {"$ne": db.PROCESS_ID},
+    }
+    docs = await db.get_db()[name].find(
+        query, {"updated_at": 1, "deleted_at": 1, "version": 1}
+    ).to_list(None)
+    fresh = [doc for doc in docs if _change_key(doc) not in seen]
+    if not fresh:
+        return since, seen
+    latest = max(_stamp(doc) for doc in docs)
+    if latest > since:
+        since, seen = latest, set()
+    seen |= {_change_key(doc) for doc in docs if _stamp(doc) == latest}
+    events.publish(name, [doc["_id"] for doc in fresh])
+    return since, seen
+
+
+async def _poll() -> None:
+    """Poll each collection for documents updated or deleted since the last pass."""
+    since = {name: datetime.now() for name in WATCHED_COLLECTIONS}
+    seen: dict[str, set[tuple]] = {name: set() for name in WATCHED_COLLECTIONS}
+    logger.info("Change feed: polling every %.1fs", CHANGE_POLL_INTERVAL)
+    while True:
+        await asyncio.sleep(CHANGE_POLL_INTERVAL)
+        for name in WATCHED_COLLECTIONS:
+            try:
+                since[name], seen[name] = await _poll_collection(name, since[name], seen[name])
+            except PyMongoError as e:
+                logger.warning("Change poll on %s failed: %s", name, e)
+
+
+async def _run(mode: str) -> None:
+    global _mode
+    if mode in ("auto", "stream"):
+        _mode = "stream"
+        try:
+            await _watch()
+        except OperationFailure as e:
+            if mode == "stream":
+                logger.error("Change streams unavailable: %s", e)
+                _mode = None
+                return
+            logger.info("Change streams unavailable (%s), falling back to polling", e.code)
+    _mode = "poll"
+    await _poll()
+
+
+def start_change_feed(mode: str = CHANGE_FEED) -> None:
+    """Start the background change feed. Call during app startup."""
+    global _task
+    if mode == "off" or _task is not None:
+        return
+    _task = asyncio.create_task(_run(mode))
+
+
+async def stop_change_feed() -> None:
+    """Cancel the change feed. Call during app shutdown."""
+    global _task, _mode
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    _mode = None
+
+
+def status() -> dict:
+    """Current change feed mode ("stream", "poll" or None when stopped)."""
+    return {"mode": _mode, "process_id": db.PROCESS_ID}
@@ -5,6 +5,7 @@ from typing import Any
 
 from app import db
 from app.models.panel import Panel
+from app.services import events
 
 
 async def get_dashboard_layout(dashboard_id: str = "default") -> dict[str, Any]:
@@ -20,8 +21,10 @@ async def get_dashboard_layout(dashboard_id: str = "default") -> dict[str, Any]:
             "userPreferences": {},
             "created_at": datetime.now(),
             "updated_at": datetime.now(),
+            "origin": db.PROCESS_ID,
         }
         await db.dashboards_col().insert_one(doc)
+        events.publish("dashboards", [dashboard_id])
     return doc
 
 
@@ -29,11 +32,13 @@ async def save_dashboard_layout(data: dict[str, Any], dashboard_id: str = "defau
     """Save dashboard layout."""
     data["version"] = 2
     data["updated_at"] = datetime.now()
+    data["origin"] = db.PROCESS_ID
     await db.dashboards_col().update_one(
         {"_id": dashboard_id},
         {"$set": data},
         upsert=True,
     )
+    events.publish("dashboards", [dashboard_id])
 
 
 async def get_panel_layout(panel_id: str, dashboard_id: str = "default") -> dict | None:
@@ -160,14 +165,24 @@ async def update_panel_positions(
     await save_dashboard_layout(layout, dashboard_id)
 
 
-async def get_dashboard(enrich: bool = True, dashboard_id: str = "default") -> dict[str, Any]:
-    """Get full dashboard with panel data merged."""
+async def get_dashboard(
+    enrich: bool = True, dashboard_id: str = "default", include_code: bool = False
+) -> dict[str, Any]:
+    """Get full dashboard with panel data merged.
+
+    Panels are bulk-loaded in one query; facade/handler bodies are skipped
+    unless include_code is set.
+    """
     layout = await get_dashboard_layout(dashboard_id)
+    layout_panels = layout.get("panels", [])
+
+    loaded = await Panel.load_many(
+        list({p.get("id") for p in layout_panels}), include_code=include_code
+    )
 
     panels = []
-    for idx, panel_layout in enumerate(layout.get("panels", [])):
-        panel_id = panel_layout.get("id")
-        panel = await Panel.load(panel_id)
+    for idx, panel_layout in enumerate(layout_panels):
+        panel = loaded.get(panel_layout.get("id"))
 
         if panel:
             panel_dict = panel.to_dict()
@@ -176,6 +191,9 @@ async def get_dashboard(enrich: bool = True, dashboard_id: str = "default") -> d
                 "size": panel_layout.get("size", panel.size or "3x2"),
                 "order": panel_layout.get("order", idx),
             })
+            if include_code:
+                panel_dict["template"] = panel.get_template()
+                panel_dict["handler"] = panel.get_handler()
             panels.append(panel_dict)
 
     panels.sort(key=lambda p: p.get("order", 0))
@@ -216,16 +234,20 @@ async def create_dashboard(dashboard_id: str, name: str, user_id: str = "default
         "userPreferences": {},
         "created_at": datetime.now(),
         "updated_at": datetime.now(),
+        "origin": db.PROCESS_ID,
     }
     await db.dashboards_col().insert_one(doc)
+    events.publish("dashboards", [dashboard_id])
     return {"id": dashboard_id, "name": name}
 
 
 async def rename_dashboard(dashboard_id: str, name: str) -> bool:
     """Rename a dashboard."""
     r = await db.dashboards_col().update_one(
-        {"_id": dashboard_id}, {"$set": {"name": name, "updated_at": datetime.now()}}
+        {"_id": dashboard_id},
+        {"$set": {"name": name, "updated_at": datetime.now(), "origin": db.PROCESS_ID}},
     )
+    events.publish("dashboards", [dashboard_id])
     return r.modified_count > 0
 
 
@@ -234,12 +256,18 @@ async def delete_dashboard(dashboard_id: str) -> bool:
     if dashboard_id == "default":
         return False
     r = await db.dashboards_col().delete_one({"_id": dashboard_id})
+    events.publish("dashboards", [dashboard_id])
     return r.deleted_count > 0
 
 
 async def remove_panel_from_all_dashboards(panel_id: str) -> None:
     """Remove a panel from all dashboards (used when panel is deleted)."""
+    ids = await db.dashboards_col().distinct("_id", {"panels.id": panel_id})
     await db.dashboards_col().update_many(
         {"panels.id": panel_id},
-        {"$pull": {"panels": {"id": panel_id}}, "$set": {"updated_at": datetime.now()}},
+        {
+            "$pull": {"panels": {"id": panel_id}},
+            "$set": {"updated_at": datetime.now(), "origin": db.PROCESS_ID},
+        },
     )
+    events.publish("dashboards", ids)
@@ -0,0 +1,70 @@
+"""Event bus - in-process pub/sub for data change notifications.
+
+Models publish {"collection": ..., "ids": [...]} after writes. Caches register
+synchronous listeners to invalidate inline; long-lived consumers such as the
+live dashboard stream subscribe with their own bounded queue.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_listeners: list[Callable[[str, list[str]], None]] = []
+_subscribers: dict[asyncio.Queue, set[str] | None] = {}
+
+
+def add_listener(fn: Callable[[str, list[str]], None]) -> None:
+    """Register a callback invoked synchronously as fn(collection, ids) on publish."""
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+def publish(collection: str, ids: list[str]) -> None:
+    """Notify listeners and subscribers that documents in a collection changed."""
+    if not ids:
+        return
+    ids = list(ids)
+    for fn in _listeners:
+        try:
+            fn(collection, ids)
+        except Exception:
+            logger.exception("Event listener failed for %s", collection)
+
+    event = {"collection": collection, "ids": ids}
+    for queue, collections in list(_subscribers.items()):
+        if collections is not None and collection not in collections:
+            continue
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping %s change event for slow subscriber", collection)
+
+
+def subscribe(collections: set[str] | None = None, maxsize: int = 256) -> asyncio.Queue:
+    """Register a queue receiving events for the given collections (None = all)."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    _subscribers[queue] = collections
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue) -> None:
+    """Stop delivering events to a queue."""
+    _subscribers.pop(queue, None)
+
+
+@contextmanager
+def subscription(collections: set[str] | None = None) -> Iterator[asyncio.Queue]:
+    """Context-managed subscribe/unsubscribe."""
+    queue = subscribe(collections)
+    try:
+        yield queue
+    finally:
+        unsubscribe(queue)
+
+
+def subscriber_count() -> int:
+    """Number of active subscribers."""
+    return len(_subscribers)
@@ -0,0 +1,65 @@
+"""Handler stats - per panel/task aggregates of handler resource usage (in-process)."""
+
+import threading
+
+from app.sandbox import HandlerResult
+
+# (kind, id) -> running totals; kind is "panel" or "task"
+_stats: dict[tuple[str, str], dict] = {}
+_lock = threading.Lock()
+
+
+def record(kind: str, owner_id: str, result: HandlerResult) -> None:
+    """Fold one execution's accounting into the owner's totals."""
+    with _lock:
+        s = _stats.setdefault((kind, owner_id), {
+            "runs": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "wall_ms_total": 0.0,
+            "wall_ms_max": 0.0,
+            "cpu_ms_total": 0.0,
+            "cpu_ms_max": 0.0,
+            "peak_memory_kb_max": None,
+            "output_bytes_max": None,
+            "output_bytes_last": None,
+        })
+        s["runs"] += 1
+        s["failures"] += 0 if result.success else 1
+        s["timeouts"] += 1 if result.timed_out else 0
+        for metric in ("wall_ms", "cpu_ms"):
+            value = getattr(result, metric) or 0.0
+            s[f"{metric}_total"] += value
+            s[f"{metric}_max"] = max(s[f"{metric}_max"], value)
+        if result.peak_memory_kb is not None:
+            s["peak_memory_kb_max"] = max(s["peak_memory_kb_max"] or 0, result.peak_memory_kb)
+        if result.output_bytes is not None:
+            s["output_bytes_max"] = max(s["output_bytes_max"] or 0, result.output_bytes)
+            s["output_bytes_last"] = result.output_bytes
+
+
+def _summary(kind: str, owner_id: str, s: dict) -> dict:
+    return {
+        "kind": kind,
+        "id": owner_id,
+        **s,
+        "wall_ms_total": round(s["wall_ms_total"], 2),
+        "cpu_ms_total": round(s["cpu_ms_total"], 2),
+        "wall_ms_avg": round(s["wall_ms_total"] / s["runs"], 2),
+        "cpu_ms_avg": round(s["cpu_ms_total"] / s["runs"], 2),
+    }
+
+
+def get(kind: str, owner_id: str) -> dict | None:
+    """Totals for one panel or task since process start."""
+    with _lock:
+        s = _stats.get((kind, owner_id))
+        return _summary(kind, owner_id, dict(s)) if s else None
+
+
+def top(kind: str, sort: str = "cpu_ms_total", limit: int = 50) -> list[dict]:
+    """Most expensive panels or tasks by the given summary field."""
+    with _lock:
+        rows = [_summary(k, oid, dict(s)) for (k, oid), s in _stats.items() if k == kind]
+    rows.sort(key=lambda r: r.get(sort) or 0, reverse=True)
+    return rows[:limit]
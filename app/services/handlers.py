@@ -0,0 +1,162 @@
+"""Handler runner - execute a handler against its storages with optimistic retries."""
+
+import asyncio
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.config import HANDLER_CONCURRENCY, SANDBOX_EXECUTOR, STORAGE_CONFLICT_RETRIES
+from app.sandbox import HandlerContext, HandlerEvent, HandlerResult, get_executor
+from app.services import handler_stats
+from app.services.storage import load_storages_for_handler, save_storages_from_context
+
+# Created lazily so it binds to the running event loop
+_slots: asyncio.Semaphore | None = None
+_slots_in_use = 0
+# Entries disappear once no caller holds or waits on the lock
+_storage_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+@asynccontextmanager
+async def _handler_slot() -> AsyncIterator[None]:
+    """Hold one of HANDLER_CONCURRENCY handler slots for the duration."""
+    global _slots, _slots_in_use
+    if _slots is None:
+        _slots = asyncio.Semaphore(HANDLER_CONCURRENCY)
+    async with _slots:
+        _slots_in_use += 1
+        try:
+            yield
+        finally:
+            _slots_in_use -= 1
+
+
+@asynccontextmanager
+async def storage_locks(storage_ids: list[str]) -> AsyncIterator[None]:
+    """Hold an exclusive in-process lock on each storage for the duration.
+
+    Locks are taken in sorted order so callers with overlapping storages
+    cannot deadlock.
+    """
+    locks = []
+    for sid in sorted(set(storage_ids)):
+        lock = _storage_locks.get(sid)
+        if lock is None:
+            lock = _storage_locks[sid] = asyncio.Lock()
+        locks.append(lock)
+    acquired = []
+    try:
+        for lock in locks:
+            await lock.acquire()
+            acquired.append(lock)
+        yield
+    finally:
+        for lock in reversed(acquired):
+            lock.release()
+
+
+def concurrency_stats() -> dict:
+    """Handler slots in use out of HANDLER_CONCURRENCY."""
+    return {
+        "limit": HANDLER_CONCURRENCY,
+        "in_use": _slots_in_use,
+        "locked_storages": sorted(sid for sid, lock in _storage_locks.items() if lock.locked()),
+    }
+
+
+def _record_usage(result: HandlerResult, panel_id: str | None, task_id: str | None) -> dict:
+    if task_id:
+        handler_stats.record("task", task_id, result)
+    elif panel_id:
+        handler_stats.record("panel", panel_id, result)
+    return {
+        "wall_ms": result.wall_ms,
+        "cpu_ms": result.cpu_ms,
+        "peak_memory_kb": result.peak_memory_kb,
+        "output_bytes": result.output_bytes,
+        "timed_out": result.timed_out,
+    }
+
+
+async def run_handler(
+    code: str,
+    storage_ids: list[str],
+    event: HandlerEvent,
+    panel_id: str | None = None,
+    task_id: str | None = None,
+) -> dict:
+    """Load storages, execute handler code and write changed storages back.
+
+    Write-back is a compare-and-set per storage. If another writer got there
+    first, the handler is re-run on fresh data and only the storages that lost
+    the race are written again, so changes that already landed are not applied
+    twice.
+
+    At most HANDLER_CONCURRENCY handlers execute at once; the rest wait for a
+    slot. Results carry "timings": seconds spent loading storages, waiting
+    for a slot, running the handler and saving storages, summed over attempts;
+    and "usage": the executor's resource accounting for the last attempt.
+    Usage is also aggregated per panel/task in handler_stats.
+    """
+    write_ids = list(storage_ids)
+    written: list[str] = []
+    timings = {"load": 0.0, "wait": 0.0, "handler": 0.0, "save": 0.0}
+    usage: dict = {}
+
+    for attempt in range(1, STORAGE_CONFLICT_RETRIES + 2):
+        start = time.perf_counter()
+        storage_context, snapshot = await load_storages_for_handler(storage_ids)
+        timings["load"] += time.perf_counter() - start
+
+        context = HandlerContext(
+            panel_id=panel_id,
+            task_id=task_id,
+            storage=storage_context,
+            event=event,
+        )
+
+        executor = get_executor(SANDBOX_EXECUTOR)
+        start = time.perf_counter()
+        async with _handler_slot():
+            timings["wait"] += time.perf_counter() - start
+            start = time.perf_counter()
+            result = await executor.execute_async(code, context)
+        timings["handler"] += time.perf_counter() - start
+        usage = _record_usage(result, panel_id, task_id)
+
+        if not result.success:
+            return {
+                "success": False,
+                "error": result.error,
+                "storage_ids": written,
+                "attempts": attempt,
+                "timings": timings,
+                "usage": usage,
+            }
+
+        start = time.perf_counter()
+        write_back = await save_storages_from_context(write_ids, storage_context, snapshot)
+        timings["save"] += time.perf_counter() - start
+        written.extend(write_back.written)
+        if not write_back.conflicts:
+            return {
+                "success": True,
+                "storage_ids": written,
+                "attempts": attempt,
+                "timings": timings,
+                "usage": usage,
+            }
+
+        write_ids = write_back.conflicts
+        await asyncio.sleep(random.uniform(0, 0.01 * attempt))
+
+    return {
+        "success": False,
+        "error": f"Storage write conflict on: {', '.join(write_ids)}",
+        "storage_ids": written,
+        "attempts": STORAGE_CONFLICT_RETRIES + 1,
+        "timings": timings,
+        "usage": usage,
+    }
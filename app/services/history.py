@@ -1,157 +1,340 @@
 """
 History service - 管理卡片数据的历史记录
 
-数据存储在 data/history/{source}/ 目录下
-文件命名：
-- 按天: 2026-02-19.json
-- 按小时: 2026-02-19_14.json
-- 按时刻: 2026-02-19_14-30-00.json
+存储后端由 HISTORY_BACKEND 选择：
+- "file": data/history 下的只追加段文件（默认，适合开发 / 单实例）
+- "mongo": MongoDB 时间序列集合，多副本共享
+
+每条记录为 {"timestamp": ..., "data": ...}。granularity 决定一条记录代表的
+周期（天 / 小时 / 秒），同一周期内多次写入时读取只返回最后一条。
+
+读取以异步生成器 iter_history 为主，后端分批产出记录，长范围查询的内存
+占用与范围无关；read_history 把它收集成列表，供需要整份结果的调用方使用。
+
+保留策略：原始记录保留 HISTORY_RAW_DAYS 天、小时汇总 HISTORY_HOURLY_DAYS 天、
+天汇总 HISTORY_DAILY_DAYS 天（0 为永久），HISTORY_RETENTION 可按数据源覆盖。
+compact_history 由调度器 leader 定期执行，删除过期数据并压缩已结束的天。
 """
 
-import json
-from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any, Optional, Literal
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional, Literal
+
+from app.config import (
+    HISTORY_BACKEND,
+    HISTORY_DAILY_DAYS,
+    HISTORY_HOURLY_DAYS,
+    HISTORY_RAW_DAYS,
+    HISTORY_RETENTION,
+)
+from app.services import history_rollup as rollup
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryBackend(ABC):
+    """Abstract base class for history storage backends."""
+
+    @abstractmethod
+    async def append(self, source: str, ts: datetime, period: datetime, record: dict) -> None:
+        """
+        Store a record and fold its numeric fields into the hour/day rollups.
+
+        Args:
+            source: 数据源名称
+            ts: 记录时间 (UTC)
+            period: 记录所属周期的起点，同一周期只保留最后一条
+            record: {"timestamp": ..., "data": ...}
+        """
+
+    @abstractmethod
+    def iter_batches(self, source: str, cutoff: datetime) -> AsyncIterator[list[dict]]:
+        """Records at or after cutoff in batches, oldest first, last one per period."""
+
+    @abstractmethod
+    async def read_rollups(
+        self, source: str, level: str, cutoff: datetime
+    ) -> list[tuple[float, dict]]:
+        """(bucket start, bucket) pairs of a rollup level from cutoff's bucket on, oldest first."""
+
+    @abstractmethod
+    async def latest(self, source: str) -> Optional[dict]:
+        """The newest record, or None."""
+
+    @abstractmethod
+    async def sources(self) -> list[str]:
+        """Names of sources with history."""
+
+    async def migrate(self) -> None:
+        """One-time upgrade of data written in older formats; run once at startup."""
+
+    @abstractmethod
+    async def compact(
+        self,
+        source: str,
+        raw_cutoff: Optional[datetime],
+        hourly_cutoff: Optional[datetime],
+        daily_cutoff: Optional[datetime],
+    ) -> dict:
+        """
+        Apply retention to a source and compact what is left.
+
+        Args:
+            source: 数据源名称
+            raw_cutoff: 删除早于此时间的原始记录，None 为不删
+            hourly_cutoff: 删除整桶早于此时间的小时汇总，None 为不删
+            daily_cutoff: 删除整桶早于此时间的天汇总，None 为不删
+
+        Returns:
+            统计，如 {"raw_removed": ..., "rollups_removed": ..., "bytes_reclaimed": ...}
+        """
+
+
+@dataclass
+class RetentionPolicy:
+    """Days to keep each tier of a source's history; 0 keeps it forever."""
 
-from app.config import DATA_DIR
+    raw_days: float = HISTORY_RAW_DAYS
+    hourly_days: float = HISTORY_HOURLY_DAYS
+    daily_days: float = HISTORY_DAILY_DAYS
 
-HISTORY_DIR = DATA_DIR / "history"
 
+def retention_for(source: str) -> RetentionPolicy:
+    """数据源的保留策略，HISTORY_RETENTION 中的覆盖项优先"""
+    return RetentionPolicy(**HISTORY_RETENTION.get(source, {}))
 
-def _ensure_dir(source: str) -> Path:
-    """确保数据源目录存在"""
-    dir_path = HISTORY_DIR / source
-    dir_path.mkdir(parents=True, exist_ok=True)
-    return dir_path
 
+_backend: HistoryBackend | None = None
 
-def write_history(
+
+def get_backend() -> HistoryBackend:
+    """Get the configured history backend."""
+    global _backend
+    if _backend is None:
+        if HISTORY_BACKEND == "mongo":
+            from app.services.history_mongo import MongoHistoryBackend
+            _backend = MongoHistoryBackend()
+        else:
+            from app.services.history_file import FileHistoryBackend
+            _backend = FileHistoryBackend()
+    return _backend
+
+
+def _format_ts(ts: datetime) -> str:
+    return ts.isoformat().replace("+00:00", "Z")
+
+
+def _parse_range(range: str) -> datetime:
+    """把 "7d" / "24h" 之类的范围转换为起始时间"""
+    try:
+        amount = int(range[:-1])
+        unit = range[-1]
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid range: {range!r} (use e.g. 24h, 7d)")
+
+    now = datetime.now(timezone.utc)
+    if unit == "d":
+        return now - timedelta(days=amount)
+    if unit == "h":
+        return now - timedelta(hours=amount)
+    return now
+
+
+async def write_history(
     source: str,
     data: Any,
     granularity: Literal["day", "hour", "minute"] = "day",
     timestamp: Optional[datetime] = None,
-) -> Path:
+) -> dict:
     """
     写入历史记录
-    
+
     Args:
         source: 数据源名称 (如 "weather", "crypto")
         data: 要存储的数据
-        granularity: 时间粒度
+        granularity: 时间粒度，同一周期内只有最后一次写入会被读到
         timestamp: 时间戳，默认当前时间
-    
+
     Returns:
-        写入的文件路径
+        写入的记录
     """
-    dir_path = _ensure_dir(source)
-    ts = timestamp or datetime.now(timezone.utc)
-    
-    if granularity == "day":
-        filename = ts.strftime("%Y-%m-%d.json")
-    elif granularity == "hour":
-        filename = ts.strftime("%Y-%m-%d_%H.json")
-    else:  # minute
-        filename = ts.strftime("%Y-%m-%d_%H-%M-%S.json")
-    
-    file_path = dir_path / filename
-    
+    ts = (timestamp or datetime.now(timezone.utc)).astimezone(timezone.utc)
     record = {
-        "timestamp": ts.isoformat().replace("+00:00", "Z"),
+        "timestamp": _format_ts(ts),
         "data": data,
     }
-    
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(record, f, ensure_ascii=False, indent=2)
-    
-    return file_path
+    await get_backend().append(source, ts, rollup.period_start(ts, granularity), record)
+    return record
 
 
-def read_latest(source: str) -> Optional[dict]:
+async def read_latest(source: str) -> Optional[dict]:
     """
     读取最新的历史记录
-    
+
     Args:
         source: 数据源名称
-    
+
     Returns:
         最新记录的 data 字段，或 None
     """
-    dir_path = HISTORY_DIR / source
-    if not dir_path.exists():
-        return None
-    
-    # 按文件名倒序，取最新的
-    files = sorted(dir_path.glob("*.json"), reverse=True)
-    if not files:
-        return None
-    
-    with open(files[0], "r", encoding="utf-8") as f:
-        record = json.load(f)
-    
-    return record.get("data")
-
-
-def read_history(
+    record = await get_backend().latest(source)
+    return record.get("data") if record else None
+
+
+async def _iter_raw(source: str, cutoff: datetime) -> AsyncIterator[dict]:
+    async for batch in get_backend().iter_batches(source, cutoff):
+        for record in batch:
+            yield record
+
+
+async def _iter_aggregated(source: str, cutoff: datetime, size: int) -> AsyncIterator[dict]:
+    """从原始记录逐批聚合；批次边界落在桶中间时与下一批的首桶合并"""
+    current: tuple[float, dict] | None = None
+    async for batch in get_backend().iter_batches(source, cutoff):
+        for start, bucket in rollup.aggregate(batch, size):
+            if current is not None and current[0] == start:
+                rollup.merge(current[1], bucket)
+                continue
+            if current is not None:
+                yield rollup.to_point(*current)
+            current = (start, bucket)
+    if current is not None:
+        yield rollup.to_point(*current)
+
+
+async def _iter_rollups(
+    source: str, level: str, cutoff: datetime, size: int
+) -> AsyncIterator[dict]:
+    buckets = await get_backend().read_rollups(source, level, cutoff)
+    for start, bucket in rollup.regroup(buckets, size):
+        yield rollup.to_point(start, bucket)
+
+
+def iter_history(
     source: str,
     range: str = "7d",
-) -> list[dict]:
+    max_points: Optional[int] = None,
+    resolution: Optional[str] = None,
+) -> AsyncIterator[dict]:
     """
-    读取历史记录
-    
+    流式读取历史记录（参数校验在调用时立即进行，不会推迟到第一次迭代）
+
     Args:
         source: 数据源名称
         range: 时间范围 (如 "7d", "24h", "30d")
-    
+        max_points: 最多返回的点数，超过时按桶聚合
+        resolution: 指定桶宽 (如 "5m", "1h", "1d")，优先于 max_points
+
     Returns:
-        历史记录列表 [{"timestamp": ..., "data": ...}, ...]
+        按时间升序产出的异步迭代器。不聚合时为原始记录
+        {"timestamp": ..., "data": ...}；聚合时每个点为
+        {"timestamp": 桶起点, "count": 记录数,
+        "data": {字段路径: {"min", "max", "avg", "last"}}}，只含数值字段
+
+    Raises:
+        ValueError: range 或 resolution 格式不正确
     """
-    dir_path = HISTORY_DIR / source
-    if not dir_path.exists():
-        return []
-    
-    # 解析范围
-    amount = int(range[:-1])
-    unit = range[-1]
-    
+    cutoff = _parse_range(range)
+    if resolution is None and max_points is None:
+        return _iter_raw(source, cutoff)
+
     now = datetime.now(timezone.utc)
-    
-    if unit == "d":
-        # 按天筛选
-        from datetime import timedelta
-        cutoff = now - timedelta(days=amount)
-    elif unit == "h":
-        from datetime import timedelta
-        cutoff = now - timedelta(hours=amount)
+    if resolution is not None:
+        size = rollup.parse_duration(resolution)
     else:
-        cutoff = now
-    
-    records = []
-    for file_path in sorted(dir_path.glob("*.json")):
-        # 从文件名解析时间（粗略判断）
-        name = file_path.stem  # 如 "2026-02-19" 或 "2026-02-19_14"
-        try:
-            if "_" in name:
-                if "-" in name.split("_")[1]:
-                    # minute: 2026-02-19_14-30-00
-                    file_time = datetime.strptime(name, "%Y-%m-%d_%H-%M-%S").replace(tzinfo=timezone.utc)
-                else:
-                    # hour: 2026-02-19_14
-                    file_time = datetime.strptime(name, "%Y-%m-%d_%H").replace(tzinfo=timezone.utc)
-            else:
-                # day: 2026-02-19
-                file_time = datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-            
-            if file_time >= cutoff:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    records.append(json.load(f))
-        except ValueError:
-            continue
-    
-    return records
-
-
-def list_sources() -> list[str]:
+        size = rollup.bucket_seconds((now - cutoff).total_seconds(), max_points)
+    if max_points:
+        # 只从最近 max_points 个桶的起点读起，无需先取全部再截断
+        first = rollup.bucket_start(now.timestamp(), size) - (max_points - 1) * size
+        cutoff = max(cutoff, datetime.fromtimestamp(first, timezone.utc))
+
+    # 桶宽是整天 / 整小时的倍数时由预计算汇总合并，否则从原始记录临时聚合
+    if size % rollup.DAY == 0:
+        return _iter_rollups(source, "day", cutoff, size)
+    if size % rollup.HOUR == 0:
+        return _iter_rollups(source, "hour", cutoff, size)
+    return _iter_aggregated(source, cutoff, size)
+
+
+async def read_history(
+    source: str,
+    range: str = "7d",
+    max_points: Optional[int] = None,
+    resolution: Optional[str] = None,
+) -> list[dict]:
+    """
+    读取历史记录，参数与返回的元素同 iter_history
+
+    Raises:
+        ValueError: range 或 resolution 格式不正确
+    """
+    return [item async for item in iter_history(source, range, max_points, resolution)]
+
+
+async def migrate_history() -> None:
+    """启动时把旧格式的历史数据升级到当前格式，不在请求路径上做"""
+    await get_backend().migrate()
+
+
+async def list_sources() -> list[str]:
     """列出所有数据源"""
-    if not HISTORY_DIR.exists():
-        return []
-    return [d.name for d in HISTORY_DIR.iterdir() if d.is_dir()]
+    return await get_backend().sources()
+
+
+def _cutoff(now: datetime, days: float) -> Optional[datetime]:
+    return now - timedelta(days=days) if days > 0 else None
+
+
+async def compact_history() -> dict:
+    """
+    对所有数据源执行保留策略并压缩
+
+    Returns:
+        {"finished_at", "duration_ms", "backend", "totals": {...}, "sources": {source: {...}}}；
+        file 后端的统计含 bytes_before / bytes_after / bytes_reclaimed
+    """
+    backend = get_backend()
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+
+    sources = {}
+    for source in await backend.sources():
+        try:
+            policy = retention_for(source)
+            report = await backend.compact(
+                source,
+                _cutoff(now, policy.raw_days),
+                _cutoff(now, policy.hourly_days),
+                _cutoff(now, policy.daily_days),
+            )
+        except Exception as e:
+            # 一个数据源出错（如覆盖项写错）不影响其余数据源
+            logger.exception("History compaction failed for %s", source)
+            report = {"error": str(e)}
+        if report:
+            sources[source] = report
+
+    totals: dict[str, int] = {}
+    for report in sources.values():
+        for key, value in report.items():
+            if isinstance(value, int):
+                totals[key] = totals.get(key, 0) + value
+
+    summary = {
+        "finished_at": _format_ts(datetime.now(timezone.utc)),
+        "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        "backend": HISTORY_BACKEND,
+        "totals": totals,
+        "sources": sources,
+    }
+    logger.info(
+        "History compaction: %d sources, %d raw removed, %d rollups removed, %d bytes reclaimed",
+        len(sources),
+        totals.get("raw_removed", 0),
+        totals.get("rollups_removed", 0),
+        totals.get("bytes_reclaimed", 0),
+    )
+    return summary
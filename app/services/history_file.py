@@ -0,0 +1,704 @@
+"""
+File history backend - 本地文件存储的历史记录（开发环境默认）
+
+数据存储在 data/history/{source}/ 目录下，每天一个只追加的段文件：
+- 2026-02-19.ndjson  每行一条记录 {"timestamp": ..., "data": ...}
+- 2026-02-19.idx     旁路时间索引，每条记录一项定长二进制
+                     (时间戳, 周期起点, 偏移, 长度)
+
+范围读取在索引上二分查找起点，直接 seek 到对应偏移，不再遍历目录、
+解析文件名或逐个打开文件。同一周期内的多次写入都会追加，读取时只保留
+该周期最后一条。
+
+写入时同时增量维护数值字段的小时 / 天汇总（见 history_rollup）：
+- rollups/hour-2026-02-19.json  当天 24 个小时桶
+- rollups/day-2026-02.json      当月每天一个桶
+
+旧格式（每条记录一个 JSON 文件，如 2026-02-19_14.json）在启动时由
+migrate() 按天批量并入段文件。
+
+压缩任务（compact）把已结束的天去重后写成 gzip 段：
+- 2026-02-19.ndjson.gz  同一周期只保留最后一条，按时间排序
+- 2026-02-19.gz.idx     对应的索引，偏移指向解压后的内容
+读取时优先使用 gzip 段；迟到的写入会先把该天解压回普通段。读者不加锁，
+先打开段和索引的句柄再读，之后压缩或解压删除文件不影响正在进行的读取。
+
+文件在本机磁盘上，多副本部署请用 HISTORY_BACKEND=mongo。
+"""
+
+import asyncio
+import bisect
+import fcntl
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Optional
+
+from app.config import DATA_DIR
+from app.services import history_rollup as rollup
+from app.services.history import HistoryBackend
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = DATA_DIR / "history"
+
+SEGMENT_SUFFIX = ".ndjson"
+COMPRESSED_SUFFIX = ".ndjson.gz"
+INDEX_SUFFIX = ".idx"
+ROLLUP_DIR = "rollups"
+
+# 预计算的汇总层级：名称 -> (桶宽秒数, 文件分片的 strftime 格式)
+_ROLLUP_LEVELS = {
+    "hour": (rollup.HOUR, "%Y-%m-%d"),
+    "day": (rollup.DAY, "%Y-%m"),
+}
+
+# 索引项：时间戳、周期起点 (epoch 秒)、段内偏移、记录长度 (字节)
+_ENTRY = struct.Struct("<ddQI")
+
+# 段路径 -> ((索引文件大小, 修改时间, inode), 按时间排序的索引项)
+_index_cache: dict[Path, tuple[tuple[int, int, int], list[tuple[float, float, int, int]]]] = {}
+_index_lock = threading.Lock()
+
+
+def _ensure_dir(source: str) -> Path:
+    """确保数据源目录存在"""
+    dir_path = HISTORY_DIR / source
+    dir_path.mkdir(parents=True, exist_ok=True)
+    return dir_path
+
+
+def _segment_path(dir_path: Path, day: date) -> Path:
+    return dir_path / f"{day.isoformat()}{SEGMENT_SUFFIX}"
+
+
+def _compressed_path(dir_path: Path, day: date) -> Path:
+    return dir_path / f"{day.isoformat()}{COMPRESSED_SUFFIX}"
+
+
+def _is_compressed(segment: Path) -> bool:
+    return segment.name.endswith(COMPRESSED_SUFFIX)
+
+
+def _index_path(segment: Path) -> Path:
+    """段的索引文件；gzip 段用单独的索引，替换过程中两份索引互不覆盖"""
+    day = segment.name.split(".", 1)[0]
+    suffix = f".gz{INDEX_SUFFIX}" if _is_compressed(segment) else INDEX_SUFFIX
+    return segment.parent / f"{day}{suffix}"
+
+
+def _segment_files(dir_path: Path) -> dict[str, Path]:
+    """日期名 -> 段文件，同一天同时存在两种段时取 gzip 段"""
+    files: dict[str, Path] = {}
+    for entry in os.scandir(dir_path):
+        name = entry.name
+        if name.endswith(COMPRESSED_SUFFIX):
+            files[name[:-len(COMPRESSED_SUFFIX)]] = Path(entry.path)
+        elif name.endswith(SEGMENT_SUFFIX):
+            files.setdefault(name[:-len(SEGMENT_SUFFIX)], Path(entry.path))
+    return files
+
+
+def _segments(dir_path: Path) -> list[tuple[date, Path]]:
+    """目录下的段文件，按日期升序"""
+    segments = []
+    for name, path in _segment_files(dir_path).items():
+        try:
+            segments.append((date.fromisoformat(name), path))
+        except ValueError:
+            continue
+    segments.sort()
+    return segments
+
+
+@contextmanager
+def _source_lock(dir_path: Path):
+    """数据源级写锁，跨进程（多个 worker）有效"""
+    with open(dir_path / ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# --- 索引 -------------------------------------------------------------------
+
+
+def _parse_entries(raw: bytes) -> list[tuple[float, float, int, int]]:
+    usable = len(raw) - len(raw) % _ENTRY.size  # 忽略写了一半的尾项
+    return list(_ENTRY.iter_unpack(raw[:usable]))
+
+
+def _read_entries(index_path: Path) -> list[tuple[float, float, int, int]]:
+    try:
+        return _parse_entries(index_path.read_bytes())
+    except FileNotFoundError:
+        return []
+
+
+def _load_index(
+    segment: Path, index_file: Optional[BinaryIO] = None
+) -> list[tuple[float, float, int, int]]:
+    """段的索引项（按时间排序），索引文件未变化时走内存缓存
+
+    传入 index_file 时从这个已打开的句柄读取，文件此后被替换或删除也不影响。
+    """
+    index_path = _index_path(segment)
+    try:
+        st = os.fstat(index_file.fileno()) if index_file else index_path.stat()
+        version = (st.st_size, st.st_mtime_ns, st.st_ino)
+    except FileNotFoundError:
+        version = (-1, 0, 0)
+    with _index_lock:
+        cached = _index_cache.get(segment)
+        if cached and cached[0] == version:
+            return cached[1]
+
+    if version[0] < 0:
+        entries = []
+    elif index_file:
+        index_file.seek(0)
+        entries = _parse_entries(index_file.read())
+    else:
+        entries = _read_entries(index_path)
+    # 显式传入的 timestamp 可能乱序；按时间稳定排序，同一时刻保持写入顺序
+    entries.sort(key=lambda e: e[0])
+    with _index_lock:
+        _index_cache[segment] = (version, entries)
+    return entries
+
+
+def _repair_index(segment: Path) -> None:
+    """补齐段尾未写入索引的记录（写数据后、写索引前进程退出的情况）"""
+    index_path = _index_path(segment)
+    entries = _read_entries(index_path)
+    indexed_end = max((e[2] + e[3] for e in entries), default=0)
+    if not segment.exists() or segment.stat().st_size <= indexed_end:
+        return
+
+    new_entries = []
+    with open(segment, "rb") as f:
+        f.seek(indexed_end)
+        offset = indexed_end
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # 写了一半的行，下次追加前截掉
+            try:
+                record = json.loads(line)
+                ts = datetime.fromisoformat(record["timestamp"].replace("Z", "+00:00")).timestamp()
+            except (ValueError, KeyError, TypeError):
+                ts = 0.0
+            # 无法得知原粒度，每条记录自成一个周期
+            new_entries.append(_ENTRY.pack(ts, ts, offset, len(line)))
+            offset += len(line)
+
+    with open(segment, "r+b") as f:
+        f.truncate(offset)
+    with open(index_path, "r+b" if index_path.exists() else "wb") as f:
+        f.truncate(len(entries) * _ENTRY.size)
+        f.seek(0, 2)
+        f.write(b"".join(new_entries))
+
+
+def _open_day_for_append(dir_path: Path, day: date) -> Path:
+    """当天可追加的普通段（已压缩的先解压），补齐索引。调用方持有数据源锁。"""
+    segment = _segment_path(dir_path, day)
+    if _compressed_path(dir_path, day).exists():
+        _decompress_segment(dir_path, day)
+    _repair_index(segment)
+    return segment
+
+
+def _append_lines(segment: Path, items: list[tuple[datetime, datetime, dict]]) -> None:
+    """把 (时间, 周期起点, 记录) 依次追加到段尾，数据和索引各写一次"""
+    lines = []
+    index = []
+    with open(segment, "ab") as f:
+        offset = f.tell()
+        for ts, period, record in items:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            lines.append(line.encode("utf-8"))
+            index.append(_ENTRY.pack(ts.timestamp(), period.timestamp(), offset, len(lines[-1])))
+            offset += len(lines[-1])
+        f.write(b"".join(lines))
+    with open(_index_path(segment), "ab") as f:
+        f.write(b"".join(index))
+
+
+def _append(dir_path: Path, ts: datetime, period: datetime, record: dict) -> Path:
+    """追加一条记录到当天的段并写索引。调用方持有数据源锁。"""
+    segment = _open_day_for_append(dir_path, ts.date())
+    # 同一周期此前可见的那条（周期不跨天，一定在同一段里），写入后它会被覆盖
+    replaced = next(
+        (e[0] for e in reversed(_load_index(segment)) if e[1] == period.timestamp()), None
+    )
+    _append_lines(segment, [(ts, period, record)])
+    if replaced is None:
+        _update_rollups(dir_path, ts, record.get("data"))
+    else:
+        _rebuild_rollups(dir_path, segment, [replaced, ts.timestamp()])
+    return segment
+
+
+# --- 汇总 -------------------------------------------------------------------
+
+
+def _rollup_path(dir_path: Path, level: str, ts: datetime) -> Path:
+    _, shard_format = _ROLLUP_LEVELS[level]
+    return dir_path / ROLLUP_DIR / f"{level}-{ts.strftime(shard_format)}.json"
+
+
+def _load_rollup(path: Path) -> dict[str, dict]:
+    """汇总分片：{桶起点 epoch 秒 (字符串): 桶}"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_rollup(path: Path, buckets: dict[str, dict]) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(buckets, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)  # 读者不会看到写了一半的分片
+
+
+def _update_rollups(dir_path: Path, ts: datetime, data: Any) -> None:
+    """把一条记录计入所在的小时桶和天桶。调用方持有数据源锁。"""
+    fields = rollup.numeric_fields(data)
+    if not fields:
+        return
+    (dir_path / ROLLUP_DIR).mkdir(exist_ok=True)
+    for level, (size, _) in _ROLLUP_LEVELS.items():
+        path = _rollup_path(dir_path, level, ts)
+        buckets = _load_rollup(path)
+        key = str(int(rollup.bucket_start(ts.timestamp(), size)))
+        rollup.add_sample(buckets.setdefault(key, rollup.new_bucket()), fields, ts.timestamp())
+        _save_rollup(path, buckets)
+
+
+def _rebuild_rollups(dir_path: Path, segment: Path, times: list[float]) -> None:
+    """同一周期的记录被覆盖后，从段内可见的记录重建 times 所在的桶。调用方持有数据源锁。"""
+    samples = rollup.samples(_read_segment(segment))
+    (dir_path / ROLLUP_DIR).mkdir(exist_ok=True)
+    for level, (size, _) in _ROLLUP_LEVELS.items():
+        shards: dict[Path, list[float]] = {}
+        for start in sorted({rollup.bucket_start(ts, size) for ts in times}):
+            path = _rollup_path(dir_path, level, datetime.fromtimestamp(start, timezone.utc))
+            shards.setdefault(path, []).append(start)
+        for path, starts in shards.items():
+            buckets = _load_rollup(path)
+            for start in starts:
+                bucket = rollup.build_bucket(samples, start, size)
+                if bucket["count"]:
+                    buckets[str(int(start))] = bucket
+                else:
+                    buckets.pop(str(int(start)), None)
+            _save_rollup(path, buckets)
+
+
+def _read_rollups(dir_path: Path, level: str, cutoff: datetime) -> list[tuple[float, dict]]:
+    """某层级中起点 >= cutoff 所在桶的预计算桶，按时间排序"""
+    size, shard_format = _ROLLUP_LEVELS[level]
+    if not (dir_path / ROLLUP_DIR).exists():
+        return []
+    first_shard = f"{level}-{cutoff.strftime(shard_format)}.json"
+    first = rollup.bucket_start(cutoff.timestamp(), size)
+    buckets = []
+    for path in sorted((dir_path / ROLLUP_DIR).glob(f"{level}-*.json")):
+        if path.name < first_shard:
+            continue
+        for key, bucket in _load_rollup(path).items():
+            if float(key) >= first:
+                buckets.append((float(key), bucket))
+    buckets.sort(key=lambda b: b[0])
+    return buckets
+
+
+# --- 旧格式迁移 -------------------------------------------------------------
+
+
+def _legacy_time(name: str) -> tuple[datetime, str] | None:
+    """从旧文件名解析 (时间, 粒度)"""
+    formats = (
+        ("%Y-%m-%d_%H-%M-%S", "minute"),
+        ("%Y-%m-%d_%H", "hour"),
+        ("%Y-%m-%d", "day"),
+    )
+    for fmt, granularity in formats:
+        try:
+            return datetime.strptime(name, fmt).replace(tzinfo=timezone.utc), granularity
+        except ValueError:
+            continue
+    return None
+
+
+def _migrate_legacy(source: str) -> int:
+    """把旧的每记录一文件并入段文件，完成后删除旧文件，返回迁移的记录数
+
+    按天批量追加，每天只写一次段和索引、重建一次汇总。
+    """
+    dir_path = HISTORY_DIR / source
+    if not dir_path.exists():
+        return 0
+
+    with _source_lock(dir_path):
+        legacy = []
+        for path in dir_path.glob("*.json"):
+            parsed = _legacy_time(path.stem)
+            if parsed is None:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            legacy.append((parsed[0], parsed[1], path, record))
+
+        legacy.sort(key=lambda item: item[0])
+        by_day: dict[date, list[tuple[datetime, datetime, dict]]] = {}
+        for file_time, granularity, _, record in legacy:
+            ts = file_time
+            if isinstance(record.get("timestamp"), str):
+                try:
+                    ts = datetime.fromisoformat(record["timestamp"].replace("Z", "+00:00"))
+                except ValueError:
+                    pass
+            period = rollup.period_start(file_time, granularity)
+            by_day.setdefault(ts.date(), []).append((ts, period, record))
+        for day, items in sorted(by_day.items()):
+            segment = _open_day_for_append(dir_path, day)
+            _append_lines(segment, items)
+            _rebuild_rollups(dir_path, segment, [ts.timestamp() for ts, _, _ in items])
+        for _, _, path, _ in legacy:
+            path.unlink(missing_ok=True)
+
+    return len(legacy)
+
+
+def _migrate_all() -> int:
+    total = 0
+    for source in _sources():
+        migrated = _migrate_legacy(source)
+        if migrated:
+            logger.info("Migrated %d legacy history files of %s", migrated, source)
+        total += migrated
+    return total
+
+
+# --- 压缩与保留 -------------------------------------------------------------
+
+
+def _replace_bytes(path: Path, data: bytes, compress: bool = False) -> None:
+    """整体写入临时文件再替换，读者只会看到旧文件或完整的新文件"""
+    tmp = path.with_name(path.name + ".tmp")
+    if compress:
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(data)
+    else:
+        tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _compress_segment(dir_path: Path, day: date) -> None:
+    """把一天的普通段去重、排序后写成 gzip 段。调用方持有数据源锁。"""
+    segment = _segment_path(dir_path, day)
+    _repair_index(segment)
+    entries = _load_index(segment)
+
+    # 同一周期只保留最后一条（entries 已按时间稳定排序）
+    latest: dict[float, tuple[float, float, int, int]] = {}
+    for entry in entries:
+        latest[entry[1]] = entry
+    kept = sorted(latest.values(), key=lambda e: e[0])
+
+    raw = segment.read_bytes()
+    lines = []
+    index = []
+    offset = 0
+    for ts, period, old_offset, length in kept:
+        lines.append(raw[old_offset:old_offset + length])
+        index.append(_ENTRY.pack(ts, period, offset, length))
+        offset += length
+
+    compressed = _compressed_path(dir_path, day)
+    # 先写 gzip 段的索引，再让 gzip 段出现：读者看到 gzip 段时它的索引已就绪
+    _replace_bytes(_index_path(compressed), b"".join(index))
+    _replace_bytes(compressed, b"".join(lines), compress=True)
+    segment.unlink(missing_ok=True)
+    _index_path(segment).unlink(missing_ok=True)
+
+
+def _decompress_segment(dir_path: Path, day: date) -> None:
+    """迟到的写入落在已压缩的一天：先解压回普通段。调用方持有数据源锁。"""
+    compressed = _compressed_path(dir_path, day)
+    segment = _segment_path(dir_path, day)
+    with gzip.open(compressed, "rb") as f:
+        data = f.read()
+    # 偏移本来就指向解压后的内容，索引原样沿用；gzip 段在时读者一直优先用它
+    _replace_bytes(_index_path(segment), _index_path(compressed).read_bytes())
+    _replace_bytes(segment, data)
+    compressed.unlink(missing_ok=True)
+    _index_path(compressed).unlink(missing_ok=True)
+
+
+def _dir_size(dir_path: Path) -> int:
+    return sum(p.stat().st_size for p in dir_path.rglob("*") if p.is_file())
+
+
+def _rollup_expired(path: Path, level: str, cutoff: date) -> bool:
+    """汇总分片中的所有桶是否都早于 cutoff"""
+    key = path.stem[len(level) + 1:]
+    try:
+        if level == "hour":
+            return date.fromisoformat(key) < cutoff
+        year, month = map(int, key.split("-"))
+    except ValueError:
+        return False
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return next_month <= cutoff
+
+
+def _compact(
+    source: str,
+    raw_cutoff: Optional[datetime],
+    hourly_cutoff: Optional[datetime],
+    daily_cutoff: Optional[datetime],
+) -> dict:
+    dir_path = HISTORY_DIR / source
+    if not dir_path.exists():
+        return {}
+
+    today = datetime.now(timezone.utc).date()
+    report = {
+        "bytes_before": _dir_size(dir_path),
+        "raw_removed": 0,
+        "rollups_removed": 0,
+        "segments_compacted": 0,
+    }
+    with _source_lock(dir_path):
+        for day, segment in _segments(dir_path):
+            if raw_cutoff and day < raw_cutoff.date():
+                # 与 mongo 后端一致，按记录数计
+                report["raw_removed"] += len(_read_entries(_index_path(segment)))
+                for path in (_segment_path(dir_path, day), _compressed_path(dir_path, day)):
+                    path.unlink(missing_ok=True)
+                    _index_path(path).unlink(missing_ok=True)
+            elif day < today and not _is_compressed(segment):
+                _compress_segment(dir_path, day)
+                report["segments_compacted"] += 1
+
+        rollup_dir = dir_path / ROLLUP_DIR
+        cutoffs = {"hour": hourly_cutoff, "day": daily_cutoff}
+        for level, cutoff in cutoffs.items():
+            if cutoff is None or not rollup_dir.exists():
+                continue
+            for path in rollup_dir.glob(f"{level}-*.json"):
+                if _rollup_expired(path, level, cutoff.date()):
+                    path.unlink(missing_ok=True)
+                    report["rollups_removed"] += 1
+
+        # 写入中途退出留下的临时文件
+        for path in dir_path.rglob("*.tmp"):
+            path.unlink(missing_ok=True)
+
+    with _index_lock:
+        for segment in [p for p in _index_cache if p.parent == dir_path]:
+            del _index_cache[segment]
+
+    report["bytes_after"] = _dir_size(dir_path)
+    report["bytes_reclaimed"] = report["bytes_before"] - report["bytes_after"]
+    return report
+
+
+# --- 读取 -------------------------------------------------------------------
+
+
+def _open_pair(
+    path: Path,
+) -> Optional[tuple[BinaryIO, list[tuple[float, float, int, int]]]]:
+    """打开段和它的索引，返回 (段句柄, 索引项)；任一不存在时为 None
+
+    替换段时总是先换索引再换段，所以打开段之后索引路径若已指向新文件，
+    手里的两个句柄可能不配对，重新打开。
+    """
+    index_path = _index_path(path)
+    while True:
+        try:
+            index_file = open(index_path, "rb")
+        except FileNotFoundError:
+            return None
+        with index_file:
+            try:
+                data = open(path, "rb")
+            except FileNotFoundError:
+                return None
+            try:
+                replaced = os.stat(index_path).st_ino != os.fstat(index_file.fileno()).st_ino
+            except FileNotFoundError:
+                replaced = False  # 打开之后才被删除，两个句柄仍是一对
+            if not replaced:
+                return data, _load_index(path, index_file)
+            data.close()
+
+
+def _open_segment(
+    segment: Path,
+) -> Optional[tuple[Path, BinaryIO, list[tuple[float, float, int, int]]]]:
+    """打开一天的段：(实际打开的段, 段句柄, 索引项)，这一天已被删除时为 None
+
+    段在列出后可能已被压缩或解压，此时改开同一天的另一种段。
+    """
+    day = date.fromisoformat(segment.name.split(".", 1)[0])
+    if _is_compressed(segment):
+        candidates = (segment, _segment_path(segment.parent, day))
+    else:
+        candidates = (segment, _compressed_path(segment.parent, day))
+    for path in candidates:
+        opened = _open_pair(path)
+        if opened is not None:
+            return path, *opened
+    return None
+
+
+def _records(
+    path: Path,
+    data: BinaryIO,
+    entries: list[tuple[float, float, int, int]],
+    start: float = float("-inf"),
+) -> list[dict]:
+    """从已打开的段读取时间 >= start 的记录，同一周期只保留最后一条"""
+    first = bisect.bisect_left(entries, start, key=lambda e: e[0])
+    entries = entries[first:]
+    if not entries:
+        return []
+
+    # 同一周期内的后写记录覆盖先写记录
+    latest: dict[float, tuple[float, float, int, int]] = {}
+    for entry in entries:
+        latest[entry[1]] = entry
+    kept = sorted(latest.values(), key=lambda e: e[0])
+
+    if _is_compressed(path):
+        base = 0
+        with gzip.GzipFile(fileobj=data) as f:
+            block = f.read()
+    else:
+        base = min(e[2] for e in kept)
+        end = max(e[2] + e[3] for e in kept)
+        data.seek(base)
+        block = data.read(end - base)
+
+    records = []
+    for _, _, offset, length in kept:
+        line = block[offset - base:offset - base + length]
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def _read_segment(segment: Path, start: float = float("-inf")) -> list[dict]:
+    """读取段内时间 >= start 的记录，读取期间段被压缩、解压或删除都不影响"""
+    opened = _open_segment(segment)
+    if opened is None:
+        return []
+    path, data, entries = opened
+    with data:
+        return _records(path, data, entries, start)
+
+
+def _write(source: str, ts: datetime, period: datetime, record: dict) -> None:
+    dir_path = _ensure_dir(source)
+    with _source_lock(dir_path):
+        _append(dir_path, ts, period, record)
+
+
+def _segments_since(source: str, cutoff: datetime) -> list[Path]:
+    """数据源中可能含有 cutoff 之后记录的段，按日期升序"""
+    dir_path = HISTORY_DIR / source
+    if not dir_path.exists():
+        return []
+    return [segment for day, segment in _segments(dir_path) if day >= cutoff.date()]
+
+
+def _latest(source: str) -> Optional[dict]:
+    dir_path = HISTORY_DIR / source
+    if not dir_path.exists():
+        return None
+
+    # 段名是 ISO 日期，字典序即时间序：取最大的段读索引尾项，为空才往前找
+    files = _segment_files(dir_path)
+    while files:
+        opened = _open_segment(files.pop(max(files)))
+        if opened is None:
+            continue
+        path, data, entries = opened
+        with data:
+            if not entries:
+                continue
+            _, _, offset, length = entries[-1]
+            if _is_compressed(path):
+                with gzip.GzipFile(fileobj=data) as f:
+                    return json.loads(f.read()[offset:offset + length])
+            data.seek(offset)
+            return json.loads(data.read(length))
+    return None
+
+
+def _sources() -> list[str]:
+    if not HISTORY_DIR.exists():
+        return []
+    return [d.name for d in HISTORY_DIR.iterdir() if d.is_dir()]
+
+
+class FileHistoryBackend(HistoryBackend):
+    """History in append-only segment files under DATA_DIR/history; IO runs in a thread.
+
+    Reads yield one day's segment at a time, so memory stays flat over long ranges.
+    """
+
+    async def append(self, source: str, ts: datetime, period: datetime, record: dict) -> None:
+        await asyncio.to_thread(_write, source, ts, period, record)
+
+    async def iter_batches(self, source: str, cutoff: datetime) -> AsyncIterator[list[dict]]:
+        start = cutoff.timestamp()
+        for segment in await asyncio.to_thread(_segments_since, source, cutoff):
+            batch = await asyncio.to_thread(_read_segment, segment, start)
+            if batch:
+                yield batch
+
+    async def read_rollups(
+        self, source: str, level: str, cutoff: datetime
+    ) -> list[tuple[float, dict]]:
+        dir_path = HISTORY_DIR / source
+        if not dir_path.exists():
+            return []
+        return await asyncio.to_thread(_read_rollups, dir_path, level, cutoff)
+
+    async def latest(self, source: str) -> Optional[dict]:
+        return await asyncio.to_thread(_latest, source)
+
+    async def sources(self) -> list[str]:
+        return await asyncio.to_thread(_sources)
+
+    async def migrate(self) -> None:
+        await asyncio.to_thread(_migrate_all)
+
+    async def compact(
+        self,
+        source: str,
+        raw_cutoff: Optional[datetime],
+        hourly_cutoff: Optional[datetime],
+        daily_cutoff: Optional[datetime],
+    ) -> dict:
+        return await asyncio.to_thread(_compact, source, raw_cutoff, hourly_cutoff, daily_cutoff)
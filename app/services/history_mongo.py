@@ -0,0 +1,246 @@
+"""
+Mongo history backend - 历史记录存放在 MongoDB 时间序列集合
+
+- history: 时间序列集合，timeField=timestamp，metaField=source，
+  expireAfterSeconds 取各数据源原始记录保留天数的最大值，兜底过期
+- history_rollups: 普通集合，每个 (source, 层级, 桶起点) 一个文档，
+  写入时以版本号比较并交换增量更新，多个副本并发写入不会丢失样本；
+  写入覆盖了同一周期的旧记录时，受影响的桶从原始记录重建
+
+字段路径里带点号（如 "main.temp"），不能直接作为文档键，
+所以桶内字段存为 [{"path": ..., "min": ..., ...}] 列表。
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+from app.services import history_rollup as rollup
+from app.services.history import HistoryBackend
+
+logger = logging.getLogger(__name__)
+
+# 汇总桶比较并交换失败后的重试次数
+_ROLLUP_RETRIES = 10
+
+# 流式读取时每批的记录数
+_BATCH_SIZE = 1000
+
+
+def _utc(ts: datetime) -> datetime:
+    """Motor 默认返回 naive UTC 时间"""
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _format_ts(ts: datetime) -> str:
+    return _utc(ts).isoformat().replace("+00:00", "Z")
+
+
+def _encode_bucket(bucket: dict) -> dict:
+    return {
+        "count": bucket["count"],
+        "fields": [{"path": path, **stat} for path, stat in bucket["fields"].items()],
+    }
+
+
+def _decode_bucket(doc: dict) -> dict:
+    return {
+        "count": doc.get("count", 0),
+        "fields": {
+            f["path"]: {k: v for k, v in f.items() if k != "path"} for f in doc.get("fields", [])
+        },
+    }
+
+
+def _in_time_order(kept: dict[tuple, tuple[datetime, dict]]) -> list[dict]:
+    return [record for _, record in sorted(kept.values(), key=lambda item: item[0])]
+
+
+async def _kept_batches(query: dict) -> AsyncIterator[list[dict]]:
+    """按时间升序分批产出匹配 query 的记录，同一 (source, 周期) 只保留最后一条
+
+    同一周期的记录不一定相邻（粒度不同或显式 timestamp 乱序写入时中间会夹着
+    别的周期），但周期不跨天：逐天缓冲，一天读完后按 (source, 周期) 去重，
+    内存占用不超过一天的记录。
+    """
+    cursor = db.history_col().find(
+        query, {"_id": 0, "timestamp": 1, "source": 1, "period": 1, "data": 1}
+    ).sort("timestamp", 1).batch_size(_BATCH_SIZE)
+
+    batch: list[dict] = []
+    kept: dict[tuple, tuple[datetime, dict]] = {}
+    day = None
+    async for doc in cursor:
+        ts = _utc(doc["timestamp"])
+        if ts.date() != day:
+            batch.extend(_in_time_order(kept))
+            kept = {}
+            day = ts.date()
+            if len(batch) >= _BATCH_SIZE:
+                yield batch
+                batch = []
+        period = doc.get("period")
+        # 按时间升序读，同一周期后读到的覆盖先读到的；没有 period 的旧记录各自成一个周期
+        key = (doc.get("source"), period if period is not None else ts)
+        kept[key] = (ts, {"timestamp": _format_ts(ts), "data": doc.get("data")})
+    batch.extend(_in_time_order(kept))
+    if batch:
+        yield batch
+
+
+async def _add_to_rollup(
+    source: str, level: str, start: float, fields: dict[str, float], ts: float
+) -> None:
+    col = db.history_rollups_col()
+    key = f"{source}|{level}|{int(start)}"
+    for _ in range(_ROLLUP_RETRIES):
+        doc = await col.find_one({"_id": key})
+        bucket = _decode_bucket(doc) if doc else rollup.new_bucket()
+        rollup.add_sample(bucket, fields, ts)
+        new_doc = {"source": source, "level": level, "start": start, **_encode_bucket(bucket)}
+
+        if doc is None:
+            try:
+                await col.insert_one({"_id": key, **new_doc, "version": 1})
+                return
+            except DuplicateKeyError:
+                continue  # another writer created it first
+
+        version = doc.get("version", 0)
+        result = await col.replace_one(
+            {"_id": key, "version": version}, {**new_doc, "version": version + 1}
+        )
+        if result.matched_count:
+            return
+    logger.warning("Gave up updating history rollup %s after %d conflicts", key, _ROLLUP_RETRIES)
+
+
+async def _rebuild_rollup(source: str, level: str, start: float) -> None:
+    """同一周期的记录被覆盖后，从可见的原始记录重建一个汇总桶"""
+    col = db.history_rollups_col()
+    key = f"{source}|{level}|{int(start)}"
+    size = rollup.LEVELS[level]
+    # 周期不跨天，查整天就能判断桶内每条记录是否已被同周期的后写覆盖
+    day = rollup.bucket_start(start, rollup.DAY)
+    query = {
+        "source": source,
+        "timestamp": {
+            "$gte": datetime.fromtimestamp(day, timezone.utc),
+            "$lt": datetime.fromtimestamp(day + rollup.DAY, timezone.utc),
+        },
+    }
+    for _ in range(_ROLLUP_RETRIES):
+        # 先读版本再读原始记录：期间其他写入者改过这个桶的话，下面的比较并交换会失败并重来
+        doc = await col.find_one({"_id": key})
+        samples = []
+        async for batch in _kept_batches(query):
+            samples.extend(rollup.samples(batch))
+        bucket = rollup.build_bucket(samples, start, size)
+        new_doc = {"source": source, "level": level, "start": start, **_encode_bucket(bucket)}
+
+        if doc is None:
+            if not bucket["count"]:
+                return
+            try:
+                await col.insert_one({"_id": key, **new_doc, "version": 1})
+                return
+            except DuplicateKeyError:
+                continue
+
+        version = doc.get("version", 0)
+        if bucket["count"]:
+            result = await col.replace_one(
+                {"_id": key, "version": version}, {**new_doc, "version": version + 1}
+            )
+            matched = result.matched_count
+        else:
+            result = await col.delete_one({"_id": key, "version": version})
+            matched = result.deleted_count
+        if matched:
+            return
+    logger.warning("Gave up rebuilding history rollup %s after %d conflicts", key, _ROLLUP_RETRIES)
+
+
+class MongoHistoryBackend(HistoryBackend):
+    """History in a MongoDB time-series collection, shared by every replica.
+
+    Reads stream from the cursor in batches of _BATCH_SIZE.
+    """
+
+    async def append(self, source: str, ts: datetime, period: datetime, record: dict) -> None:
+        # 同一周期此前可见的那条，写入后它会被覆盖
+        replaced = await db.history_col().find_one(
+            {"source": source, "period": period},
+            {"_id": 0, "timestamp": 1},
+            sort=[("timestamp", -1)],
+        )
+        await db.history_col().insert_one({
+            "timestamp": ts,
+            "source": source,
+            "period": period,
+            "data": record["data"],
+        })
+        if replaced is not None:
+            times = {_utc(replaced["timestamp"]).timestamp(), ts.timestamp()}
+            for level, size in rollup.LEVELS.items():
+                for start in sorted({rollup.bucket_start(t, size) for t in times}):
+                    await _rebuild_rollup(source, level, start)
+            return
+
+        fields = rollup.numeric_fields(record["data"])
+        if not fields:
+            return
+        for level, size in rollup.LEVELS.items():
+            start = rollup.bucket_start(ts.timestamp(), size)
+            await _add_to_rollup(source, level, start, fields, ts.timestamp())
+
+    async def iter_batches(self, source: str, cutoff: datetime) -> AsyncIterator[list[dict]]:
+        async for batch in _kept_batches({"source": source, "timestamp": {"$gte": cutoff}}):
+            yield batch
+
+    async def read_rollups(
+        self, source: str, level: str, cutoff: datetime
+    ) -> list[tuple[float, dict]]:
+        first = rollup.bucket_start(cutoff.timestamp(), rollup.LEVELS[level])
+        cursor = db.history_rollups_col().find(
+            {"source": source, "level": level, "start": {"$gte": first}}
+        ).sort("start", 1)
+        return [(doc["start"], _decode_bucket(doc)) async for doc in cursor]
+
+    async def latest(self, source: str) -> Optional[dict]:
+        doc = await db.history_col().find_one({"source": source}, sort=[("timestamp", -1)])
+        if doc is None:
+            return None
+        return {"timestamp": _format_ts(doc["timestamp"]), "data": doc.get("data")}
+
+    async def sources(self) -> list[str]:
+        return sorted(await db.history_col().distinct("source"))
+
+    async def compact(
+        self,
+        source: str,
+        raw_cutoff: Optional[datetime],
+        hourly_cutoff: Optional[datetime],
+        daily_cutoff: Optional[datetime],
+    ) -> dict:
+        # 时间序列集合按桶存储，删除后由 MongoDB 自行回收空间，这里只报告删除的数量；
+        # 带 timeField 条件的删除需要 MongoDB 7.0+
+        report = {"raw_removed": 0, "rollups_removed": 0}
+        if raw_cutoff is not None:
+            result = await db.history_col().delete_many(
+                {"source": source, "timestamp": {"$lt": raw_cutoff}}
+            )
+            report["raw_removed"] = result.deleted_count
+        for level, cutoff in (("hour", hourly_cutoff), ("day", daily_cutoff)):
+            if cutoff is None:
+                continue
+            # 只删整个桶都早于 cutoff 的
+            latest_start = cutoff.timestamp() - rollup.LEVELS[level]
+            result = await db.history_rollups_col().delete_many(
+                {"source": source, "level": level, "start": {"$lte": latest_start}}
+            )
+            report["rollups_removed"] += result.deleted_count
+        return report
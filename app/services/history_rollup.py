@@ -0,0 +1,227 @@
+"""
+History rollup - 历史记录的降采样与聚合
+
+每个桶对记录 data 中的数值字段（嵌套字段用点号连接，如 "main.temp"）
+维护 min / max / sum / count / last。这些统计量可以合并，所以写入时增量
+维护的小时桶能直接拼成 2h、6h、12h 等更粗的桶，天桶同理。
+
+桶只统计读取时可见的记录：同一周期内被后写覆盖的记录不计入，也不计
+没有数值字段的记录，所以无论桶多宽，结果都与原始记录一致。
+
+不落在预计算层级上的桶（如 5 分钟）从原始记录临时聚合，用 NumPy 向量化
+计算。
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import numpy as np
+
+HOUR = 3600
+DAY = 86400
+
+# 按 max_points 选桶时的候选宽度（秒），保证桶边界对齐到整点 / 整天
+_BUCKET_SIZES = (
+    60, 300, 900, 1800,
+    HOUR, 2 * HOUR, 3 * HOUR, 6 * HOUR, 12 * HOUR,
+    DAY, 7 * DAY,
+)
+
+_UNITS = {"m": 60, "h": HOUR, "d": DAY}
+
+# 写入时增量维护的汇总层级 -> 桶宽
+LEVELS = {"hour": HOUR, "day": DAY}
+
+
+def parse_duration(value: str) -> int:
+    """把 "5m" / "1h" / "1d" 转为秒数"""
+    try:
+        seconds = int(value[:-1]) * _UNITS[value[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Invalid resolution: {value!r} (use e.g. 5m, 1h, 1d)")
+    if seconds <= 0:
+        raise ValueError(f"Invalid resolution: {value!r}")
+    return seconds
+
+
+def bucket_seconds(span_seconds: float, max_points: int) -> int:
+    """覆盖 span 且不超过 max_points 个点的最小候选桶宽"""
+    needed = span_seconds / max(max_points, 1)
+    for size in _BUCKET_SIZES:
+        if size >= needed:
+            return size
+    return math.ceil(needed / DAY) * DAY
+
+
+def bucket_start(ts: float, size: int) -> float:
+    """时间戳所在桶的起点（UTC 对齐）"""
+    return float(int(ts // size) * size)
+
+
+def period_start(ts: datetime, granularity: str) -> datetime:
+    """记录所属周期的起点：同一周期内只有最后一次写入会被读到"""
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(microsecond=0)  # minute: 旧格式文件名精确到秒
+
+
+def numeric_fields(data: Any, prefix: str = "") -> dict[str, float]:
+    """提取数值字段，嵌套 dict 展平为点号路径；bool 和列表忽略"""
+    if isinstance(data, bool):
+        return {}
+    if isinstance(data, (int, float)):
+        return {prefix or "value": float(data)} if math.isfinite(data) else {}
+    if not isinstance(data, dict):
+        return {}
+    fields = {}
+    for key, value in data.items():
+        fields.update(numeric_fields(value, f"{prefix}.{key}" if prefix else str(key)))
+    return fields
+
+
+# --- 桶 -----------------------------------------------------------------------
+# 桶: {"count": 记录数, "fields": {path: {"min", "max", "sum", "count", "last", "at"}}}
+# at 是 last 对应记录的时间戳
+
+
+def new_bucket() -> dict:
+    return {"count": 0, "fields": {}}
+
+
+def add_sample(bucket: dict, fields: dict[str, float], ts: float) -> None:
+    """把一条记录（时间戳 ts）的数值字段计入桶"""
+    bucket["count"] += 1
+    for path, value in fields.items():
+        stat = bucket["fields"].get(path)
+        if stat is None:
+            bucket["fields"][path] = {
+                "min": value, "max": value, "sum": value, "count": 1, "last": value, "at": ts,
+            }
+            continue
+        stat["min"] = min(stat["min"], value)
+        stat["max"] = max(stat["max"], value)
+        stat["sum"] += value
+        stat["count"] += 1
+        if ts >= stat["at"]:  # 显式 timestamp 的写入可能乱序
+            stat["last"], stat["at"] = value, ts
+
+
+def merge(into: dict, other: dict) -> None:
+    """合并另一个桶的统计量"""
+    into["count"] += other["count"]
+    for path, stat in other["fields"].items():
+        mine = into["fields"].get(path)
+        if mine is None:
+            into["fields"][path] = dict(stat)
+            continue
+        mine["min"] = min(mine["min"], stat["min"])
+        mine["max"] = max(mine["max"], stat["max"])
+        mine["sum"] += stat["sum"]
+        mine["count"] += stat["count"]
+        if stat["at"] >= mine["at"]:
+            mine["last"], mine["at"] = stat["last"], stat["at"]
+
+
+def to_point(start: float, bucket: dict) -> dict:
+    """桶转为 API 返回的点"""
+    return {
+        "timestamp": datetime.fromtimestamp(start, timezone.utc).isoformat().replace("+00:00", "Z"),
+        "count": bucket["count"],
+        "data": {
+            path: {
+                "min": stat["min"],
+                "max": stat["max"],
+                "avg": stat["sum"] / stat["count"],
+                "last": stat["last"],
+            }
+            for path, stat in bucket["fields"].items()
+        },
+    }
+
+
+def regroup(buckets: list[tuple[float, dict]], size: int) -> list[tuple[float, dict]]:
+    """把按时间排序的细粒度桶合并为 size 宽的桶"""
+    grouped: dict[float, dict] = {}
+    for start, bucket in buckets:
+        target = grouped.setdefault(bucket_start(start, size), new_bucket())
+        merge(target, bucket)
+    return sorted(grouped.items())
+
+
+# --- 从原始记录临时聚合 -----------------------------------------------------
+
+Samples = list[tuple[float, dict[str, float]]]  # 按时间排序的 (时间戳, 数值字段)
+
+
+def _record_time(record: dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(record["timestamp"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+
+def samples(records: list[dict]) -> Samples:
+    """记录转为按时间排序的样本，跳过没有时间戳或数值字段的记录"""
+    result = []
+    for record in records:
+        ts = _record_time(record)
+        fields = numeric_fields(record.get("data"))
+        if ts is not None and fields:
+            result.append((ts, fields))
+    result.sort(key=lambda s: s[0])
+    return result
+
+
+def build_bucket(samples: Samples, start: float, size: int) -> dict:
+    """用落在 [start, start + size) 内的样本重建一个桶"""
+    bucket = new_bucket()
+    for ts, fields in samples:
+        if start <= ts < start + size:
+            add_sample(bucket, fields, ts)
+    return bucket
+
+
+def _aggregate(samples: Samples, size: int) -> list[tuple[float, dict]]:
+    times = np.fromiter((ts for ts, _ in samples), dtype=np.float64, count=len(samples))
+    keys = np.floor(times / size) * size
+    # 每个桶在（已排序的）样本中的起始下标
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(samples)])
+    buckets = [new_bucket() for _ in starts]
+    for bucket, count in zip(buckets, counts.tolist()):
+        bucket["count"] = count
+
+    paths = dict.fromkeys(path for _, fields in samples for path in fields)
+    positions = np.arange(len(samples))
+    for path in paths:
+        values = np.fromiter(
+            (fields.get(path, np.nan) for _, fields in samples),
+            dtype=np.float64, count=len(samples),
+        )
+        valid = ~np.isnan(values)
+        n = np.add.reduceat(valid.astype(np.int64), starts)
+        mins = np.fmin.reduceat(values, starts)
+        maxs = np.fmax.reduceat(values, starts)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        last_idx = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+        for i in np.flatnonzero(n).tolist():
+            buckets[i]["fields"][path] = {
+                "min": float(mins[i]),
+                "max": float(maxs[i]),
+                "sum": float(sums[i]),
+                "count": int(n[i]),
+                "last": float(values[last_idx[i]]),
+                "at": float(times[last_idx[i]]),
+            }
+    return list(zip(keys[starts].tolist(), buckets))
+
+
+def aggregate(records: list[dict], size: int) -> list[tuple[float, dict]]:
+    """把原始记录（每个周期已只剩最后一条）按 size 秒分桶聚合"""
+    found = samples(records)
+    if not found:
+        return []
+    return _aggregate(found, size)
@@ -0,0 +1,74 @@
+"""Leases - MongoDB-backed leader election with heartbeated TTL locks."""
+
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+class Lease:
+    """A named lock held by at most one process until it expires.
+
+    Expiry is evaluated against the server clock ($$NOW) so replicas with
+    skewed clocks agree on who holds the lease.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if already held."""
+        held_by_me = {"$eq": ["$holder", db.PROCESS_ID]}
+        try:
+            doc = await db.locks_col().find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [
+                        {"holder": db.PROCESS_ID},
+                        {"$expr": {"$lt": ["$expires_at", "$$NOW"]}},
+                    ],
+                },
+                [{"$set": {
+                    "holder": db.PROCESS_ID,
+                    "host": socket.gethostname(),
+                    "pid": os.getpid(),
+                    "acquired_at": {"$cond": [held_by_me, "$acquired_at", "$$NOW"]},
+                    "renewed_at": "$$NOW",
+                    "expires_at": {"$add": ["$$NOW", int(self.ttl * 1000)]},
+                }}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Someone else holds a live lease; the upsert collided with their document
+            return False
+        return doc is not None and doc.get("holder") == db.PROCESS_ID
+
+    async def release(self) -> None:
+        """Give up the lease if this process holds it."""
+        await db.locks_col().delete_one({"_id": self.name, "holder": db.PROCESS_ID})
+
+    async def current(self) -> dict | None:
+        """Current holder, or None if the lease is free."""
+        doc = await db.locks_col().find_one({"_id": self.name})
+        if not doc:
+            return None
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return {
+            "holder": doc.get("holder"),
+            "host": doc.get("host"),
+            "pid": doc.get("pid"),
+            "acquired_at": doc["acquired_at"].isoformat() if doc.get("acquired_at") else None,
+            "renewed_at": doc["renewed_at"].isoformat() if doc.get("renewed_at") else None,
+            "expires_at": doc["expires_at"].isoformat() if doc.get("expires_at") else None,
+            "expired": bool(doc.get("expires_at")) and doc["expires_at"] < now,
+            "is_self": doc.get("holder") == db.PROCESS_ID,
+        }
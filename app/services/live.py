@@ -0,0 +1,101 @@
+"""Live updates - stream re-rendered panels to dashboards over SSE."""
+
+import asyncio
+import html
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.services import events, panels_v2, visibility
+from app.services.dashboard import get_dashboard
+
+# Wait this long after a change for more to arrive before re-rendering
+COALESCE_SECONDS = 0.1
+# Comment line sent when idle so proxies keep the connection open
+KEEPALIVE_SECONDS = 15.0
+
+
+def _sse(event: str, data: str) -> str:
+    lines = "\n".join(f"data: {line}" for line in data.splitlines() or [""])
+    return f"event: {event}\n{lines}\n\n"
+
+
+def _oob(panel_id: str, rendered: str) -> str:
+    selector = f".card-content[data-panel-id='{html.escape(panel_id, quote=True)}']"
+    return f'<div hx-swap-oob="innerHTML:{selector}">{rendered}</div>'
+
+
+async def _affected_panels(dashboard_id: str, changes: dict[str, set[str]]) -> list[str]:
+    """Panel ids on the dashboard touched by the collected changes."""
+    dashboard = await get_dashboard(dashboard_id=dashboard_id)
+    affected = []
+    for panel in dashboard.get("panels", []):
+        pid = panel.get("id")
+        if pid in affected:
+            continue
+        if pid in changes.get("panels", set()) or changes.get("storages", set()) & set(
+            panel.get("storage_ids") or []
+        ):
+            affected.append(pid)
+    return affected
+
+
+async def dashboard_updates(
+    dashboard_id: str, is_disconnected: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    """
+    Yield SSE messages for a dashboard until the client disconnects.
+
+    Each "panels" event carries hx-swap-oob fragments replacing the content of
+    every panel whose template or bound storages changed. While connected the
+    stream keeps the dashboard's storages marked as viewed.
+    """
+    viewer_id = f"sse:{uuid.uuid4().hex}"
+    with events.subscription({"storages", "panels"}) as queue:
+        try:
+            async for message in _stream(dashboard_id, is_disconnected, queue, viewer_id):
+                yield message
+        finally:
+            await visibility.unmark_viewed(viewer_id)
+
+
+async def _mark_viewing(dashboard_id: str, viewer_id: str) -> None:
+    dashboard = await get_dashboard(dashboard_id=dashboard_id)
+    storage_ids = visibility.panel_storage_ids(dashboard.get("panels", []))
+    # Outlive a couple of missed heartbeats so a slow loop doesn't flap visibility
+    await visibility.mark_viewed(viewer_id, storage_ids, ttl=KEEPALIVE_SECONDS * 3)
+
+
+async def _stream(
+    dashboard_id: str,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    queue: asyncio.Queue,
+    viewer_id: str,
+) -> AsyncIterator[str]:
+    await _mark_viewing(dashboard_id, viewer_id)
+    last_heartbeat = time.monotonic()
+    yield ": connected\n\n"
+    while not await is_disconnected():
+        if time.monotonic() - last_heartbeat >= KEEPALIVE_SECONDS:
+            await _mark_viewing(dashboard_id, viewer_id)
+            last_heartbeat = time.monotonic()
+        try:
+            event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+
+        # Coalesce bursts (e.g. a task writing several storages) into one render
+        changes: dict[str, set[str]] = {}
+        changes.setdefault(event["collection"], set()).update(event["ids"])
+        await asyncio.sleep(COALESCE_SECONDS)
+        while not queue.empty():
+            event = queue.get_nowait()
+            changes.setdefault(event["collection"], set()).update(event["ids"])
+
+        panel_ids = await _affected_panels(dashboard_id, changes)
+        if not panel_ids:
+            continue
+        rendered = await panels_v2.render_panels(panel_ids)
+        fragments = "".join(_oob(pid, rendered.get(pid, "")) for pid in panel_ids)
+        yield _sse("panels", fragments)
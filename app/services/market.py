@@ -101,11 +101,11 @@ async def install_market_panel(
     storage_overrides: Optional[dict] = None,
 ) -> Optional[str]:
     """从市场安装 Panel 到用户数据目录。"""
-    from app.sandbox import get_executor
-    from app.sandbox.protocol import EventType, HandlerContext, HandlerEvent
+    from app.sandbox.protocol import EventType, HandlerEvent
     from app.services import panels_v2 as panels
     from app.services import storage as storage_service
     from app.services import tasks_v2 as tasks
+    from app.services.handlers import run_handler
 
     market_panel = get_market_panel(panel_type)
     if not market_panel:
@@ -152,18 +152,12 @@ async def install_market_panel(
     )
 
     if handler.strip():
-        storage_data = await storage_service.load_storages_for_context(actual_storage_ids)
-
-        executor = get_executor()
-        context = HandlerContext(
+        await run_handler(
+            handler,
+            actual_storage_ids,
+            HandlerEvent(type=EventType.INIT),
             panel_id=panel_id,
-            storage=storage_data,
-            event=HandlerEvent(type=EventType.INIT),
         )
-        result = executor.execute(handler, context)
-
-        if result.success:
-            await storage_service.save_storages_from_context(actual_storage_ids, storage_data)
 
     task_config = market_panel.get("task")
     if task_config and handler.strip():
@@ -1,10 +1,13 @@
 """Panel service v2 - with storage binding support."""
 
-from jinja2 import BaseLoader, Environment
+import asyncio
 
+from app.config import RENDER_THREAD_THRESHOLD
 from app.models.panel import Panel
-from app.sandbox import EventType, HandlerContext, HandlerEvent, get_executor
-from app.services.storage import load_storages_for_context, save_storages_from_context
+from app.models.storage import Storage
+from app.sandbox import EventType, HandlerEvent
+from app.services import render_cache, template_cache
+from app.services.handlers import run_handler
 
 
 async def _merge_layout(panel_dict: dict) -> dict:
@@ -93,18 +96,12 @@ async def delete_panel(panel_id: str) -> bool:
     return await p.delete()
 
 
-async def render_panel(panel_id: str) -> str | None:
-    """Render panel template with storage context."""
-    p = await Panel.load(panel_id)
-    if not p:
-        return None
-
+def _render(p: Panel, storage_context: dict[str, dict]) -> str:
+    """Render a loaded panel's template against its storage context."""
     template_str = p.get_template()
     if not template_str:
         return "<div class='text-muted'>No template</div>"
 
-    storage_context = await load_storages_for_context(p.storage_ids)
-
     context = {
         "panel": p.to_dict(),
         "storage": storage_context,
@@ -114,13 +111,59 @@ async def render_panel(panel_id: str) -> str | None:
             context[sid] = data
 
     try:
-        env = Environment(loader=BaseLoader())
-        template = env.from_string(template_str)
+        template = template_cache.get_template(p.id, template_str)
         return template.render(**context)
     except Exception as e:
         return f"<div class='text-red-500'>Template error: {e}</div>"
 
 
+async def _render_cached(p: Panel, storages: dict[str, Storage]) -> str:
+    """Render a panel via the render cache, moving heavy templates off the event loop."""
+    template_str = p.get_template()
+    key = render_cache.make_key(
+        p.id, template_cache.template_hash(template_str), p.storage_ids, storages
+    )
+    html = render_cache.get(key)
+    if html is not None:
+        return html
+
+    storage_context = {sid: storages[sid].data for sid in p.storage_ids if sid in storages}
+    if len(template_str) > RENDER_THREAD_THRESHOLD:
+        html = await asyncio.to_thread(_render, p, storage_context)
+    else:
+        html = _render(p, storage_context)
+
+    render_cache.put(key, html)
+    return html
+
+
+async def render_panel(panel_id: str) -> str | None:
+    """Render panel template with storage context."""
+    p = await Panel.load(panel_id)
+    if not p:
+        return None
+
+    storages = await Storage.load_many(p.storage_ids)
+    return await _render_cached(p, storages)
+
+
+async def render_panels(panel_ids: list[str]) -> dict[str, str]:
+    """Render many panels at once, returns {panel_id: html}.
+
+    Panels and the union of their storages are each loaded with a single query,
+    then templates render concurrently. Missing panels are omitted.
+    """
+    unique_ids = list(dict.fromkeys(panel_ids))
+    panels = await Panel.load_many(unique_ids)
+
+    storage_ids = list(dict.fromkeys(sid for p in panels.values() for sid in p.storage_ids))
+    storages = await Storage.load_many(storage_ids)
+
+    loaded = [panels[pid] for pid in unique_ids if pid in panels]
+    htmls = await asyncio.gather(*(_render_cached(p, storages) for p in loaded))
+    return {p.id: html for p, html in zip(loaded, htmls)}
+
+
 async def execute_action(panel_id: str, action: str, payload: dict | None = None) -> dict:
     """Execute panel handler action."""
     p = await Panel.load(panel_id)
@@ -131,25 +174,14 @@ async def execute_action(panel_id: str, action: str, payload: dict | None = None
     if not handler_code:
         return {"success": False, "error": "No handler defined"}
 
-    storage_context = await load_storages_for_context(p.storage_ids)
-
-    context = HandlerContext(
+    result = await run_handler(
+        handler_code,
+        p.storage_ids,
+        HandlerEvent(type=EventType.ACTION, action=action, payload=payload or {}),
         panel_id=panel_id,
-        storage=storage_context,
-        event=HandlerEvent(
-            type=EventType.ACTION,
-            action=action,
-            payload=payload or {},
-        ),
     )
-
-    executor = get_executor("simple")
-    result = executor.execute(handler_code, context)
-
-    if not result.success:
-        return {"success": False, "error": result.error}
-
-    await save_storages_from_context(p.storage_ids, storage_context)
+    if not result["success"]:
+        return {"success": False, "error": result["error"]}
 
     html = await render_panel(panel_id)
 
@@ -0,0 +1,114 @@
+"""Render cache - rendered panel HTML keyed on template and storage versions."""
+
+import threading
+from collections import OrderedDict
+
+from app.config import RENDER_CACHE_BYTES
+from app.models.storage import Storage
+from app.services import events
+
+# Key: (panel_id, template_hash, ((storage_id, version, updated_at), ...))
+RenderKey = tuple[str, str, tuple[tuple, ...]]
+
+_entries: OrderedDict[RenderKey, str] = OrderedDict()
+_sizes: dict[RenderKey, int] = {}
+_lock = threading.Lock()
+_bytes = 0
+_hits = 0
+_misses = 0
+_evictions = 0
+
+
+def make_key(
+    panel_id: str, template_hash: str, storage_ids: list[str], storages: dict[str, Storage]
+) -> RenderKey:
+    """Build a cache key from the panel's template and its bound storage versions."""
+    versions = []
+    for sid in storage_ids:
+        s = storages.get(sid)
+        if s:
+            versions.append((sid, s.version, s.updated_at.timestamp()))
+        else:
+            versions.append((sid, None, None))
+    return (panel_id, template_hash, tuple(versions))
+
+
+def get(key: RenderKey) -> str | None:
+    """Return cached HTML for key, or None."""
+    global _hits, _misses
+    with _lock:
+        html = _entries.get(key)
+        if html is None:
+            _misses += 1
+            return None
+        _entries.move_to_end(key)
+        _hits += 1
+        return html
+
+
+def put(key: RenderKey, html: str) -> None:
+    """Store rendered HTML, evicting least recently used entries over budget."""
+    global _bytes, _evictions
+    size = len(html.encode("utf-8"))
+    if size > RENDER_CACHE_BYTES:
+        return
+
+    with _lock:
+        if key in _entries:
+            _bytes -= _sizes[key]
+        _entries[key] = html
+        _entries.move_to_end(key)
+        _sizes[key] = size
+        _bytes += size
+        while _bytes > RENDER_CACHE_BYTES:
+            old_key, _ = _entries.popitem(last=False)
+            _bytes -= _sizes.pop(old_key)
+            _evictions += 1
+
+
+def _drop(predicate) -> None:
+    global _bytes
+    with _lock:
+        for key in [k for k in _entries if predicate(k)]:
+            del _entries[key]
+            _bytes -= _sizes.pop(key)
+
+
+def invalidate_panel(panel_id: str) -> None:
+    """Drop all cached renders of a panel."""
+    _drop(lambda k: k[0] == panel_id)
+
+
+def invalidate_storage(storage_id: str) -> None:
+    """Drop all cached renders that depend on a storage."""
+    _drop(lambda k: any(v[0] == storage_id for v in k[2]))
+
+
+def clear() -> None:
+    """Drop everything."""
+    _drop(lambda k: True)
+
+
+def stats() -> dict:
+    """Cache size and hit/miss counters."""
+    with _lock:
+        return {
+            "entries": len(_entries),
+            "bytes": _bytes,
+            "max_bytes": RENDER_CACHE_BYTES,
+            "hits": _hits,
+            "misses": _misses,
+            "evictions": _evictions,
+        }
+
+
+def _on_change(collection: str, ids: list[str]) -> None:
+    if collection == "storages":
+        for sid in ids:
+            invalidate_storage(sid)
+    elif collection == "panels":
+        for pid in ids:
+            invalidate_panel(pid)
+
+
+events.add_listener(_on_change)
@@ -1,6 +1,10 @@
 """Storage service - CRUD operations for Storage."""
 
-from app.models.storage import Storage
+import copy
+from dataclasses import dataclass, field
+
+from app.config import STORAGE_CONFLICT_RETRIES
+from app.models.storage import Storage, StorageConflictError
 
 
 async def list_storages() -> list[dict]:
@@ -17,28 +21,33 @@ async def get_storage(storage_id: str) -> dict | None:
 async def create_storage(storage_id: str, data: dict | None = None) -> dict:
     """Create a new storage."""
     s = Storage(id=storage_id, data=data or {})
-    await s.save()
+    await s.save(force=True)
     return s.to_dict()
 
 
+async def _modify_storage(storage_id: str, modify) -> dict | None:
+    """Load, modify and save a storage, reloading on version conflict."""
+    for attempt in range(STORAGE_CONFLICT_RETRIES + 1):
+        s = await Storage.load(storage_id)
+        if not s:
+            return None
+        modify(s)
+        try:
+            await s.save()
+            return s.to_dict()
+        except StorageConflictError:
+            if attempt == STORAGE_CONFLICT_RETRIES:
+                raise
+
+
 async def update_storage(storage_id: str, data: dict) -> dict | None:
     """Update storage data (full replace)."""
-    s = await Storage.load(storage_id)
-    if not s:
-        return None
-    s.data = data
-    await s.save()
-    return s.to_dict()
+    return await _modify_storage(storage_id, lambda s: setattr(s, "data", data))
 
 
 async def patch_storage(storage_id: str, patch: dict) -> dict | None:
     """Patch storage data (shallow merge)."""
-    s = await Storage.load(storage_id)
-    if not s:
-        return None
-    s.data.update(patch)
-    await s.save()
-    return s.to_dict()
+    return await _modify_storage(storage_id, lambda s: s.data.update(patch))
 
 
 async def delete_storage(storage_id: str) -> bool:
@@ -55,10 +64,79 @@ async def load_storages_for_context(storage_ids: list[str]) -> dict[str, dict]:
     return {sid: s.data for sid, s in storages.items()}
 
 
-async def save_storages_from_context(storage_ids: list[str], context: dict[str, dict]) -> None:
-    """Save modified storage data from handler context."""
+@dataclass
+class StorageSnapshot:
+    """Storage data and versions captured before a handler runs."""
+    data: dict[str, dict]
+    versions: dict[str, int]
+
+
+@dataclass
+class WriteBackResult:
+    """Outcome of writing handler storage changes back."""
+    written: list[str] = field(default_factory=list)
+    conflicts: list[str] = field(default_factory=list)
+
+
+async def load_storages_for_handler(
+    storage_ids: list[str],
+) -> tuple[dict[str, dict], StorageSnapshot]:
+    """Load storages as handler context plus a snapshot for diffing the write-back."""
     storages = await Storage.load_many(storage_ids)
-    for sid in storage_ids:
-        if sid in context and sid in storages:
-            storages[sid].data = context[sid]
-            await storages[sid].save()
+    context = {sid: s.data for sid, s in storages.items()}
+    snapshot = StorageSnapshot(
+        data=copy.deepcopy(context),
+        versions={sid: s.version for sid, s in storages.items()},
+    )
+    return context, snapshot
+
+
+def _is_path_safe(key: str) -> bool:
+    """Whether a data key can be addressed as a MongoDB dotted path."""
+    return bool(key) and "." not in key and not key.startswith("$")
+
+
+def diff_storage(before: dict, after: dict) -> tuple[dict, list[str]] | None:
+    """Compute top-level changes as ($set paths, $unset paths), or None if unchanged."""
+    if before == after:
+        return None
+
+    keys = set(before) | set(after)
+    if not all(_is_path_safe(k) for k in keys):
+        # Keys that can't be addressed by path: rewrite the whole data blob
+        return {"data": after}, []
+
+    to_set = {f"data.{k}": v for k, v in after.items() if k not in before or before[k] != v}
+    to_unset = [f"data.{k}" for k in before if k not in after]
+    return to_set, to_unset
+
+
+async def save_storages_from_context(
+    storage_ids: list[str],
+    context: dict[str, dict],
+    snapshot: StorageSnapshot | None = None,
+) -> WriteBackResult:
+    """Save modified storage data from handler context.
+
+    With a snapshot, only storages (and top-level keys) that changed are written,
+    each as a compare-and-set against the snapshot version. Storages modified
+    by someone else in the meantime are reported as conflicts and not written.
+    """
+    patches = {}
+    for sid in dict.fromkeys(storage_ids):
+        if sid not in context:
+            continue
+        if snapshot is None:
+            patches[sid] = ({"data": context[sid]}, [])
+            continue
+        changes = diff_storage(snapshot.data.get(sid, {}), context[sid])
+        if changes:
+            patches[sid] = changes
+
+    conflicts = await Storage.bulk_patch(
+        patches, snapshot.versions if snapshot is not None else None
+    )
+    return WriteBackResult(
+        written=[sid for sid in patches if sid not in conflicts],
+        conflicts=conflicts,
+    )
@@ -1,15 +1,35 @@
-"""Task scheduler - runs scheduled tasks using APScheduler."""
+"""Task scheduler - runs scheduled tasks using APScheduler.
 
+Every process keeps a scheduler, but only the holder of the "scheduler" lease
+runs it; the others stand by and take over when the lease expires.
+"""
+
+import asyncio
 import logging
+import random
+import time
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from pymongo.errors import PyMongoError
+
+from app.config import HISTORY_COMPACT_INTERVAL, SCHEDULER_LEASE_TTL, TASK_RETRY_MAX_DELAY
+from app.services import events
+from app.services.leases import Lease
 
 logger = logging.getLogger(__name__)
 
 # Global scheduler instance
 _scheduler: AsyncIOScheduler | None = None
 
+# Settings each job was scheduled with, to skip no-op reschedules
+_job_settings: dict[str, tuple] = {}
+
+_lease = Lease("scheduler", SCHEDULER_LEASE_TTL)
+_election: asyncio.Task | None = None
+_is_leader = False
+
 
 def get_scheduler() -> AsyncIOScheduler:
     """Get or create scheduler instance."""
@@ -19,20 +39,58 @@ def get_scheduler() -> AsyncIOScheduler:
     return _scheduler
 
 
+def _backoff(base: float, attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry (0-based)."""
+    return random.uniform(0, min(TASK_RETRY_MAX_DELAY, base * 2 ** attempt))
+
+
 async def run_scheduled_task(task_id: str):
-    """Execute a scheduled task."""
+    """Execute a scheduled task, retrying per its policy and honouring its circuit."""
+    from app.models.task import Task
     from app.services import tasks_v2 as task_service
 
-    logger.info(f"Running scheduled task: {task_id}")
-    result = await task_service.execute_task(task_id)
-    if result["success"]:
-        logger.info(f"Task {task_id} completed successfully")
-    else:
+    task = await Task.load(task_id)
+    if not task or not task.enabled:
+        return
+    if not task_service.circuit_allows_run(task):
+        logger.debug(f"Skipping task {task_id}: circuit open")
+        return
+    if await task_service.is_idle(task):
+        logger.debug(f"Skipping task {task_id}: no one is viewing its storages")
+        return
+
+    probing = task.circuit != "closed"
+    if probing:
+        await task.set_fields(circuit="half_open")
+        logger.info(f"Probing task {task_id} (circuit open)")
+
+    # A probe gets a single attempt; a closed circuit gets the configured retries
+    attempts = 1 if probing else task.retry_attempts + 1
+    for attempt in range(attempts):
+        logger.info(f"Running scheduled task: {task_id}")
+        result = await task_service.execute_task(
+            task_id, trigger="schedule" if attempt == 0 else "retry"
+        )
+        if result["success"]:
+            logger.info(f"Task {task_id} completed successfully")
+            break
         logger.error(f"Task {task_id} failed: {result.get('error')}")
+        if attempt + 1 < attempts:
+            await asyncio.sleep(_backoff(task.retry_backoff, attempt))
+
+    await task_service.record_task_outcome(task, result["success"], result.get("error"))
+    if task.circuit == "open":
+        logger.warning(
+            f"Task {task_id} circuit open after {task.consecutive_failures} consecutive failures"
+        )
 
 
-def schedule_task(task_id: str, cron_expr: str):
-    """Add a task to the scheduler."""
+def schedule_task(task_id: str, cron_expr: str, max_instances: int = 1, coalesce: bool = True):
+    """Add a task to the scheduler.
+
+    A tick that finds max_instances runs still in progress is skipped, and with
+    coalesce a backlog of missed ticks fires once instead of once per tick.
+    """
     scheduler = get_scheduler()
     job_id = f"task_{task_id}"
 
@@ -67,7 +125,11 @@ def schedule_task(task_id: str, cron_expr: str):
         args=[task_id],
         id=job_id,
         replace_existing=True,
+        max_instances=max(max_instances, 1),
+        coalesce=coalesce,
+        misfire_grace_time=None if coalesce else 1,
     )
+    _job_settings[task_id] = (cron_expr, max_instances, coalesce)
     logger.info(f"Scheduled task {task_id} with cron: {cron_expr}")
 
 
@@ -75,6 +137,7 @@ def unschedule_task(task_id: str):
     """Remove a task from the scheduler."""
     scheduler = get_scheduler()
     job_id = f"task_{task_id}"
+    _job_settings.pop(task_id, None)
     if scheduler.get_job(job_id):
         scheduler.remove_job(job_id)
         logger.info(f"Unscheduled task {task_id}")
@@ -91,21 +154,124 @@ async def reload_all_tasks():
             scheduler.remove_job(job.id)
 
     for task in await task_service.get_scheduled_tasks():
-        schedule_task(task["id"], task["schedule"])
+        schedule_task(task["id"], task["schedule"], task["max_instances"], task["coalesce"])
 
 
-async def start_scheduler():
-    """Start the scheduler and load all tasks."""
+async def _refresh_task(task_id: str):
+    """Re-read a task changed by any process and update its job."""
+    from app.models.task import Task
+
+    task = await Task.load(task_id)
+    if task and task.enabled and task.schedule:
+        settings = (task.schedule, task.max_instances, task.coalesce)
+        if _job_settings.get(task_id) != settings or not get_scheduler().get_job(f"task_{task_id}"):
+            schedule_task(task.id, task.schedule, task.max_instances, task.coalesce)
+    else:
+        unschedule_task(task_id)
+
+
+def _on_change(collection: str, ids: list[str]):
+    if collection != "tasks" or not _is_leader:
+        return
+    for task_id in ids:
+        asyncio.get_running_loop().create_task(_refresh_task(task_id))
+
+
+async def _become_leader():
+    global _is_leader
+    _is_leader = True
     scheduler = get_scheduler()
-    if not scheduler.running:
-        await reload_all_tasks()
+    # Tasks may have changed on other processes while we were standing by
+    await reload_all_tasks()
+    if scheduler.running:
+        scheduler.resume()
+    else:
         scheduler.start()
-        logger.info("Task scheduler started")
+    logger.info("Acquired scheduler lease, task scheduler started")
+
+
+def _step_down():
+    global _is_leader
+    _is_leader = False
+    scheduler = get_scheduler()
+    if scheduler.running:
+        scheduler.pause()
+    logger.warning("Lost scheduler lease, task scheduler paused")
+
+
+async def _election_loop():
+    """Acquire or renew the lease every third of its TTL."""
+    interval = SCHEDULER_LEASE_TTL / 3
+    last_renewed = 0.0
+    while True:
+        try:
+            held = await _lease.acquire()
+            if held:
+                last_renewed = time.monotonic()
+        except PyMongoError as e:
+            logger.warning(f"Scheduler lease heartbeat failed: {e}")
+            # Keep running until just before the lease would lapse on the server
+            held = _is_leader and time.monotonic() - last_renewed < SCHEDULER_LEASE_TTL - interval
+
+        if held and not _is_leader:
+            await _become_leader()
+        elif not held and _is_leader:
+            _step_down()
+        await asyncio.sleep(interval)
+
 
+async def run_history_compaction():
+    """Apply history retention and compact segments (leader only, via the scheduler)."""
+    from app.services.history import compact_history
+
+    try:
+        await compact_history()
+    except Exception as e:
+        logger.error(f"History compaction failed: {e}")
+
+
+def _schedule_maintenance():
+    """Add built-in jobs; they survive reload_all_tasks, which only touches task_ jobs."""
+    if HISTORY_COMPACT_INTERVAL > 0:
+        get_scheduler().add_job(
+            run_history_compaction,
+            trigger=IntervalTrigger(seconds=HISTORY_COMPACT_INTERVAL),
+            id="history_compaction",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
+
+async def start_scheduler():
+    """Join scheduler leader election; the scheduler runs while this process leads."""
+    global _election
+    if _election is None:
+        events.add_listener(_on_change)
+        _schedule_maintenance()
+        _election = asyncio.create_task(_election_loop())
+
+
+async def stop_scheduler():
+    """Stop the scheduler and hand the lease to another process."""
+    global _election, _is_leader
+    if _election is not None:
+        _election.cancel()
+        try:
+            await _election
+        except asyncio.CancelledError:
+            pass
+        _election = None
 
-def stop_scheduler():
-    """Stop the scheduler."""
     scheduler = get_scheduler()
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Task scheduler stopped")
+    if _is_leader:
+        _is_leader = False
+        await _lease.release()
+
+
+async def leader_status() -> dict:
+    """Current scheduler lease holder and whether this process is it."""
+    return {"is_leader": _is_leader, "lease": await _lease.current()}
@@ -1,8 +1,14 @@
 """Task service - scheduled jobs with storage binding."""
 
+import time
+from datetime import datetime
+
+from app.config import IDLE_TASK_INTERVAL, TASK_CIRCUIT_PROBE_SECONDS, TASK_CIRCUIT_THRESHOLD
 from app.models.task import Task
-from app.sandbox import EventType, HandlerContext, HandlerEvent, get_executor
-from app.services.storage import load_storages_for_context, save_storages_from_context
+from app.models.task_run import TaskRun
+from app.sandbox import EventType, HandlerEvent
+from app.services import visibility
+from app.services.handlers import run_handler, storage_locks
 from app.services.task_scheduler import schedule_task as _schedule
 from app.services.task_scheduler import unschedule_task as _unschedule
 
@@ -25,6 +31,11 @@ async def create_task(
     storage_ids: list[str] | None = None,
     handler: str = "",
     enabled: bool = True,
+    max_instances: int = 1,
+    coalesce: bool = True,
+    adaptive: bool = True,
+    retry_attempts: int = 0,
+    retry_backoff: float = 1.0,
 ) -> dict:
     """Create a new task."""
     t = Task(
@@ -33,12 +44,17 @@ async def create_task(
         schedule=schedule,
         storage_ids=storage_ids or [],
         enabled=enabled,
+        max_instances=max_instances,
+        coalesce=coalesce,
+        adaptive=adaptive,
+        retry_attempts=retry_attempts,
+        retry_backoff=retry_backoff,
         handler=handler,
     )
     await t.save()
 
     if t.enabled and t.schedule:
-        _schedule(t.id, t.schedule)
+        _schedule(t.id, t.schedule, t.max_instances, t.coalesce)
 
     return t.to_dict()
 
@@ -49,15 +65,22 @@ async def update_task(task_id: str, updates: dict) -> dict | None:
     if not t:
         return None
 
-    for key in ["name", "schedule", "storage_ids", "enabled"]:
+    for key in [
+        "name", "schedule", "storage_ids", "enabled",
+        "max_instances", "coalesce", "adaptive", "retry_attempts", "retry_backoff",
+    ]:
         if key in updates:
             setattr(t, key, updates[key])
 
+    # Re-enabling a task resets its circuit breaker
+    if updates.get("enabled"):
+        t.circuit, t.consecutive_failures, t.circuit_opened_at = "closed", 0, None
+
     await t.save()
 
     _unschedule(t.id)
     if t.enabled and t.schedule:
-        _schedule(t.id, t.schedule)
+        _schedule(t.id, t.schedule, t.max_instances, t.coalesce)
 
     return t.to_dict()
 
@@ -71,10 +94,8 @@ async def delete_task(task_id: str) -> bool:
     return await t.delete()
 
 
-async def execute_task(task_id: str) -> dict:
-    """Execute task handler."""
-    from datetime import datetime
-
+async def execute_task(task_id: str, trigger: str = "manual") -> dict:
+    """Execute task handler and record the run in task_runs."""
     t = await Task.load(task_id)
     if not t:
         return {"success": False, "error": "Task not found"}
@@ -86,28 +107,124 @@ async def execute_task(task_id: str) -> dict:
     if not handler_code:
         return {"success": False, "error": "No handler defined"}
 
-    storage_context = await load_storages_for_context(t.storage_ids)
-
-    context = HandlerContext(
+    started_at = datetime.now()
+    start = time.perf_counter()
+    # Tasks sharing a storage run one at a time instead of racing on it
+    async with storage_locks(t.storage_ids):
+        result = await run_handler(
+            handler_code,
+            t.storage_ids,
+            HandlerEvent(type=EventType.SCHEDULE),
+            task_id=task_id,
+        )
+    timings = result.get("timings", {})
+    usage = result.get("usage", {})
+    await TaskRun(
         task_id=task_id,
-        storage=storage_context,
-        event=HandlerEvent(
-            type=EventType.SCHEDULE,
-        ),
-    )
-
-    executor = get_executor("simple")
-    result = executor.execute(handler_code, context)
+        started_at=started_at,
+        trigger=trigger,
+        success=result["success"],
+        error=result.get("error"),
+        duration_ms=round((time.perf_counter() - start) * 1000, 2),
+        load_ms=round(timings.get("load", 0.0) * 1000, 2),
+        wait_ms=round(timings.get("wait", 0.0) * 1000, 2),
+        handler_ms=round(timings.get("handler", 0.0) * 1000, 2),
+        save_ms=round(timings.get("save", 0.0) * 1000, 2),
+        cpu_ms=usage.get("cpu_ms"),
+        peak_memory_kb=usage.get("peak_memory_kb"),
+        output_bytes=usage.get("output_bytes"),
+        attempts=result.get("attempts", 0),
+        storage_ids=result.get("storage_ids", []),
+    ).save()
+
+    if not result["success"]:
+        await t.set_fields(last_attempt=started_at)
+        return {"success": False, "error": result["error"]}
+
+    await t.set_fields(last_run=started_at, last_attempt=started_at)
 
-    if not result.success:
-        return {"success": False, "error": result.error}
+    return {"success": True}
 
-    await save_storages_from_context(t.storage_ids, storage_context)
 
-    t.last_run = datetime.now()
-    await t.save()
+async def is_idle(t: Task) -> bool:
+    """Whether an adaptive task should skip this tick because nobody is watching.
 
-    return {"success": True}
+    Unwatched tasks still run every IDLE_TASK_INTERVAL so data is not
+    arbitrarily old when a viewer returns; watched tasks follow their cron.
+    Failed runs count too, so a failing task is slowed down like any other.
+    """
+    last = t.last_attempt or t.last_run
+    if not t.adaptive or not t.storage_ids or not last:
+        return False
+    if (datetime.now() - last).total_seconds() >= IDLE_TASK_INTERVAL:
+        return False
+    return not await visibility.is_watched(t.storage_ids)
+
+
+def circuit_allows_run(t: Task) -> bool:
+    """Whether a scheduled tick may run: circuit closed, or open and due a probe."""
+    if t.circuit == "closed":
+        return True
+    if not t.circuit_opened_at:
+        return True
+    return (datetime.now() - t.circuit_opened_at).total_seconds() >= TASK_CIRCUIT_PROBE_SECONDS
+
+
+async def record_task_outcome(t: Task, success: bool, error: str | None = None) -> None:
+    """Update the task's circuit breaker after a scheduled tick (including retries).
+
+    The circuit opens after TASK_CIRCUIT_THRESHOLD consecutive failed ticks.
+    An open circuit lets one probe through every TASK_CIRCUIT_PROBE_SECONDS;
+    a successful probe closes it, a failed one restarts the wait.
+    """
+    if success:
+        if t.circuit != "closed" or t.consecutive_failures:
+            await t.set_fields(
+                circuit="closed", consecutive_failures=0, circuit_opened_at=None, last_error=None
+            )
+        return
+
+    failures = t.consecutive_failures + 1
+    fields = {"consecutive_failures": failures, "last_error": error}
+    if t.circuit != "closed" or failures >= TASK_CIRCUIT_THRESHOLD:
+        fields.update(circuit="open", circuit_opened_at=datetime.now())
+    await t.set_fields(**fields)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_runs(runs: list[TaskRun]) -> dict:
+    """Success rate and p50/p90/p99 of total and per-phase durations (ms)."""
+    summary = {
+        "count": len(runs),
+        "failures": sum(1 for r in runs if not r.success),
+        "success_rate": round(sum(1 for r in runs if r.success) / len(runs), 4) if runs else None,
+    }
+    for metric in ("duration_ms", "load_ms", "wait_ms", "handler_ms", "save_ms", "cpu_ms"):
+        values = sorted(v for v in (getattr(r, metric) for r in runs) if v is not None)
+        summary[metric] = {
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": values[-1] if values else None,
+        }
+    return summary
+
+
+async def get_task_runs(task_id: str, limit: int = 100) -> dict:
+    """Recent runs of a task with a percentile summary."""
+    runs = await TaskRun.list_for_task(task_id, limit)
+    return {
+        "task_id": task_id,
+        "runs": [r.to_dict() for r in runs],
+        "summary": summarize_runs(runs),
+    }
 
 
 async def get_scheduled_tasks() -> list[dict]:
@@ -119,5 +236,8 @@ async def get_scheduled_tasks() -> list[dict]:
                 "id": t.id,
                 "name": t.name,
                 "schedule": t.schedule,
+                "max_instances": t.max_instances,
+                "coalesce": t.coalesce,
+                "circuit": t.circuit,
             })
     return tasks
@@ -0,0 +1,78 @@
+"""Template cache - shared Jinja2 environment and compiled panel facades."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from jinja2 import BaseLoader, Environment, Template
+
+from app.config import TEMPLATE_CACHE_SIZE
+from app.services import events
+
+# Process-wide environment shared by all panel facades
+_env = Environment(loader=BaseLoader())
+
+# LRU of compiled templates keyed by (panel_id, facade hash)
+_templates: OrderedDict[tuple[str, str], Template] = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def template_hash(source: str) -> str:
+    """Short content hash of a facade source."""
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def get_template(panel_id: str, source: str) -> Template:
+    """Return the compiled template for a panel facade, compiling on miss."""
+    global _hits, _misses
+    key = (panel_id, template_hash(source))
+
+    with _lock:
+        template = _templates.get(key)
+        if template is not None:
+            _templates.move_to_end(key)
+            _hits += 1
+            return template
+        _misses += 1
+
+    # Compile outside the lock; a concurrent miss on the same key just compiles twice
+    template = _env.from_string(source)
+
+    with _lock:
+        _templates[key] = template
+        _templates.move_to_end(key)
+        while len(_templates) > TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    return template
+
+
+def invalidate(panel_id: str | None = None) -> None:
+    """Drop cached templates for a panel, or everything if panel_id is None."""
+    with _lock:
+        if panel_id is None:
+            _templates.clear()
+            return
+        for key in [k for k in _templates if k[0] == panel_id]:
+            del _templates[key]
+
+
+def stats() -> dict:
+    """Cache hit/miss counters."""
+    with _lock:
+        return {
+            "size": len(_templates),
+            "max_size": TEMPLATE_CACHE_SIZE,
+            "hits": _hits,
+            "misses": _misses,
+        }
+
+
+def _on_change(collection: str, ids: list[str]) -> None:
+    if collection == "panels":
+        for pid in ids:
+            invalidate(pid)
+
+
+events.add_listener(_on_change)
@@ -0,0 +1,76 @@
+"""Visibility - track which storages are on a dashboard someone is looking at.
+
+Viewers are documents in the viewers collection listing the storages they
+show and when the view lapses, so the scheduler leader sees viewers on every
+worker. Page loads register a view for VISIBILITY_TTL; live SSE connections
+heartbeat theirs while connected and remove it on disconnect.
+"""
+
+import logging
+import time
+
+from pymongo.errors import PyMongoError
+
+from app import db
+from app.config import VISIBILITY_TTL
+
+logger = logging.getLogger(__name__)
+
+# The leader asks on every tick; a short cache keeps that to one query per window
+_CACHE_SECONDS = 5.0
+_cache: tuple[float, set[str]] | None = None
+
+
+def panel_storage_ids(panels: list[dict]) -> list[str]:
+    """Unique storage ids bound to a list of panel dicts."""
+    return list(dict.fromkeys(sid for p in panels for sid in p.get("storage_ids") or []))
+
+
+async def mark_viewed(viewer_id: str, storage_ids: list[str], ttl: float = VISIBILITY_TTL) -> None:
+    """Record that a viewer is showing these storages for the next ttl seconds."""
+    global _cache
+    try:
+        await db.viewers_col().update_one(
+            {"_id": viewer_id},
+            [{"$set": {
+                "storage_ids": storage_ids,
+                "expires_at": {"$add": ["$$NOW", int(ttl * 1000)]},
+            }}],
+            upsert=True,
+        )
+    except PyMongoError as e:
+        # Visibility only tunes scheduling; never fail a page load over it
+        logger.warning("Failed to record viewer %s: %s", viewer_id, e)
+        return
+    if _cache and not set(storage_ids) <= _cache[1]:
+        _cache = None
+
+
+async def unmark_viewed(viewer_id: str) -> None:
+    """Drop a viewer, e.g. when its live connection closes."""
+    try:
+        await db.viewers_col().delete_one({"_id": viewer_id})
+    except PyMongoError as e:
+        logger.warning("Failed to remove viewer %s: %s", viewer_id, e)
+
+
+async def viewed_storage_ids() -> set[str]:
+    """Storages bound to a panel that some live viewer is showing."""
+    global _cache
+    if _cache and time.monotonic() - _cache[0] < _CACHE_SECONDS:
+        return _cache[1]
+    ids = await db.viewers_col().distinct(
+        "storage_ids", {"$expr": {"$gt": ["$expires_at", "$$NOW"]}}
+    )
+    _cache = (time.monotonic(), set(ids))
+    return _cache[1]
+
+
+async def is_watched(storage_ids: list[str]) -> bool:
+    """Whether any of the storages is currently being viewed."""
+    try:
+        viewed = await viewed_storage_ids()
+    except PyMongoError as e:
+        logger.warning("Failed to read viewers, assuming watched: %s", e)
+        return True
+    return any(sid in viewed for sid in storage_ids)
@@ -90,7 +90,8 @@ function storageNodeHtml(s) {
 }
 
 function taskNodeHtml(t) {
-  const status = t.enabled ? 'enabled' : 'disabled'
+  let status = t.enabled ? 'enabled' : 'disabled'
+  if (t.enabled && t.circuit && t.circuit !== 'closed') status = `degraded (${t.consecutive_failures} failures)`
   return `
     <div class="console-node console-node--task">
       <div class="console-node__header" style="border-left: 3px solid var(--kb-green);">
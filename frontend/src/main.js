@@ -37,20 +37,34 @@ window.debouncedDashboardRefresh = debouncedDashboardRefresh
 
 registerChat(Alpine, {
   onToolEnd(tool, args) {
+    // Storage changes arrive over the live event stream; only layout changes need a refresh
     if (['panel_create', 'panel_delete', 'panel_update', 'market_install'].includes(tool)) {
       debouncedDashboardRefresh()
-    } else if (tool === 'storage_update' && args.storageId) {
-      fetch('/api/panels').then(r => r.json()).then(panels => {
-        panels.filter(p => p.storage_ids?.includes(args.storageId))
-          .forEach(p => {
-            const el = document.querySelector(`[data-panel-id="${p.id}"] .card-content`)
-            if (el) htmx.ajax('GET', `/panels/${p.id}/content`, { target: el, swap: 'innerHTML' })
-          })
-      })
     }
   }
 })
 
+// ============================================
+// Live panel updates (SSE)
+// ============================================
+
+// Server pushes hx-swap-oob fragments for panels whose storages changed
+let liveSource = null
+let liveDashboardId = null
+
+function connectLiveUpdates() {
+  if (!document.getElementById('dashboard-panels')) return
+  const did = getDashboardId()
+  if (liveSource && liveDashboardId === did) return
+  if (liveSource) liveSource.close()
+
+  liveDashboardId = did
+  liveSource = new EventSource(`/d/${did}/events`)
+  liveSource.addEventListener('panels', (e) => {
+    htmx.swap(document.body, e.data, { swapStyle: 'none' })
+  })
+}
+
 Alpine.start()
 
 // ============================================
@@ -212,6 +226,7 @@ window.setAutoCompact = (v) => {
 // Initialize on DOMContentLoaded
 document.addEventListener('DOMContentLoaded', () => {
   initGrid()
+  connectLiveUpdates()
 })
 
 // HTMX integration: destroy/reinit grid on dashboard swap
@@ -227,6 +242,7 @@ document.body.addEventListener('htmx:afterSwap', (e) => {
   const tid = e.detail.target.id
   if (tid === 'dashboard-panels' || tid === 'dashboard-content') {
     setTimeout(initGrid, 50)
+    connectLiveUpdates()
   } else if (e.detail.target.classList?.contains('grid-stack-item') && grid) {
     grid.makeWidget(e.detail.target)
   }
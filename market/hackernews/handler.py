@@ -1,25 +1,31 @@
-"""Hacker News panel handler - fetch top stories from HN Firebase API."""
-from datetime import datetime
+"""Hacker News panel handler - fetch top stories from HN Firebase API.
 
-import httpx
+Async: stories and their top comments are fetched concurrently through the
+injected `async_http` client.
+"""
+import asyncio
+from datetime import datetime
 
 HN_API = "https://hacker-news.firebaseio.com/v0"
 
+# Injected by the sandbox before an async entry point runs
+async_http = None
+
 
-def on_init(storage: dict) -> None:
+async def on_init(storage: dict) -> None:
     """Called once when panel is installed."""
-    _refresh(storage)
+    await _refresh(storage)
 
 
-def on_action(action: str, payload: dict, storage: dict) -> None:
+async def on_action(action: str, payload: dict, storage: dict) -> None:
     """Handle panel actions."""
     if action == "refresh":
-        _refresh(storage)
+        await _refresh(storage)
 
 
-def on_schedule(storage: dict) -> None:
+async def on_schedule(storage: dict) -> None:
     """Scheduled refresh (called by task scheduler)."""
-    _refresh(storage)
+    await _refresh(storage)
 
 
 def _utcnow():
@@ -77,57 +83,57 @@ def _strip_html(text: str) -> str:
     return " ".join("".join(result).split())
 
 
-def _refresh(storage: dict) -> None:
-    """Fetch top stories and top comments from HN."""
+async def _get_json(path: str):
+    resp = await async_http.get(f"{HN_API}/{path}")
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _top_comment(kids: list) -> dict | None:
+    """First comment of a story, trimmed to 200 chars."""
+    if not kids:
+        return None
+    try:
+        comment = await _get_json(f"item/{kids[0]}.json")
+    except Exception:
+        return None
+    if not comment or not comment.get("text"):
+        return None
+    text = _strip_html(comment["text"])
+    if len(text) > 200:
+        text = text[:200] + "..."
+    return {"by": comment.get("by", ""), "text": text}
+
+
+async def _story(story_id: int) -> dict | None:
+    """Fetch one story and its top comment; None if missing or not a story."""
+    try:
+        item = await _get_json(f"item/{story_id}.json")
+    except Exception:
+        return None
+    if not item or item.get("type") != "story":
+        return None
+
+    url = item.get("url", "")
+    return {
+        "title": item.get("title", ""),
+        "url": url,
+        "hn_url": f"https://news.ycombinator.com/item?id={story_id}",
+        "score": item.get("score", 0),
+        "by": item.get("by", ""),
+        "comments_count": item.get("descendants", 0),
+        "time_ago": _time_ago(item.get("time", 0)),
+        "domain": _domain(url),
+        "top_comment": await _top_comment(item.get("kids", [])),
+    }
+
+
+async def _refresh(storage: dict) -> None:
+    """Fetch top stories and top comments from HN, all items in parallel."""
     hn = storage.get("hackernews", {})
 
-    with httpx.Client(timeout=30) as client:
-        resp = client.get(f"{HN_API}/topstories.json")
-        resp.raise_for_status()
-        top_ids = resp.json()[:15]
-
-        stories = []
-        for story_id in top_ids:
-            try:
-                item_resp = client.get(f"{HN_API}/item/{story_id}.json")
-                item_resp.raise_for_status()
-                item = item_resp.json()
-                if not item or item.get("type") != "story":
-                    continue
-
-                url = item.get("url", "")
-                story = {
-                    "title": item.get("title", ""),
-                    "url": url,
-                    "hn_url": f"https://news.ycombinator.com/item?id={story_id}",
-                    "score": item.get("score", 0),
-                    "by": item.get("by", ""),
-                    "comments_count": item.get("descendants", 0),
-                    "time_ago": _time_ago(item.get("time", 0)),
-                    "domain": _domain(url),
-                    "top_comment": None,
-                }
-
-                kids = item.get("kids", [])
-                if kids:
-                    try:
-                        c_resp = client.get(f"{HN_API}/item/{kids[0]}.json")
-                        c_resp.raise_for_status()
-                        comment = c_resp.json()
-                        if comment and comment.get("text"):
-                            text = _strip_html(comment["text"])
-                            if len(text) > 200:
-                                text = text[:200] + "..."
-                            story["top_comment"] = {
-                                "by": comment.get("by", ""),
-                                "text": text,
-                            }
-                    except Exception:
-                        pass
-
-                stories.append(story)
-            except Exception:
-                continue
-
-    hn["stories"] = stories
+    top_ids = (await _get_json("topstories.json"))[:15]
+    results = await asyncio.gather(*(_story(story_id) for story_id in top_ids))
+
+    hn["stories"] = [story for story in results if story]
     hn["updated_at"] = _utcnow().isoformat()
@@ -0,0 +1,24 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import api_panels, api_system
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(api_panels.router)
+    app.include_router(api_system.router)
+    return TestClient(app)
+
+
+def test_system_stats_report_sandbox_pools_and_change_feed():
+    stats = _client().get("/api/system/stats").json()
+
+    assert set(stats["sandbox"]) == {"process", "docker", "runaways"}
+    assert set(stats["change_feed"]) >= {"mode", "process_id"}
+
+
+def test_cache_stats_only_report_caches():
+    stats = _client().get("/api/panels/cache/stats").json()
+
+    assert set(stats) == {"templates", "renders", "http"}
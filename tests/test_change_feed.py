@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.services import change_feed, events
+
+T0 = datetime(2026, 1, 1, 12)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeCollection:
+    """Evaluates the poll query: $or of $gte on the stamps, plus origin $ne."""
+
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+
+    def find(self, query, projection):
+        def matches(doc):
+            if doc.get("origin") == query["origin"]["$ne"]:
+                return False
+            return any(
+                doc.get(key) is not None and doc[key] >= cond[key]["$gte"]
+                for cond in query["$or"]
+                for key in cond
+            )
+
+        return FakeCursor([dict(doc) for doc in self.docs.values() if matches(doc)])
+
+    def write(self, _id, at, **fields):
+        self.docs[_id] = {"_id": _id, "updated_at": at, "origin": "other", **fields}
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    col = FakeCollection()
+    published = []
+    monkeypatch.setattr(db, "get_db", lambda: {"storages": col})
+    monkeypatch.setattr(events, "publish", lambda collection, ids: published.extend(ids))
+    return col, published
+
+
+def _poll(since, seen):
+    return asyncio.run(change_feed._poll_collection("storages", since, seen))
+
+
+def test_write_sharing_the_last_timestamp_is_not_missed(feed):
+    col, published = feed
+    col.write("a", T0)
+    since, seen = _poll(T0 - timedelta(seconds=1), set())
+    assert published == ["a"] and since == T0
+
+    col.write("b", T0)  # landed in the same millisecond, after the last poll read
+    since, seen = _poll(since, seen)
+
+    assert published == ["a", "b"]
+    assert _poll(since, seen) == (since, seen)
+    assert published == ["a", "b"]
+
+
+def test_rewrite_at_the_same_timestamp_with_new_version_is_published(feed):
+    col, published = feed
+    col.write("a", T0, version=1)
+    since, seen = _poll(T0, set())
+
+    col.write("a", T0, version=2)
+    _poll(since, seen)
+
+    assert published == ["a", "a"]
+
+
+def test_own_writes_and_deletes(feed, monkeypatch):
+    col, published = feed
+    monkeypatch.setattr(db, "PROCESS_ID", "me")
+    col.write("mine", T0)
+    col.docs["mine"]["origin"] = "me"
+    col.write("gone", T0 - timedelta(days=1), deleted_at=T0 + timedelta(seconds=1))
+
+    since, _ = _poll(T0, set())
+
+    assert published == ["gone"]
+    assert since == T0 + timedelta(seconds=1)
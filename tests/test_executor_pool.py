@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from app.sandbox import executor
+from app.sandbox.protocol import EventType, HandlerContext, HandlerEvent
+from app.sandbox.simple import SimpleExecutor
+
+
+@pytest.fixture
+def single_worker(monkeypatch):
+    monkeypatch.setattr(executor, "EXECUTOR_WORKERS", 1)
+    monkeypatch.setattr(executor, "EXECUTOR_POOL", "thread")
+    monkeypatch.setattr(executor, "_pool", None)
+    monkeypatch.setattr(executor, "_runaways", 0)
+    yield
+    if executor._pool is not None:
+        executor._pool.shutdown(wait=False)
+
+
+def _schedule(storage: dict) -> HandlerContext:
+    return HandlerContext(storage=storage, event=HandlerEvent(type=EventType.SCHEDULE))
+
+
+def test_runaway_handler_does_not_block_the_next_run(single_worker):
+    runaway = (
+        "def on_schedule(storage):\n"
+        "    while not storage['s']['stop']:\n"
+        "        time.sleep(0.01)\n"
+    )
+    quick = "def on_schedule(storage):\n    storage['s']['n'] = 1\n"
+    sandbox = SimpleExecutor(timeout=30)
+    stuck = {"s": {"stop": False}}
+
+    async def run():
+        timed_out = await sandbox.execute_async(runaway, _schedule(stuck), timeout=0.2)
+        context = _schedule({"s": {}})
+        start = time.perf_counter()
+        result = await sandbox.execute_async(quick, context, timeout=5)
+        return timed_out, result, context, time.perf_counter() - start
+
+    try:
+        timed_out, result, context, elapsed = asyncio.run(run())
+    finally:
+        stuck["s"]["stop"] = True
+
+    assert timed_out.timed_out and not timed_out.success
+    assert result.success and context.storage == {"s": {"n": 1}}
+    assert elapsed < 2
+    assert executor.pool_stats()["runaways"] == 1
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services import handlers
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    monkeypatch.setattr(handlers, "HANDLER_CONCURRENCY", 1)
+    monkeypatch.setattr(handlers, "_slots", None)
+    monkeypatch.setattr(handlers, "_slots_in_use", 0)
+
+
+def test_slots_limit_concurrent_handlers_and_are_counted(one_slot):
+    order = []
+
+    async def run(name):
+        async with handlers._handler_slot():
+            order.append((name, handlers.concurrency_stats()["in_use"]))
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(run("a"), run("b"))
+
+    asyncio.run(main())
+
+    assert order == [("a", 1), ("b", 1)]
+    assert handlers.concurrency_stats()["in_use"] == 0
+
+
+def test_storage_locks_serialize_overlapping_callers():
+    events = []
+
+    async def run(name, ids):
+        async with handlers.storage_locks(ids):
+            events.append(f"{name} in")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} out")
+
+    async def main():
+        await asyncio.gather(run("a", ["x", "y"]), run("b", ["y", "x"]), run("c", ["z"]))
+
+    asyncio.run(main())
+
+    assert events.index("a out") < events.index("b in")
+    assert events.index("c in") < events.index("a out")
+
+
+def test_storage_locks_are_dropped_when_idle():
+    async def main():
+        async with handlers.storage_locks(["idle-a", "idle-b"]):
+            assert handlers.concurrency_stats()["locked_storages"] == ["idle-a", "idle-b"]
+
+    asyncio.run(main())
+
+    assert "idle-a" not in handlers._storage_locks
+    assert "idle-b" not in handlers._storage_locks
@@ -0,0 +1,191 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import history, history_file
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_file, "HISTORY_DIR", tmp_path)
+    monkeypatch.setattr(history, "_backend", history_file.FileHistoryBackend())
+    monkeypatch.setattr(history_file, "_index_cache", {})
+    return tmp_path
+
+
+def _yesterday(hours: float = 0) -> datetime:
+    midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=1) + timedelta(hours=hours)
+
+
+def _write(source, data, granularity, ts):
+    return asyncio.run(history.write_history(source, data, granularity, ts))
+
+
+def _read(source, **kwargs):
+    return asyncio.run(history.read_history(source, "3d", **kwargs))
+
+
+def test_index_entries_point_at_records(history_dir):
+    records = [_write("s", {"v": i}, "minute", _yesterday(i)) for i in range(3)]
+
+    segment = history_dir / "s" / f"{_yesterday().date()}.ndjson"
+    entries = history_file._read_entries(history_file._index_path(segment))
+    assert len(entries) == 3
+    raw = segment.read_bytes()
+    for record, (ts, period, offset, length) in zip(records, entries):
+        assert json.loads(raw[offset:offset + length]) == record
+        assert ts == period == datetime.fromisoformat(record["timestamp"]).timestamp()
+
+
+def test_read_keeps_last_record_per_period(history_dir):
+    for i in range(3):
+        _write("s", {"v": i}, "day", _yesterday(i))
+
+    assert [r["data"] for r in _read("s")] == [{"v": 2}]
+    segment = history_dir / "s" / f"{_yesterday().date()}.ndjson"
+    assert len(segment.read_bytes().splitlines()) == 3  # still append-only on disk
+
+
+def test_out_of_order_write_does_not_replace_later_record(history_dir):
+    _write("s", {"v": 1}, "day", _yesterday(5))
+    _write("s", {"v": 0}, "day", _yesterday(1))
+
+    assert [r["data"] for r in _read("s")] == [{"v": 1}]
+
+
+def test_repair_indexes_orphan_lines_and_drops_partial_line(history_dir):
+    _write("s", {"v": 0}, "minute", _yesterday(1))
+    segment = history_dir / "s" / f"{_yesterday().date()}.ndjson"
+    orphan = {"timestamp": _yesterday(2).isoformat(), "data": {"v": "orphan"}}
+    with open(segment, "ab") as f:
+        f.write(json.dumps(orphan).encode() + b"\n")
+        f.write(b'{"timestamp": "half')
+
+    _write("s", {"v": 3}, "minute", _yesterday(3))
+
+    assert [r["data"]["v"] for r in _read("s")] == [0, "orphan", 3]
+    assert segment.read_bytes().endswith(b"\n")
+    assert len(history_file._read_entries(history_file._index_path(segment))) == 3
+
+
+def test_compaction_compresses_closed_days_and_late_writes_decompress(history_dir):
+    for i in range(4):
+        _write("s", {"v": i}, "hour", _yesterday(i // 2))
+    before = _read("s")
+
+    report = asyncio.run(history_file.FileHistoryBackend().compact("s", None, None, None))
+
+    day = _yesterday().date()
+    plain = history_dir / "s" / f"{day}.ndjson"
+    compressed = history_dir / "s" / f"{day}.ndjson.gz"
+    assert report["segments_compacted"] == 1
+    assert compressed.exists() and not plain.exists()
+    # Superseded records are dropped when compressing
+    assert len(gzip.decompress(compressed.read_bytes()).splitlines()) == 2
+    assert _read("s") == before
+
+    _write("s", {"v": 9}, "hour", _yesterday(5))
+
+    assert plain.exists() and not compressed.exists()
+    late = {"timestamp": history._format_ts(_yesterday(5)), "data": {"v": 9}}
+    assert _read("s") == before + [late]
+
+
+def test_raw_retention_counts_removed_records(history_dir):
+    old = _yesterday() - timedelta(days=10)
+    for i in range(3):
+        _write("s", {"v": i}, "minute", old + timedelta(minutes=i))
+    _write("s", {"v": 0}, "minute", _yesterday())
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=5)
+    report = asyncio.run(history_file.FileHistoryBackend().compact("s", cutoff, None, None))
+
+    assert report["raw_removed"] == 3
+    assert not list((history_dir / "s").glob(f"{old.date()}.*"))
+
+
+@pytest.mark.parametrize("resolution", ["5m", "1h", "2h", "1d"])
+def test_rollups_only_count_the_last_record_per_period(history_dir, resolution):
+    for i in range(5):
+        _write("s", {"v": float(4 - i)}, "day", _yesterday(2 * i))
+
+    points = _read("s", resolution=resolution)
+
+    assert [(p["count"], p["data"]["v"]["avg"]) for p in points] == [(1, 0.0)]
+
+
+def _compact():
+    return asyncio.run(history_file.FileHistoryBackend().compact("s", None, None, None))
+
+
+def test_stream_survives_compaction_between_batches(history_dir):
+    two_days_ago = _yesterday() - timedelta(days=1)
+    _write("s", {"v": 1}, "hour", two_days_ago)
+    _write("s", {"v": 2}, "hour", _yesterday())
+
+    async def read_while_compacting():
+        seen = []
+        async for record in history.iter_history("s", "3d"):
+            seen.append(record["data"]["v"])
+            if len(seen) == 1:
+                # the second day's plain segment is replaced by a gzip one mid-stream
+                await asyncio.to_thread(_compact)
+        return seen
+
+    assert asyncio.run(read_while_compacting()) == [1, 2]
+
+
+def test_open_segment_keeps_reading_after_unlink(history_dir):
+    _write("s", {"v": 1}, "hour", _yesterday())
+    segment = history_dir / "s" / f"{_yesterday().date()}.ndjson"
+
+    path, data, entries = history_file._open_segment(segment)
+    _compact()
+    assert not segment.exists()
+
+    with data:
+        assert [r["data"] for r in history_file._records(path, data, entries)] == [{"v": 1}]
+
+
+def test_legacy_files_are_migrated_at_startup_not_on_read(history_dir):
+    source_dir = history_dir / "s"
+    source_dir.mkdir()
+    day = _yesterday()
+    for hour in range(3):
+        ts = day + timedelta(hours=hour)
+        legacy = {"timestamp": ts.isoformat(), "data": {"v": float(hour)}}
+        (source_dir / f"{ts:%Y-%m-%d_%H}.json").write_text(json.dumps(legacy))
+
+    assert _read("s") == []  # reads no longer touch legacy files
+
+    asyncio.run(history.migrate_history())
+
+    assert [r["data"]["v"] for r in _read("s")] == [0.0, 1.0, 2.0]
+    assert not list(source_dir.glob("*.json"))
+    (point,) = _read("s", resolution="1d")
+    assert point["count"] == 3 and point["data"]["v"]["avg"] == 1.0
+    assert len(history_file._read_entries(history_file._index_path(
+        source_dir / f"{day.date()}.ndjson"
+    ))) == 3
+
+
+def test_compact_history_applies_per_source_retention(history_dir, monkeypatch):
+    old = _yesterday() - timedelta(days=10)
+    for source in ("kept", "short"):
+        _write(source, {"v": 1}, "hour", old)
+    monkeypatch.setattr(
+        history, "HISTORY_RETENTION", {"short": {"raw_days": 5, "hourly_days": 5}}
+    )
+
+    summary = asyncio.run(history.compact_history())
+
+    short, kept = summary["sources"]["short"], summary["sources"]["kept"]
+    assert (short["raw_removed"], short["rollups_removed"]) == (1, 1)
+    assert (kept["raw_removed"], kept["rollups_removed"], kept["segments_compacted"]) == (0, 0, 1)
+    assert summary["totals"]["raw_removed"] == 1
+    assert not list((history_dir / "short").glob("*.ndjson*"))
+    assert (history_dir / "short" / "rollups" / f"day-{old:%Y-%m}.json").exists()
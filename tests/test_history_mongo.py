@@ -0,0 +1,181 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+from app.services import history, history_mongo
+
+DAY = datetime(2026, 1, 5)  # naive UTC, as motor returns it
+
+
+def _plain(value):
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else value
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                arg = _plain(arg)
+                if value is None or not {
+                    "$gte": value >= arg, "$gt": value > arg,
+                    "$lt": value < arg, "$lte": value <= arg,
+                }[op]:
+                    return False
+        elif value != _plain(cond):
+            return False
+    return True
+
+
+def _naive(doc: dict) -> dict:
+    return {k: _plain(v) for k, v in doc.items()}
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield copy.deepcopy(doc)
+
+
+class Result:
+    def __init__(self, n):
+        self.matched_count = self.deleted_count = n
+
+
+class FakeCollection:
+    """In-memory stand-in for the history and history_rollups collections."""
+
+    def __init__(self):
+        self.docs: list[dict] = []
+
+    def find(self, query, projection=None):
+        return Cursor([d for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = self.find(query).docs
+        if sort:
+            key, direction = sort[0]
+            docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return copy.deepcopy(docs[0]) if docs else None
+
+    async def insert_one(self, doc):
+        if "_id" in doc and any(d.get("_id") == doc["_id"] for d in self.docs):
+            raise DuplicateKeyError("E11000")
+        self.docs.append(_naive(doc))
+
+    async def replace_one(self, query, doc):
+        for i, existing in enumerate(self.docs):
+            if _matches(existing, query):
+                self.docs[i] = {"_id": existing["_id"], **doc}
+                return Result(1)
+        return Result(0)
+
+    async def delete_one(self, query):
+        return await self._delete(query, 1)
+
+    async def delete_many(self, query):
+        return await self._delete(query, None)
+
+    async def _delete(self, query, limit):
+        removed = [d for d in self.docs if _matches(d, query)][:limit]
+        self.docs = [d for d in self.docs if not any(d is r for r in removed)]
+        return Result(len(removed))
+
+    async def distinct(self, key):
+        return list({d[key] for d in self.docs})
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    raw, rollups = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(db, "history_col", lambda: raw)
+    monkeypatch.setattr(db, "history_rollups_col", lambda: rollups)
+    monkeypatch.setattr(history_mongo, "_BATCH_SIZE", 2)
+    backend = history_mongo.MongoHistoryBackend()
+    monkeypatch.setattr(history, "_backend", backend)
+    return backend
+
+
+def _at(hours: float) -> datetime:
+    return (DAY + timedelta(hours=hours)).replace(tzinfo=timezone.utc)
+
+
+def _write(data, granularity, hours):
+    asyncio.run(history.write_history("s", data, granularity, _at(hours)))
+
+
+def _batches(backend, since=DAY - timedelta(days=1)):
+    async def collect():
+        return [b async for b in backend.iter_batches("s", since.replace(tzinfo=timezone.utc))]
+    return asyncio.run(collect())
+
+
+def _values(batches) -> list:
+    return [r["data"]["v"] for batch in batches for r in batch]
+
+
+def test_non_adjacent_records_of_a_period_keep_only_the_last(backend):
+    _write({"v": "day-1"}, "day", 1)
+    _write({"v": "hour-3"}, "hour", 3)  # another period between the two day records
+    _write({"v": "day-5"}, "day", 5)
+
+    assert _values(_batches(backend)) == ["hour-3", "day-5"]
+
+
+def test_out_of_order_write_does_not_replace_later_record(backend):
+    _write({"v": "late"}, "day", 5)
+    _write({"v": "early"}, "day", 1)
+
+    assert _values(_batches(backend)) == ["late"]
+
+
+def test_batches_are_cut_at_day_boundaries(backend):
+    for day in range(3):
+        for hour in range(2):
+            _write({"v": day * 10 + hour}, "hour", day * 24 + hour)
+
+    batches = _batches(backend)
+
+    assert [len(b) for b in batches] == [2, 2, 2]
+    assert _values(batches) == [0, 1, 10, 11, 20, 21]
+
+
+def test_rollups_are_rebuilt_when_a_period_is_replaced(backend):
+    _write({"v": 1.0}, "hour", 1)
+    _write({"v": 4.0}, "hour", 2)
+    _write({"v": 3.0}, "hour", 2.5)  # replaces the 2h record
+
+    (point,) = asyncio.run(history.read_history("s", "400d", resolution="1d"))
+
+    assert point["count"] == 2
+    assert point["data"]["v"] == {"min": 1.0, "max": 3.0, "avg": 2.0, "last": 3.0}
+
+
+def test_latest_sources_and_retention(backend):
+    _write({"v": 1}, "hour", 1)
+    _write({"v": 2}, "hour", 50)
+
+    assert asyncio.run(history.read_latest("s")) == {"v": 2}
+    assert asyncio.run(history.list_sources()) == ["s"]
+
+    report = asyncio.run(backend.compact("s", _at(24), _at(24), None))
+
+    assert report == {"raw_removed": 1, "rollups_removed": 1}
+    assert _values(_batches(backend)) == [2]
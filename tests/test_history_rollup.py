@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import history_rollup as rollup
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _record(offset: float, data) -> dict:
+    ts = datetime.fromtimestamp(T0 + offset, timezone.utc).isoformat()
+    return {"timestamp": ts, "data": data}
+
+
+RECORDS = [
+    _record(0, {"temp": 3, "main": {"hum": 40}}),
+    _record(120, {"temp": -1.5, "flag": True}),
+    _record(290, {"main": {"hum": 42}}),
+    _record(301, {"temp": 7, "note": "text"}),
+    _record(400, {"note": "no numbers"}),
+    _record(3599, {"temp": 2, "main": {"hum": 39}}),
+    _record(3700, 5),
+]
+
+
+@pytest.mark.parametrize("size", [60, 300, 3600, 86400])
+def test_aggregate_matches_per_record_buckets(size):
+    found = rollup.samples(RECORDS)
+    starts = sorted({rollup.bucket_start(ts, size) for ts, _ in found})
+    expected = [(start, rollup.build_bucket(found, start, size)) for start in starts]
+
+    assert rollup.aggregate(RECORDS, size) == expected
+
+
+def test_aggregate_points():
+    (point,) = [rollup.to_point(s, b) for s, b in rollup.aggregate(RECORDS[:4], 3600)]
+
+    assert point["count"] == 4
+    assert point["data"]["temp"] == {"min": -1.5, "max": 7.0, "avg": 8.5 / 3, "last": 7.0}
+    assert point["data"]["main.hum"] == {"min": 40.0, "max": 42.0, "avg": 41.0, "last": 42.0}
+    assert "flag" not in point["data"] and "note" not in point["data"]
+
+
+def test_aggregate_without_numeric_records():
+    assert rollup.aggregate([_record(0, {"note": "x"}), {"data": {"v": 1}}], 60) == []
+
+
+def test_hourly_buckets_regroup_into_coarser_ones():
+    found = rollup.samples(RECORDS)
+    hourly = rollup.aggregate(RECORDS, rollup.HOUR)
+
+    assert rollup.regroup(hourly, 2 * rollup.HOUR) == rollup.aggregate(RECORDS, 2 * rollup.HOUR)
+    assert rollup.regroup(hourly, 2 * rollup.HOUR)[0][1]["count"] == len(found)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import history as history_routes
+from app.services import history, history_file
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_file, "HISTORY_DIR", tmp_path)
+    monkeypatch.setattr(history, "_backend", history_file.FileHistoryBackend())
+    monkeypatch.setattr(history_file, "_index_cache", {})
+    app = FastAPI()
+    app.include_router(history_routes.router)
+    return TestClient(app)
+
+
+def _write_days(days: int, per_day: int) -> None:
+    midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in range(days, 0, -1):
+        for i in range(per_day):
+            ts = midnight - timedelta(days=day) + timedelta(minutes=i)
+            asyncio.run(history.write_history("s", {"v": i}, "minute", ts))
+
+
+def test_json_and_ndjson_stream_the_same_records(client):
+    _write_days(2, 3)
+
+    as_json = client.get("/api/history/s", params={"range": "3d"})
+    as_ndjson = client.get("/api/history/s", params={"range": "3d", "format": "ndjson"})
+
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_ndjson.headers["content-type"] == "application/x-ndjson"
+    records = as_json.json()
+    assert [r["data"]["v"] for r in records] == [0, 1, 2, 0, 1, 2]
+    assert [json.loads(line) for line in as_ndjson.text.splitlines()] == records
+
+
+def test_empty_history_is_an_empty_array(client):
+    assert client.get("/api/history/none").json() == []
+
+
+def test_invalid_range_is_rejected_before_streaming(client):
+    response = client.get("/api/history/s", params={"range": "soon"})
+
+    assert response.status_code == 400
+
+
+def test_encoder_flushes_in_chunks(monkeypatch):
+    monkeypatch.setattr(history_routes, "_STREAM_CHUNK_BYTES", 20)
+
+    async def items():
+        for i in range(5):
+            yield {"value": i}
+
+    async def collect():
+        return [chunk async for chunk in history_routes._encode(items(), "json")]
+
+    chunks = asyncio.run(collect())
+
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == [{"value": i} for i in range(5)]
+
+
+def test_aggregation_merges_buckets_split_across_batches(monkeypatch):
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    class Batches:
+        async def iter_batches(self, source, cutoff):
+            for minute, value in ((0, 1.0), (1, 3.0), (7, 5.0)):
+                ts = start - timedelta(hours=1) + timedelta(minutes=minute)
+                yield [{"timestamp": history._format_ts(ts), "data": {"v": value}}]
+
+    monkeypatch.setattr(history, "_backend", Batches())
+
+    points = asyncio.run(history.read_history("s", "1d", resolution="5m"))
+
+    assert [(p["count"], p["data"]["v"]["avg"]) for p in points] == [(2, 2.0), (1, 5.0)]
@@ -0,0 +1,108 @@
+import gzip
+
+import httpx
+import pytest
+
+from app.sandbox.http_client import HandlerHttpClient, SharedHttpClient
+
+
+class Origin:
+    """MockTransport handler recording each request that reaches the network."""
+
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = self.headers.get("etag")
+        if etag and request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers=self.headers)
+        body = request.headers.get("x-api-key", "public").encode()
+        return httpx.Response(200, headers=self.headers, content=body)
+
+
+def _client(origin: Origin) -> SharedHttpClient:
+    return SharedHttpClient(transport=httpx.MockTransport(origin), rate=1000, burst=1000)
+
+
+def test_fresh_response_is_served_from_cache():
+    origin = Origin({"cache-control": "max-age=60"})
+    shared = _client(origin)
+
+    first = shared.get("https://api.test/items")
+    second = shared.get("https://api.test/items")
+
+    assert first.text == second.text == "public"
+    assert len(origin.requests) == 1
+    assert shared.stats()["hits"] == 1
+
+
+def test_stale_response_is_revalidated_with_etag():
+    origin = Origin({"cache-control": "no-cache", "etag": '"v1"'})
+    shared = _client(origin)
+
+    shared.get("https://api.test/items")
+    response = shared.get("https://api.test/items")
+
+    assert response.status_code == 200 and response.text == "public"
+    assert origin.requests[1].headers["if-none-match"] == '"v1"'
+    assert shared.stats()["revalidated"] == 1
+
+
+@pytest.mark.parametrize("cache_control", ["no-store", "private, max-age=60"])
+def test_uncacheable_responses_are_not_stored(cache_control):
+    origin = Origin({"cache-control": cache_control})
+    shared = _client(origin)
+
+    shared.get("https://api.test/items")
+    shared.get("https://api.test/items")
+
+    assert len(origin.requests) == 2
+
+
+def test_per_caller_requests_bypass_the_cache():
+    origin = Origin({"cache-control": "max-age=60"})
+    shared = _client(origin)
+
+    alice = HandlerHttpClient(shared, headers={"X-Api-Key": "alice"})
+    bob = HandlerHttpClient(shared, headers={"X-Api-Key": "bob"})
+
+    assert alice.get("https://api.test/me").text == "alice"
+    assert bob.get("https://api.test/me").text == "bob"
+    shared.get("https://api.test/me", auth=("user", "pass"))
+    assert len(origin.requests) == 3
+    assert shared.stats()["hits"] == 0
+
+
+def test_cached_response_is_decoded_once():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        headers = {"cache-control": "max-age=60", "content-encoding": "gzip"}
+        return httpx.Response(200, headers=headers, content=gzip.compress(b"zipped"))
+
+    shared = SharedHttpClient(transport=httpx.MockTransport(handler), rate=1000, burst=1000)
+
+    assert shared.get("https://api.test/z").text == "zipped"
+    assert shared.get("https://api.test/z").text == "zipped"
+    assert len(requests) == 1
+
+
+def test_handler_client_does_not_follow_redirects_by_default():
+    def handler(request):
+        if request.url.path == "/old":
+            return httpx.Response(301, headers={"location": "https://api.test/new"})
+        return httpx.Response(200, content=b"new")
+
+    shared = SharedHttpClient(transport=httpx.MockTransport(handler), rate=1000, burst=1000)
+
+    assert HandlerHttpClient(shared).get("https://api.test/old").status_code == 301
+    client = HandlerHttpClient(shared, follow_redirects=True)
+    assert client.get("https://api.test/old").text == "new"
+
+
+def test_handler_client_rejects_unsupported_arguments():
+    with pytest.raises(TypeError):
+        HandlerHttpClient(_client(Origin()), verify=False)
@@ -0,0 +1,133 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+from app.services.leases import Lease
+
+
+class FakeLocks:
+    """Locks collection evaluating the lease's filter and update pipeline at a settable $$NOW."""
+
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.now = datetime(2026, 1, 1, 12)
+
+    def _eval(self, expr, doc):
+        if expr == "$$NOW":
+            return self.now
+        if isinstance(expr, str) and expr.startswith("$"):
+            return doc.get(expr[1:])
+        if isinstance(expr, dict):
+            ((op, args),) = expr.items()
+            values = [self._eval(arg, doc) for arg in args]
+            if op == "$eq":
+                return values[0] == values[1]
+            if op == "$lt":
+                return values[0] is not None and values[0] < values[1]
+            if op == "$add":
+                return values[0] + timedelta(milliseconds=values[1])
+            if op == "$cond":
+                return values[1] if values[0] else values[2]
+        return expr
+
+    def _matches(self, doc, query):
+        for key, cond in query.items():
+            if key == "$or":
+                if not any(self._matches(doc, sub) for sub in cond):
+                    return False
+            elif key == "$expr":
+                if not self._eval(cond, doc):
+                    return False
+            elif doc.get(key) != cond:
+                return False
+        return True
+
+    async def find_one_and_update(self, query, pipeline, upsert=False, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and not self._matches(doc, query):
+            if upsert:
+                raise DuplicateKeyError("E11000 duplicate key")
+            return None
+        doc = doc or {"_id": query["_id"]}
+        for stage in pipeline:
+            doc = {**doc, **{k: self._eval(v, doc) for k, v in stage["$set"].items()}}
+        self.docs[doc["_id"]] = doc
+        return copy.deepcopy(doc)
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self._matches(doc, query):
+            del self.docs[query["_id"]]
+
+    async def find_one(self, query):
+        return copy.deepcopy(self.docs.get(query["_id"]))
+
+
+@pytest.fixture
+def locks(monkeypatch):
+    col = FakeLocks()
+    monkeypatch.setattr(db, "locks_col", lambda: col)
+    return col
+
+
+def _as(monkeypatch, process_id, call):
+    monkeypatch.setattr(db, "PROCESS_ID", process_id)
+    return asyncio.run(call)
+
+
+def test_only_one_process_holds_the_lease(monkeypatch, locks):
+    lease = Lease("scheduler", ttl=30)
+
+    assert _as(monkeypatch, "a", lease.acquire())
+    assert not _as(monkeypatch, "b", lease.acquire())
+    assert locks.docs["scheduler"]["holder"] == "a"
+
+
+def test_renewal_extends_expiry_but_keeps_acquired_at(monkeypatch, locks):
+    lease = Lease("scheduler", ttl=30)
+    _as(monkeypatch, "a", lease.acquire())
+    acquired = locks.docs["scheduler"]["acquired_at"]
+
+    locks.now += timedelta(seconds=20)
+    assert _as(monkeypatch, "a", lease.acquire())
+
+    doc = locks.docs["scheduler"]
+    assert doc["acquired_at"] == acquired
+    assert doc["expires_at"] == locks.now + timedelta(seconds=30)
+
+
+def test_expired_lease_is_taken_over(monkeypatch, locks):
+    lease = Lease("scheduler", ttl=30)
+    _as(monkeypatch, "a", lease.acquire())
+
+    locks.now += timedelta(seconds=31)
+
+    assert _as(monkeypatch, "b", lease.acquire())
+    assert locks.docs["scheduler"]["acquired_at"] == locks.now
+    assert not _as(monkeypatch, "a", lease.acquire())
+
+
+def test_release_only_by_the_holder(monkeypatch, locks):
+    lease = Lease("scheduler", ttl=30)
+    _as(monkeypatch, "a", lease.acquire())
+
+    _as(monkeypatch, "b", lease.release())
+    assert _as(monkeypatch, "b", lease.current())["holder"] == "a"
+
+    _as(monkeypatch, "a", lease.release())
+    assert _as(monkeypatch, "b", lease.current()) is None
+    assert _as(monkeypatch, "b", lease.acquire())
+
+
+def test_current_reports_holder(monkeypatch, locks):
+    lease = Lease("scheduler", ttl=30)
+    _as(monkeypatch, "a", lease.acquire())
+
+    current = _as(monkeypatch, "a", lease.current())
+
+    assert current["is_self"] and current["holder"] == "a"
+    assert current["acquired_at"] == locks.now.isoformat()
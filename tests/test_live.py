@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.services import events, live, panels_v2, visibility
+
+DASHBOARD = {
+    "panels": [
+        {"id": "p1", "storage_ids": ["s1"]},
+        {"id": "p2", "storage_ids": ["s1", "s2"]},
+        {"id": "p3", "storage_ids": []},
+    ]
+}
+
+
+@pytest.fixture
+def dashboard(monkeypatch):
+    calls = {"renders": [], "viewed": [], "unviewed": []}
+
+    async def get_dashboard(dashboard_id):
+        return DASHBOARD
+
+    async def render_panels(panel_ids):
+        calls["renders"].append(sorted(panel_ids))
+        return {pid: f"<b>{pid}</b>" for pid in panel_ids}
+
+    async def mark_viewed(viewer_id, storage_ids, ttl):
+        calls["viewed"].append(storage_ids)
+
+    async def unmark_viewed(viewer_id):
+        calls["unviewed"].append(viewer_id)
+
+    monkeypatch.setattr(live, "get_dashboard", get_dashboard)
+    monkeypatch.setattr(live, "COALESCE_SECONDS", 0.01)
+    monkeypatch.setattr(panels_v2, "render_panels", render_panels)
+    monkeypatch.setattr(visibility, "mark_viewed", mark_viewed)
+    monkeypatch.setattr(visibility, "unmark_viewed", unmark_viewed)
+    return calls
+
+
+def test_storage_changes_stream_coalesced_panel_swaps(dashboard):
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    async def main():
+        nonlocal disconnected
+        stream = live.dashboard_updates("default", is_disconnected)
+        assert await anext(stream) == ": connected\n\n"
+
+        events.publish("storages", ["s2"])
+        events.publish("storages", ["s1"])  # same burst: one render
+        events.publish("tasks", ["t"])  # not subscribed
+        message = await anext(stream)
+
+        disconnected = True
+        events.publish("panels", ["p3"])
+        rest = [m async for m in stream]
+        return message, rest
+
+    message, rest = asyncio.run(main())
+
+    assert message.startswith("event: panels\ndata: ")
+    assert "data-panel-id='p1'" in message and "<b>p2</b>" in message
+    assert "p3" not in message
+    assert dashboard["renders"] == [["p1", "p2"]]
+    assert rest == []
+    assert dashboard["viewed"] == [["s1", "s2"]]
+    assert len(dashboard["unviewed"]) == 1
+    assert events.subscriber_count() == 0
+
+
+def test_sse_frames_multiline_data():
+    assert live._sse("panels", "a\nb") == "event: panels\ndata: a\ndata: b\n\n"
+    assert live._sse("ping", "") == "event: ping\ndata: \n\n"
+
+
+def test_slow_subscriber_drops_events_instead_of_blocking():
+    async def main():
+        queue = events.subscribe({"storages"}, maxsize=1)
+        try:
+            events.publish("storages", ["a"])
+            events.publish("storages", ["b"])
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+        finally:
+            events.unsubscribe(queue)
+
+    assert asyncio.run(main()) == [{"collection": "storages", "ids": ["a"]}]
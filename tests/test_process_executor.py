@@ -0,0 +1,53 @@
+import pytest
+
+from app.sandbox import process
+from app.sandbox.process import ProcessExecutor
+from app.sandbox.protocol import EventType, HandlerContext, HandlerEvent
+
+
+@pytest.fixture
+def executor():
+    yield ProcessExecutor(timeout=10)
+    process.shutdown_process_pool()
+
+
+def _schedule(storage: dict) -> HandlerContext:
+    return HandlerContext(storage=storage, event=HandlerEvent(type=EventType.SCHEDULE))
+
+
+def test_handler_runs_in_worker_and_updates_storage(executor):
+    code = "def on_schedule(storage):\n    storage['s']['n'] = storage['s']['n'] + 1\n"
+
+    context = _schedule({"s": {"n": 1}})
+
+    result = executor.execute(code, context)
+
+    assert result.success, result.error
+    assert context.storage == {"s": {"n": 2}}
+
+
+def test_strptime_works_in_worker(executor):
+    # datetime.strptime imports _strptime lazily from C code
+    code = (
+        "from datetime import datetime\n"
+        "def on_schedule(storage):\n"
+        "    day = datetime.strptime('2026-02-19', '%Y-%m-%d')\n"
+        "    storage['s']['weekday'] = day.weekday()\n"
+    )
+    context = _schedule({"s": {}})
+
+    result = executor.execute(code, context)
+
+    assert result.success, result.error
+    assert context.storage == {"s": {"weekday": 3}}
+
+
+def test_timed_out_worker_is_replaced(executor):
+    slow = "def on_schedule(storage):\n    while True:\n        pass\n"
+    fast = "def on_schedule(storage):\n    storage['s']['ok'] = True\n"
+
+    assert ProcessExecutor(timeout=0.5).execute(slow, _schedule({"s": {}})).timed_out
+
+    context = _schedule({"s": {}})
+    assert executor.execute(fast, context).success
+    assert context.storage == {"s": {"ok": True}}
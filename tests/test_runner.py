@@ -0,0 +1,30 @@
+from collections import OrderedDict
+
+from app.sandbox import runner
+
+
+def _handler(n: int) -> str:
+    return f"def on_schedule(storage):\n    storage['s']['n'] = {n}\n"
+
+
+def test_compiled_handlers_are_bounded_lru(monkeypatch):
+    monkeypatch.setattr(runner, "_compiled", OrderedDict())
+    monkeypatch.setattr(runner, "CODE_CACHE_SIZE", 2)
+
+    first = runner._compile(_handler(1))
+    second = runner._compile(_handler(2))
+    assert runner._compile(_handler(1)) is first  # hit, now most recent
+    runner._compile(_handler(3))
+
+    assert len(runner._compiled) == 2
+    assert runner._compile(_handler(1)) is first
+    assert runner._compile(_handler(2)) is not second  # evicted and recompiled
+
+
+def test_handle_runs_schedule_and_reports_usage():
+    request = {"code": _handler(5), "storage": {"s": {}}, "event": {"type": "schedule"}}
+
+    response = runner.handle(request)
+
+    assert response["success"] and response["storage"] == {"s": {"n": 5}}
+    assert response["usage"]["output_bytes"] == len('{"s": {"n": 5}}')
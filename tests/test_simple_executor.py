@@ -0,0 +1,50 @@
+import time
+
+from app.sandbox.protocol import EventType, HandlerContext, HandlerEvent
+from app.sandbox.simple import SimpleExecutor
+
+
+def _schedule(storage: dict) -> HandlerContext:
+    return HandlerContext(storage=storage, event=HandlerEvent(type=EventType.SCHEDULE))
+
+
+def test_wall_clock_limit_interrupts_handler():
+    code = "def on_schedule(storage):\n    while True:\n        time.sleep(0.01)\n"
+
+    result = SimpleExecutor(timeout=0.2, cpu_seconds=0).execute(code, _schedule({}))
+
+    assert result.timed_out and not result.success
+    assert "wall-clock limit" in result.error
+    assert result.wall_ms < 2000
+
+
+def test_cpu_limit_interrupts_busy_handler():
+    code = "def on_schedule(storage):\n    while True:\n        pass\n"
+
+    result = SimpleExecutor(timeout=10, cpu_seconds=0.2).execute(code, _schedule({}))
+
+    assert result.timed_out and not result.success
+    assert "CPU limit" in result.error
+    assert result.cpu_ms >= 200
+
+
+def test_handler_swallowing_the_interrupt_is_abandoned():
+    code = (
+        "def on_schedule(storage):\n"
+        "    while not storage['s']['stop']:\n"
+        "        try:\n"
+        "            time.sleep(0.01)\n"
+        "        except:\n"
+        "            pass\n"
+    )
+    storage = {"s": {"stop": False}}
+    start = time.perf_counter()
+
+    result = SimpleExecutor(timeout=0.2, cpu_seconds=0, grace=0.2).execute(
+        code, _schedule(storage)
+    )
+
+    assert result.timed_out and "abandoned" in result.error
+    assert time.perf_counter() - start < 2
+    storage["s"]["stop"] = True
+
@@ -0,0 +1,116 @@
+import asyncio
+import copy
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from app import db
+from app.models.storage import Storage
+from app.services import events
+from app.services.storage import diff_storage
+
+
+class FakeStorages:
+    """Just enough of a motor collection for Storage writes."""
+
+    def __init__(self, conflicting=(), stored_version=0):
+        self.conflicting = set(conflicting)
+        self.stored_version = stored_version
+        self.ops = []
+        self.updates = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops = ops
+        errors = [
+            {"index": i, "code": 11000, "errmsg": "E11000 duplicate key"}
+            for i, op in enumerate(ops)
+            if op._filter["_id"] in self.conflicting
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.updates.append((query, copy.deepcopy(update), kwargs))
+        self.stored_version += update["$inc"]["version"]
+        return {"_id": query["_id"], "version": self.stored_version}
+
+
+@pytest.fixture
+def published(monkeypatch):
+    calls = []
+    monkeypatch.setattr(events, "publish", lambda collection, ids: calls.append(list(ids)))
+    return calls
+
+
+def _use(monkeypatch, col):
+    monkeypatch.setattr(db, "storages_col", lambda: col)
+
+
+def test_diff_storage_unchanged():
+    assert diff_storage({"a": 1}, {"a": 1}) is None
+
+
+def test_diff_storage_sets_changed_and_unsets_removed_keys():
+    to_set, to_unset = diff_storage(
+        {"keep": 1, "change": [1], "drop": True}, {"keep": 1, "change": [2], "add": {"x": 1}}
+    )
+    assert to_set == {"data.change": [2], "data.add": {"x": 1}}
+    assert to_unset == ["data.drop"]
+
+
+@pytest.mark.parametrize("key", ["a.b", "$where", ""])
+def test_diff_storage_rewrites_data_for_unaddressable_keys(key):
+    assert diff_storage({}, {key: 1}) == ({"data": {key: 1}}, [])
+
+
+def test_bulk_patch_reports_version_conflicts(monkeypatch, published):
+    col = FakeStorages(conflicting={"b"})
+    _use(monkeypatch, col)
+    patches = {"a": ({"data.x": 1}, []), "b": ({"data.y": 2}, ["data.z"])}
+
+    conflicts = asyncio.run(Storage.bulk_patch(patches, {"a": 3, "b": 0}))
+
+    assert conflicts == ["b"]
+    assert published == [["a"]]
+    a, b = col.ops
+    assert a._filter == {"_id": "a", "deleted_at": None, "version": 3}
+    assert b._filter["version"] == {"$in": [0, None]}
+    assert a._upsert and b._upsert
+    assert b._doc["$unset"] == {"data.z": ""}
+    assert a._doc["$inc"] == {"version": 1}
+
+
+def test_bulk_patch_without_versions_does_not_upsert(monkeypatch, published):
+    col = FakeStorages()
+    _use(monkeypatch, col)
+
+    assert asyncio.run(Storage.bulk_patch({"a": ({"data": {}}, [])})) == []
+    assert col.ops[0]._filter == {"_id": "a", "deleted_at": None}
+    assert not col.ops[0]._upsert
+
+
+def test_bulk_patch_reraises_other_write_errors(monkeypatch, published):
+    class Failing(FakeStorages):
+        async def bulk_write(self, ops, ordered=True):
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121}]})
+
+    _use(monkeypatch, Failing())
+
+    with pytest.raises(BulkWriteError):
+        asyncio.run(Storage.bulk_patch({"a": ({"data.x": 1}, [])}, {"a": 1}))
+    assert published == []
+
+
+def test_forced_save_increments_the_stored_version(monkeypatch, published):
+    col = FakeStorages(stored_version=7)
+    _use(monkeypatch, col)
+    storage = Storage(id="a", data={"x": 1})  # a fresh object still thinks it is v0
+
+    asyncio.run(storage.save(force=True))
+
+    assert storage.version == 8
+    query, update, kwargs = col.updates[0]
+    assert query == {"_id": "a"}
+    assert "version" not in update["$set"]
+    assert kwargs["return_document"] is ReturnDocument.AFTER
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.task import Task
+from app.services import tasks_v2, visibility
+
+
+@pytest.fixture
+def watched(monkeypatch):
+    viewers = set()
+
+    async def is_watched(storage_ids):
+        return bool(viewers & set(storage_ids))
+
+    monkeypatch.setattr(visibility, "is_watched", is_watched)
+    monkeypatch.setattr(tasks_v2, "IDLE_TASK_INTERVAL", 600)
+    return viewers
+
+
+def _idle(**fields) -> bool:
+    return asyncio.run(tasks_v2.is_idle(Task(id="t", storage_ids=["s"], **fields)))
+
+
+def _ago(seconds: float) -> datetime:
+    return datetime.now() - timedelta(seconds=seconds)
+
+
+def test_unwatched_task_idles_until_the_interval_passes(watched):
+    assert _idle(last_run=_ago(60), last_attempt=_ago(60))
+    assert not _idle(last_run=_ago(700), last_attempt=_ago(700))
+
+
+def test_failing_task_idles_on_its_last_attempt(watched):
+    # Never succeeded, or last succeeded long ago, but attempted just now
+    assert _idle(last_attempt=_ago(60))
+    assert _idle(last_run=_ago(7200), last_attempt=_ago(60))
+
+
+def test_tasks_saved_before_last_attempt_fall_back_to_last_run(watched):
+    assert _idle(last_run=_ago(60))
+
+
+def test_watched_new_or_non_adaptive_tasks_are_not_idle(watched):
+    assert not _idle()
+    assert not _idle(last_attempt=_ago(60), adaptive=False)
+    watched.add("s")
+    assert not _idle(last_attempt=_ago(60))
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.task import Task
+from app.services import task_scheduler, tasks_v2
+
+
+@pytest.fixture
+def task(monkeypatch):
+    task = Task(id="t", schedule="* * * * *", retry_attempts=2, retry_backoff=1.0)
+    fields = []
+
+    async def load(task_id):
+        return task
+
+    async def set_fields(self, **values):
+        fields.append(values)
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    async def is_idle(t):
+        return False
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(Task, "load", load)
+    monkeypatch.setattr(Task, "set_fields", set_fields)
+    monkeypatch.setattr(tasks_v2, "is_idle", is_idle)
+    monkeypatch.setattr(task_scheduler.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(tasks_v2, "TASK_CIRCUIT_THRESHOLD", 2)
+    monkeypatch.setattr(tasks_v2, "TASK_CIRCUIT_PROBE_SECONDS", 60)
+    task.fields = fields
+    return task
+
+
+def _outcomes(monkeypatch, *successes):
+    triggers = []
+    results = iter(successes)
+
+    async def execute_task(task_id, trigger="manual"):
+        triggers.append(trigger)
+        return {"success": True} if next(results) else {"success": False, "error": "boom"}
+
+    monkeypatch.setattr(tasks_v2, "execute_task", execute_task)
+    return triggers
+
+
+def _tick():
+    asyncio.run(task_scheduler.run_scheduled_task("t"))
+
+
+def test_failed_tick_is_retried_until_success(monkeypatch, task):
+    triggers = _outcomes(monkeypatch, False, False, True)
+
+    _tick()
+
+    assert triggers == ["schedule", "retry", "retry"]
+    assert task.circuit == "closed" and task.consecutive_failures == 0
+
+
+def test_circuit_opens_after_consecutive_failed_ticks(monkeypatch, task):
+    triggers = _outcomes(monkeypatch, *[False] * 6)
+
+    _tick()
+    assert task.consecutive_failures == 1 and task.circuit == "closed"
+    _tick()
+
+    assert len(triggers) == 6
+    assert task.circuit == "open" and task.last_error == "boom"
+    assert task.circuit_opened_at is not None
+
+    _tick()  # open and not yet due a probe: skipped
+    assert len(triggers) == 6
+
+
+def test_probe_gets_one_attempt_and_closes_the_circuit(monkeypatch, task):
+    task.circuit = "open"
+    task.consecutive_failures = 2
+    task.circuit_opened_at = datetime.now() - timedelta(seconds=61)
+    triggers = _outcomes(monkeypatch, True)
+
+    _tick()
+
+    assert triggers == ["schedule"]
+    assert task.fields[0] == {"circuit": "half_open"}
+    assert task.circuit == "closed" and task.consecutive_failures == 0
+
+
+def test_failed_probe_restarts_the_wait(monkeypatch, task):
+    task.circuit = "open"
+    task.circuit_opened_at = datetime.now() - timedelta(seconds=61)
+    triggers = _outcomes(monkeypatch, False)
+
+    _tick()
+
+    assert triggers == ["schedule"]
+    assert task.circuit == "open"
+    assert not tasks_v2.circuit_allows_run(task)
+
+
+def test_backoff_is_full_jitter_capped(monkeypatch):
+    monkeypatch.setattr(task_scheduler, "TASK_RETRY_MAX_DELAY", 5.0)
+    monkeypatch.setattr(task_scheduler.random, "uniform", lambda low, high: (low, high))
+
+    assert task_scheduler._backoff(1.0, 0) == (0, 1.0)
+    assert task_scheduler._backoff(1.0, 2) == (0, 4.0)
+    assert task_scheduler._backoff(1.0, 10) == (0, 5.0)
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.task import Task
+from app.models.task_run import TaskRun
+from app.services import events, tasks_v2
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.updates = []
+
+    async def insert_one(self, doc):
+        self.inserted.append(doc)
+
+    async def update_one(self, query, update, **kwargs):
+        self.updates.append((query, update))
+
+
+@pytest.fixture
+def cols(monkeypatch):
+    runs, tasks = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(db, "task_runs_col", lambda: runs)
+    monkeypatch.setattr(db, "tasks_col", lambda: tasks)
+    monkeypatch.setattr(events, "publish", lambda collection, ids: None)
+    return runs, tasks
+
+
+def _use_task(monkeypatch, result: dict) -> Task:
+    task = Task(id="t", handler="def on_schedule(storage): pass", storage_ids=["s"])
+
+    async def load(task_id):
+        return task
+
+    async def run_handler(code, storage_ids, event, task_id=None):
+        return result
+
+    monkeypatch.setattr(Task, "load", load)
+    monkeypatch.setattr(tasks_v2, "run_handler", run_handler)
+    return task
+
+
+def test_run_is_recorded_with_phase_timings(monkeypatch, cols):
+    runs, _ = cols
+    task = _use_task(monkeypatch, {
+        "success": True,
+        "storage_ids": ["s"],
+        "attempts": 2,
+        "timings": {"load": 0.001, "wait": 0.002, "handler": 0.0105, "save": 0.004},
+        "usage": {"cpu_ms": 9.5, "output_bytes": 12},
+    })
+
+    assert asyncio.run(tasks_v2.execute_task("t", trigger="retry")) == {"success": True}
+
+    (doc,) = runs.inserted
+    assert doc["trigger"] == "retry" and doc["success"]
+    assert (doc["load_ms"], doc["wait_ms"], doc["handler_ms"], doc["save_ms"]) == (
+        1.0, 2.0, 10.5, 4.0
+    )
+    assert doc["cpu_ms"] == 9.5 and doc["output_bytes"] == 12 and doc["peak_memory_kb"] is None
+    assert doc["attempts"] == 2 and doc["storage_ids"] == ["s"]
+    assert task.last_run == doc["started_at"]
+
+
+def test_failed_run_is_recorded_without_touching_last_run(monkeypatch, cols):
+    runs, tasks = cols
+    task = _use_task(monkeypatch, {"success": False, "error": "boom", "attempts": 1})
+
+    assert asyncio.run(tasks_v2.execute_task("t")) == {"success": False, "error": "boom"}
+
+    (doc,) = runs.inserted
+    assert doc["trigger"] == "manual" and doc["error"] == "boom"
+    assert doc["handler_ms"] == 0.0
+    assert task.last_run is None
+    assert task.last_attempt == doc["started_at"]
+
+
+def test_run_document_round_trip():
+    run = TaskRun(task_id="t", started_at=datetime(2026, 1, 1), trigger="retry", cpu_ms=1.5)
+
+    assert TaskRun._from_doc(run._to_doc()) == run
+
+
+def test_summary_reports_success_rate_and_percentiles():
+    runs = [
+        TaskRun(task_id="t", started_at=datetime(2026, 1, 1), success=i != 0, duration_ms=i + 1.0)
+        for i in range(10)
+    ]
+
+    summary = tasks_v2.summarize_runs(runs)
+
+    assert summary["count"] == 10 and summary["failures"] == 1
+    assert summary["success_rate"] == 0.9
+    assert summary["duration_ms"] == {"p50": 5.0, "p90": 9.0, "p99": 10.0, "max": 10.0}
+    assert summary["cpu_ms"]["p50"] is None
+
+
+def test_summary_of_no_runs():
+    assert tasks_v2.summarize_runs([])["success_rate"] is None